@@ -1,22 +1,48 @@
+import argparse
+
 import geopandas as gpd
 import pandas as pd
-# Load the data
-points = gpd.read_file("Data/200_tyrol_mountains_with_verfied_wiki_data.gpkg")
-areas = gpd.read_file("Data/austria_osm_protected_areas.gpkg")
-
-# Ensure both are in the same CRS
-if points.crs != areas.crs:
-    areas = areas.to_crs(points.crs)
-
-# Perform spatial join
-# Suppose the area layer has an attribute 'protection_status'
-points_joined = gpd.sjoin(points, areas[['protect_class', 'geometry']], how='left', predicate='within')
-
-# Fill NaN values with "not protected"
-points_joined['protect_class'] = points_joined['protect_class'].fillna(0)
-points_joined["protect_class"] = pd.to_numeric(points_joined["protect_class"], errors="coerce")
-# Keep only the row with the highest 'score' per 'name'
-points_joined = points_joined.sort_values("protect_class", ascending=False).drop_duplicates(subset=["name"], keep="first")
-
-# Save result back to a geopackage
-points_joined.to_file("Data/200_tyrol_mountains_wiki_protected.gpkg", layer="peaks", driver="GPKG")
+from dataset_store import write_layer
+from tiled_aggregation import TILE_SIZE, WORKERS, tiled_aggregate
+
+points_path = "Data/200_tyrol_mountains_with_verfied_wiki_data.gpkg"
+areas_path = "Data/austria_osm_protected_areas.gpkg"
+
+
+def add_protect_class(points, areas, tile_size=None, workers=WORKERS):
+    """
+    Attach the highest protect_class of the protected areas containing each peak (0 if none).
+    With ``tile_size`` (meters) the join runs tile by tile in a process pool (tiled_aggregation.py).
+    """
+    # Ensure both are in the same CRS
+    if points.crs != areas.crs:
+        areas = areas.to_crs(points.crs)
+    areas = areas[['protect_class', 'geometry']].assign(
+        protect_class=pd.to_numeric(areas['protect_class'], errors='coerce'))
+
+    # Highest protect_class of the areas each peak lies within
+    if tile_size:
+        max_class = tiled_aggregate(points, areas, 'protect_class', 'max', 0, 'contains', tile_size, workers)
+    else:
+        points_joined = gpd.sjoin(points, areas, how='inner', predicate='within')
+        max_class = points_joined.groupby(level=0)['protect_class'].max()
+
+    # Fill NaN values with "not protected"
+    points = points.assign(protect_class=points.index.map(max_class)).fillna({'protect_class': 0})
+    # Keep only the row with the highest 'score' per 'name'
+    return points.sort_values("protect_class", ascending=False, kind="stable").drop_duplicates(subset=["name"], keep="first")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Protection class of the areas containing each peak.")
+    parser.add_argument("--tiled", action="store_true", help="join tile by tile in a process pool")
+    parser.add_argument("--tile-size", type=float, default=TILE_SIZE, help="tile size in meters")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    args = parser.parse_args()
+
+    # Load the data
+    points = gpd.read_file(points_path)
+    areas = gpd.read_file(areas_path)
+
+    # Save result as the peaks layer of the dataset store
+    write_layer(add_protect_class(points, areas, args.tile_size if args.tiled else None, args.workers), "peaks")
@@ -17,11 +17,13 @@ peaks_gdf = gpd.read_file("./Data/tyrol_mountain_peaks.gpkg")
 #peaks_gdf = peaks_gdf.head(LIMIT)
 
 # --- 1️⃣ Wikipedia Pageviews ---
+import os
 import time
 import requests
 import geopandas as gpd
 from urllib.parse import quote
 from tqdm import tqdm
+from crawl_metrics import CrawlMetrics
 
 # Optional: limit for testing
 # gdf = gdf.head(100)
@@ -32,6 +34,9 @@ LANG = "de"
 START = "20250101"
 END = "20251101"
 BATCH_SIZE = 20  # number of requests before sleeping
+PAGEVIEWS_URL = os.environ.get("WIKIMEDIA_PAGEVIEWS_URL", "https://wikimedia.org/api/rest_v1/metrics/pageviews/per-article")
+
+metrics = CrawlMetrics("wiki_pageviews")
 
 def get_wikipedia_views(peak_name):
     """
@@ -41,22 +46,26 @@ def get_wikipedia_views(peak_name):
     if not peak_name:
         return None
     url = (
-        "https://wikimedia.org/api/rest_v1/metrics/pageviews/per-article/"
+        f"{PAGEVIEWS_URL}/"
         f"{LANG}.wikipedia/all-access/all-agents/{quote(peak_name.replace(' ', '_'))}/daily/{START}/{END}"
     )
     try:
-        r = requests.get(url, headers=HEADERS, timeout=10)
+        r = metrics.get("wikimedia", "pageviews", url, headers=HEADERS, timeout=10)
         if r.status_code in (403, 404):
+            metrics.drop("wikimedia", "pageviews", "not_found")
             return None
         r.raise_for_status()
         data = r.json()
-        print(data)
         items = data.get("items", [])
         if len(items) > 0:
             return sum(item["views"] for item in items)
         else:
+            metrics.drop("wikimedia", "pageviews", "no_items")
             return None
-    except Exception:
+    except (requests.RequestException, ValueError, KeyError) as e:
+        # failed lookups are counted in the metrics instead of disappearing silently
+        metrics.error("wikimedia", "pageviews", e)
+        metrics.drop("wikimedia", "pageviews", "error")
         return None
 
 
@@ -69,12 +78,12 @@ for i, row in tqdm(enumerate(peaks_gdf.itertuples()), total=len(peaks_gdf)):
 
     # After every 20 requests, sleep for 1 second
     if (i + 1) % BATCH_SIZE == 0:
-        time.sleep(1)
+        metrics.sleep("wikimedia", "throttle", 1)
 
 # --- Save results ---
 peaks_gdf["wikipedia_views"] = results
 peaks_gdf = peaks_gdf[peaks_gdf["wikipedia_views"].notnull()]
-peaks_gdf.to_file("tyrol_peaks_wiki_seq.gpkg", driver="GPKG")
+peaks_gdf.to_file("./Data/tyrol_peaks_wiki_seq.gpkg", driver="GPKG")
 
 if False:
     print(f"✅ Done: Wikipedia data saved for {len(gdf)} peaks.")
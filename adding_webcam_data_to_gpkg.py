@@ -1,64 +1,79 @@
+import argparse
+
 import pandas as pd
 import geopandas as gpd
 from shapely.geometry import Point
-
-# Load your layers (assuming they are in the same GeoPackage)
-perfect_gpkg = "points_with_avg.gpkg"
-
-# Read layers
-gdf_lines = gpd.read_file(perfect_gpkg, layer="strava_segments")
-gdf_points = gpd.read_file(perfect_gpkg, layer="peaks")
-
+from dataset_store import read_layer, add_columns, write_layer
+from tiled_aggregation import TILE_SIZE, WORKERS, tiled_aggregate
 
 # Path to your CSV
 csv_path = "./Data/ppl_on_mountains_tyrol_cleaned.csv"
 
-# Read the CSV
-df = pd.read_csv(csv_path)
-
 # Make sure your columns are named correctly
 # (adjust if your CSV uses different names)
 lat_col = "lat"
 lon_col = "lon"
 
-# Create Point geometries
-geometry = [Point(xy) for xy in zip(df[lon_col], df[lat_col])]
+# --- Create buffers (e.g., 1000 m radius) ---
+buffer_distance = 5000  # meters
 
-# Create GeoDataFrame
-webcam_points = gpd.GeoDataFrame(df, geometry=geometry, crs="EPSG:4326")
 
-# Make sure both are in the same CRS
-if gdf_points.crs != webcam_points.crs:
-    webcam_points = webcam_points.to_crs(gdf_points.crs)
+def load_webcam_points(csv_path=csv_path):
+    """Read the webcam detection CSV as a point GeoDataFrame."""
+    df = pd.read_csv(csv_path)
 
-# --- Make sure both use the same CRS ---
-if webcam_points.crs != gdf_points.crs:
-    webcam_points = webcam_points.to_crs(gdf_points.crs)
+    # Create Point geometries
+    geometry = [Point(xy) for xy in zip(df[lon_col], df[lat_col])]
 
-# --- Reproject to a metric CRS if currently in degrees ---
-# (e.g., UTM or Web Mercator for distance in meters)
-if gdf_points.crs.is_geographic:
-    gdf_points   = gdf_points.to_crs(3857)
-    webcam_points = webcam_points.to_crs(3857)
+    # Create GeoDataFrame
+    return gpd.GeoDataFrame(df, geometry=geometry, crs="EPSG:4326")
 
-# --- Create buffers (e.g., 1000 m radius) ---
-buffer_distance = 5000  # meters
-gdf_points["geometry_buffer"] = gdf_points.geometry.buffer(buffer_distance)
 
-# Create a GeoDataFrame with buffers
-gdf_points = gdf_points.set_geometry("geometry_buffer")
+def sum_webcam_people_per_peak(gdf_points, webcam_points, buffer_distance=buffer_distance, tile_size=None,
+                               workers=WORKERS):
+    """
+    Sum of detected people on all webcams within buffer_distance of each peak.
+    With ``tile_size`` (meters) the join runs tile by tile in a process pool (tiled_aggregation.py).
+    """
+    # --- Make sure both use the same CRS ---
+    if webcam_points.crs != gdf_points.crs:
+        webcam_points = webcam_points.to_crs(gdf_points.crs)
+
+    # --- Reproject to a metric CRS if currently in degrees ---
+    # (e.g., UTM or Web Mercator for distance in meters)
+    if gdf_points.crs.is_geographic:
+        gdf_points   = gdf_points.to_crs(3857)
+        webcam_points = webcam_points.to_crs(3857)
+
+    if tile_size:
+        sum_values = tiled_aggregate(gdf_points, webcam_points, "count", "sum", buffer_distance, "within",
+                                     tile_size, workers)
+        return gdf_points.index.map(sum_values).fillna(0)
+
+    # Create a GeoDataFrame with buffers (the caller's frame is not modified)
+    buffers = gpd.GeoDataFrame(geometry=gdf_points.geometry.buffer(buffer_distance), crs=gdf_points.crs)
+
+    # --- Spatial join: which points fall within which buffer ---
+    join = gpd.sjoin(webcam_points, buffers, predicate="within", how="inner")
+
+    # --- Sum point values within each buffer ---
+    sum_values = join.groupby("index_right")["count"].sum()
+
+    # --- Add sums back to reference points ---
+    return gdf_points.index.map(sum_values).fillna(0)
 
-# --- Spatial join: which points fall within which buffer ---
-join = gpd.sjoin(webcam_points, gdf_points, predicate="within", how="inner")
 
-# --- Sum point values within each buffer ---
-sum_values = join.groupby("index_right")["count"].sum()
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Sum of people on webcams around each peak.")
+    parser.add_argument("--tiled", action="store_true", help="join tile by tile in a process pool")
+    parser.add_argument("--tile-size", type=float, default=TILE_SIZE, help="tile size in meters")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    args = parser.parse_args()
 
-# --- Add sums back to reference points ---
-gdf_points["people_on_webcams"] = gdf_points.index.map(sum_values).fillna(0)
+    webcam_points = load_webcam_points()
+    gdf_points = read_layer("peaks", columns=[])
 
-# Write to GeoPackage
-webcam_points.to_file("peaks_strava_wiki_web.gpkg", layer="webcams", driver="GPKG")
-gdf_lines.to_file("peaks_strava_wiki_web.gpkg", layer="strava_segments", driver="GPKG")
-gdf_points = gdf_points.drop(columns=["geometry_buffer"])
-gdf_points.to_file("peaks_strava_wiki_web.gpkg", layer="peaks", driver="GPKG")
\ No newline at end of file
+    # Write to the dataset store
+    write_layer(webcam_points, "webcams")
+    add_columns("peaks", {"people_on_webcams": sum_webcam_people_per_peak(
+        gdf_points, webcam_points, tile_size=args.tile_size if args.tiled else None, workers=args.workers)})
@@ -1,9 +1,14 @@
+import numpy as np
 import streamlit as st
-import geopandas as gpd
-import pandas as pd
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import plotly.express as px
 import plotly.graph_objects as go
 from styles import STYLE_CSS
+import dashboard_data
+import dashboard_profiling
+import stress_history
+from calculate_scores import POPULARITY_WEIGHTS, PROTECT_THRESHOLDS
+from name_index import NameIndex
 
 st.set_page_config(
     page_title="Tyrol Outdoor Usage", layout="wide", initial_sidebar_state="collapsed"
@@ -11,73 +16,337 @@ st.set_page_config(
 
 st.markdown(STYLE_CSS, unsafe_allow_html=True)
 
+# section timings and payload sizes of this rerun, only recorded with DASHBOARD_PROFILE=1
+_ctx = get_script_run_ctx()
+profile = dashboard_profiling.RenderProfile(session=_ctx.session_id if _ctx else None)
+
 # ----------------------------LOAD DATA----------------------------------------
 
 
-@st.cache_data
+# cache_resource keeps one copy of the frames for all sessions instead of a
+# copy per rerun (cache_data) - they are only read, never modified
+@st.cache_resource
 def load_data():
-    # load stress score data
-    peaks = gpd.read_file("Data/200_tyrol_mountains_final_stress_score.gpkg", layer="peaks")
-    protected = gpd.read_file("Data/austria_osm_protected_areas.gpkg")
+    return dashboard_data.load_data()
 
-    if peaks.crs != protected.crs:
-        protected = protected.to_crs(peaks.crs)
 
-    peaks = peaks.to_crs("EPSG:4326")
-    protected = protected.to_crs("EPSG:4326")
+peaks, protected, stress_col = load_data()
+profile.lap("load_data")
 
-    peaks["latitude"] = peaks.geometry.y
-    peaks["longitude"] = peaks.geometry.x
 
-    # change ele values to numerics
-    if "ele" in peaks.columns:
-        peaks["ele"] = pd.to_numeric(peaks["ele"], errors="coerce")
+# built once per loaded dataset, shared by all sessions
+@st.cache_resource
+def name_index():
+    return NameIndex(peaks["name"] if "name" in peaks.columns else [])
 
-    stress_col = None
-    for col in ["stress_score", "final_stress_score", "stress", "score"]:
-        if col in peaks.columns:
-            peaks[col] = pd.to_numeric(peaks[col], errors="coerce")
-            stress_col = col
-            break
-    print(stress_col)
-    return peaks, protected, stress_col
 
+# what-if scoring controls at their defaults: weights and thresholds of calculate_scores.py
+DEFAULT_SCORING = (tuple(POPULARITY_WEIGHTS), tuple(sorted(PROTECT_THRESHOLDS.items())))
 
-peaks, protected, stress_col = load_data()
 
-# ---------------------------------HEADER---------------------------------------
-st.title("Tyrol Outdoor Usage Dashboard")
-st.markdown("Insights into outdoor usage and environmental stress in the Tyrol region")
-st.markdown("---")
+@st.cache_resource
+def whatif_scorer():
+    if stress_col and dashboard_data.WhatIfScorer.available(peaks):
+        return dashboard_data.WhatIfScorer(peaks)
+    return None
 
-# ---------------------------------METRICS--------------------------------------
-col1, col2, col3, col4 = st.columns(4)
 
-# total peaks with data
-with col1:
-    st.metric(label="Total Peaks", value=f"{len(peaks):,}")
+# figures and filtered views are memoized by filter state (including the what-if
+# scoring), bounded so memory stays flat with many users
+FIGURE_CACHE_ENTRIES = 64
+MAP_HEIGHT = 500
+# in "Auto" map mode, peaks are drawn as single markers up to this count,
+# above it they are aggregated into grid cells
+MARKER_LIMIT = 2000
 
-# total stressed areas
-with col2:
-    if stress_col:
-        healthy_areas = len(peaks[peaks[stress_col] > 0])
-        st.metric(label="Stressed Areas", value=f"{healthy_areas:,}")
+STRESS_COLOR_MAP = {
+    "Very Low (-1 to -0.6)": "#d7191c",
+    "Low (-0.6 to -0.2)": "#fdae61",
+    "Moderate (-0.2 to 0.2)": "#ffffbf",
+    "High (0.2 to 0.6)": "#a6d96a",
+    "Very High (0.6 to 1.0)": "#1a9641",
+}
+
+
+@st.cache_resource(max_entries=FIGURE_CACHE_ENTRIES)
+def scored_peaks(scoring):
+    """The shared peaks frame with the stress score and bins of a what-if scoring (itself for the default)."""
+    if scoring == DEFAULT_SCORING or whatif_scorer() is None:
+        return peaks
+    weights, thresholds = scoring
+    stress = whatif_scorer().score(weights, dict(thresholds))
+    return peaks.assign(**{stress_col: stress, "stress_range": dashboard_data.stress_bins(stress)})
+
+
+@st.cache_resource(max_entries=FIGURE_CACHE_ENTRIES)
+def base_mask(search_input, elevation_range):
+    """Name and elevation mask, independent of the scoring. Returns (mask, search_found)."""
+    mask = np.ones(len(peaks), dtype=bool)
+    search_found = True
+
+    # filter by search input (accent/case-insensitive prefix, substring and typo matches)
+    if search_input and "name" in peaks.columns:
+        matches = name_index().mask(search_input)
+        if matches.any():
+            mask &= matches
+        else:
+            search_found = False
+
+    # filter by elevation
+    if elevation_range and "ele" in peaks.columns:
+        ele = peaks["ele"].to_numpy()
+        mask &= (ele >= elevation_range[0]) & (ele <= elevation_range[1])
+
+    return mask, search_found
+
+
+def filter_mask(search_input, elevation_range, stress_range, scoring):
+    """Combined boolean mask over the scored peaks frame. Returns (mask, search_found)."""
+    mask, search_found = base_mask(search_input, elevation_range)
+
+    # filter by stress score
+    if stress_range and stress_col:
+        stress = scored_peaks(scoring)[stress_col].to_numpy()
+        mask = mask & (stress >= stress_range[0]) & (stress <= stress_range[1])
+
+    return mask, search_found
+
+
+@st.cache_resource(max_entries=FIGURE_CACHE_ENTRIES)
+def filtered_view(filter_state):
+    mask, search_found = filter_mask(*filter_state)
+    return scored_peaks(filter_state[-1])[mask], search_found
+
+
+@st.cache_resource
+def protected_lod(tolerance):
+    return dashboard_data.load_protected_lod(tolerance)
+
+
+@st.cache_resource(max_entries=FIGURE_CACHE_ENTRIES)
+def grid_for(filter_state, zoom_level):
+    """Grid cells of the filtered peaks, computed once per filter state and zoom level."""
+    filtered_peaks, _ = filtered_view(filter_state)
+    values = filtered_peaks[stress_col] if stress_col else filtered_peaks["ele"]
+    return dashboard_data.grid_cells(
+        filtered_peaks["longitude"],
+        filtered_peaks["latitude"],
+        values,
+        dashboard_data.grid_cell_size(zoom_level),
+    )
+
+
+@st.cache_resource(max_entries=FIGURE_CACHE_ENTRIES)
+def map_figure(filter_state, show_protected, map_mode="Auto", show_heatmap=False):
+    filtered_peaks, _ = filtered_view(filter_state)
+    center, zoom, view_bounds = dashboard_data.map_view(
+        filtered_peaks["longitude"], filtered_peaks["latitude"], height_px=MAP_HEIGHT
+    )
+    minx, miny, maxx, maxy = view_bounds
+    in_view = filtered_peaks[
+        filtered_peaks["longitude"].between(minx, maxx)
+        & filtered_peaks["latitude"].between(miny, maxy)
+    ]
+    use_grid = map_mode == "Grid" or (map_mode == "Auto" and len(in_view) > MARKER_LIMIT)
+
+    if use_grid:
+        cells = grid_for(filter_state, int(zoom))
+        cells = cells[cells["lon"].between(minx, maxx) & cells["lat"].between(miny, maxy)]
+        value_label = "Stress Score" if stress_col else "Elevation (m)"
+        fig_map = px.scatter_mapbox(
+            cells,
+            lat="lat",
+            lon="lon",
+            size="count",
+            color="mean",
+            hover_data={"count": True, "mean": ":.2f", "max": ":.2f", "lat": False, "lon": False},
+            color_continuous_scale="RdYlGn_r" if stress_col else "Viridis",
+            size_max=30,
+            zoom=zoom,
+            center={"lat": center[0], "lon": center[1]},
+            height=MAP_HEIGHT,
+            labels={"count": "Peaks", "mean": f"Mean {value_label}", "max": f"Max {value_label}"},
+        )
     else:
-        st.metric(label="Stressed Areas", value="N/A")
+        hover_data_dict = {}
+        if "ele" in in_view.columns:
+            hover_data_dict["ele"] = ":.0f"
+        if stress_col:
+            hover_data_dict[stress_col] = ":.2f"
+
+        fig_map = px.scatter_mapbox(
+            in_view,
+            lat="latitude",
+            lon="longitude",
+            hover_name="name" if "name" in in_view.columns else None,
+            hover_data=hover_data_dict if hover_data_dict else None,
+            color=stress_col
+            if stress_col
+            else ("ele" if "ele" in in_view.columns else None),
+            color_continuous_scale="RdYlGn_r" if stress_col else "Viridis",
+            zoom=zoom,
+            center={"lat": center[0], "lon": center[1]},
+            height=MAP_HEIGHT,
+            labels={stress_col: "Stress Score"} if stress_col else None,
+        )
+
+        fig_map.update_traces(marker=dict(size=12))
+
+    layers = []
+    if show_heatmap:
+        # Strava segment density, read from the raster overview that fits the view
+        heatmap = dashboard_data.heatmap_overlay(view_bounds)
+        if heatmap:
+            layers.append({"sourcetype": "image", **heatmap, "opacity": 0.8, "below": "traces"})
+
+    if show_protected:
+        # outlines at the level of detail that fits the zoom, only the ones in view
+        features = protected_lod(dashboard_data.lod_for_zoom(zoom))
+        if features:
+            outlines = dashboard_data.features_in_view(features, view_bounds)
+            layers += [
+                {"source": outlines, "type": "fill", "color": "green", "opacity": 0.15, "below": "traces"},
+                {"source": outlines, "type": "line", "color": "green", "line": {"width": 1.5}, "below": "traces"},
+            ]
+        else:
+            # no polygon artifact built: fall back to the precomputed centroids
+            fig_map.add_trace(go.Scattermapbox(
+                lat=protected["lat"],
+                lon=protected["lon"],
+                mode="markers",
+                marker=dict(size=12, color="green"),
+                hovertext=protected["name"] if "name" in protected.columns else None,
+                name="Protected Areas",
+                showlegend=False,
+            ))
+
+    fig_map.update_layout(
+        mapbox_style="open-street-map", mapbox_layers=layers, margin={"r": 0, "t": 0, "l": 0, "b": 0}
+    )
+    return fig_map
+
+
+@st.cache_resource(max_entries=FIGURE_CACHE_ENTRIES)
+def histogram_figure(filter_state):
+    filtered_peaks, _ = filtered_view(filter_state)
+    fig_hist = px.histogram(
+        filtered_peaks,
+        x=stress_col,
+        nbins=30,
+        labels={stress_col: "Stress Score", "count": "Number of Peaks"},
+        title="Stress Score Distribution",
+    )
+    fig_hist.update_layout(
+        height=250, margin=dict(l=0, r=0, t=30, b=0), showlegend=False
+    )
+    return fig_hist
+
+
+@st.cache_resource(max_entries=FIGURE_CACHE_ENTRIES)
+def top_stress_table(filter_state):
+    filtered_peaks, _ = filtered_view(filter_state)
+    top_stress = filtered_peaks.nlargest(10, stress_col)[["name", stress_col]]
+    top_stress.columns = ["Peak Name", "Stress Score"]
+    return top_stress.reset_index(drop=True)
+
 
-# average stress score in the region
-with col3:
+@st.cache_resource(max_entries=FIGURE_CACHE_ENTRIES)
+def stress_range_figures(filter_state):
+    filtered_peaks, _ = filtered_view(filter_state)
+    # stress_range bins are precomputed by dashboard_data
+    range_counts = filtered_peaks["stress_range"].value_counts().sort_index()
+
+    # bar chart
+    fig_bar = px.bar(
+        x=range_counts.index,
+        y=range_counts.values,
+        labels={"x": "Stress Score Range", "y": "Number of Peaks"},
+        title="Peak Distribution by Stress Level",
+        color=range_counts.index,
+        color_discrete_map=STRESS_COLOR_MAP,
+    )
+    fig_bar.update_layout(
+        height=350, margin=dict(l=0, r=0, t=30, b=0), showlegend=False
+    )
+
+    # pie chart
+    range_counts_filtered = range_counts[range_counts > 0]
+
+    fig_pie = px.pie(
+        values=range_counts_filtered.values,
+        names=range_counts_filtered.index,
+        title="Percentage Distribution",
+        hole=0.4,
+        color=range_counts_filtered.index,
+        color_discrete_map=STRESS_COLOR_MAP,
+    )
+    fig_pie.update_layout(height=350, margin=dict(l=0, r=0, t=30, b=0))
+    return fig_bar, fig_pie
+
+
+@st.cache_resource(max_entries=FIGURE_CACHE_ENTRIES)
+def details_table(filter_state):
+    filtered_peaks, _ = filtered_view(filter_state)
+    display_cols = []
+    if "name" in filtered_peaks.columns:
+        display_cols.append("name")
     if stress_col:
-        avg_stress = peaks[stress_col].mean()
-        st.metric(label="Avg Stress Score", value=f"{avg_stress:.2f}")
-    else:
-        st.metric(label="Avg Stress Score", value="N/A")
+        display_cols.append(stress_col)
+    if "ele" in filtered_peaks.columns:
+        display_cols.append("ele")
+    display_cols.extend(["latitude", "longitude"])
+
+    display_df = filtered_peaks[display_cols]
+
+    # stress score table sorted by stress
+    if stress_col:
+        display_df = display_df.sort_values(by=stress_col, ascending=False)
+
+    rounding = {}
+    if "ele" in display_df.columns:
+        rounding["ele"] = 0
+    if stress_col:
+        rounding[stress_col] = 3
+    display_df = display_df.round(rounding)
+
+    column_rename = {
+        "name": "Peak Name",
+        "ele": "Elevation (m)",
+        "latitude": "Latitude",
+        "longitude": "Longitude",
+    }
+    if stress_col:
+        column_rename[stress_col] = "Stress Score"
+
+    return display_df.rename(columns=column_rename)
+
+
+@st.cache_resource(max_entries=FIGURE_CACHE_ENTRIES)
+def trend_figure(peak_id, peak_name, history_runs):
+    """Stress score per run of one peak; ``history_runs`` only invalidates the cache after a new run."""
+    trend = stress_history.peak_trend(peak_id)
+    fig_trend = px.line(
+        x=trend.index,
+        y=trend.values,
+        markers=True,
+        labels={"x": "Run Date", "y": "Stress Score"},
+        title=f"Stress Score Trend: {peak_name}",
+    )
+    fig_trend.update_traces(line_shape="hv")
+    fig_trend.update_layout(height=300, margin=dict(l=0, r=0, t=30, b=0))
+    return fig_trend
+
+# ---------------------------------HEADER---------------------------------------
+st.title("Tyrol Outdoor Usage Dashboard")
+st.markdown("Insights into outdoor usage and environmental stress in the Tyrol region")
+st.markdown("---")
 
-# amount of protected areas
-with col4:
-    st.metric(label="Protected Areas", value=f"{len(protected):,}")
+# ---------------------------------METRICS--------------------------------------
+# filled in below, once the what-if scoring is known
+metrics_row = st.container()
 
 st.markdown("---")
+profile.lap("header")
 
 # ------------------------FILTERS UNDER METRICS (COLLAPSIBLE)-------------------
 with st.expander("Filters", expanded=False):
@@ -88,10 +357,20 @@ with st.expander("Filters", expanded=False):
 
         # search bar
         search_input = st.text_input("Search Peak Name")
+        if search_input:
+            suggestions = [name for _, name in name_index().search(search_input, limit=5)]
+            if suggestions:
+                st.caption("Best matches: " + ", ".join(dict.fromkeys(suggestions)))
 
-        # checkbox - if checked then the protected area locations will be displayed
+        # checkbox - if checked then the protected area outlines are drawn on the map
         show_protected = st.checkbox("Show Protected Areas", value=False)
 
+        # checkbox - Strava segment density heatmap (strava_heatmap.py) under the peaks
+        show_heatmap = st.checkbox("Show Strava Heatmap", value=False)
+
+        # radio - single markers, grid cells, or grid only for large datasets
+        map_mode = st.radio("Map Mode", ["Auto", "Markers", "Grid"], horizontal=True)
+
         # slider for elevation
         if "ele" in peaks.columns:
             valid = peaks["ele"].dropna()
@@ -122,6 +401,9 @@ with st.expander("Filters", expanded=False):
                     max_value=max_stress,
                     value=(min_stress, max_stress),
                 )
+                # the full range is no filter, what-if scores may fall outside of it
+                if stress_range == (min_stress, max_stress):
+                    stress_range = None
             else:
                 stress_range = None
         else:
@@ -129,34 +411,72 @@ with st.expander("Filters", expanded=False):
 
     with col_filter2:
         pass
+profile.lap("filters")
+
+# ------------------------WHAT-IF SCORING--------------------------------------
+scoring = DEFAULT_SCORING
+if whatif_scorer() is not None:
+    with st.expander("What-if Scoring", expanded=False):
+        st.caption("Recompute the stress score with other indicator weights and protection thresholds.")
+        default_weights, default_thresholds = DEFAULT_SCORING
+        weight_cols = st.columns(len(default_weights))
+        weights = tuple(
+            col.slider(f"{label} Weight", min_value=0.0, max_value=1.0, value=default, step=0.05)
+            for col, label, default in zip(weight_cols, ["Wikipedia", "Strava", "Webcam"], default_weights)
+        )
+        threshold_cols = st.columns(len(default_thresholds))
+        thresholds = tuple(
+            (protect_class, col.slider(f"Threshold Protect Class {protect_class}", min_value=0.0, max_value=1.0,
+                                       value=float(default), step=0.05))
+            for col, (protect_class, default) in zip(threshold_cols, default_thresholds)
+        )
+        if not any(weights):
+            st.warning("At least one weight must be above 0.")
+        else:
+            scoring = (weights, thresholds)
+profile.lap("whatif")
 
 # ------------------------DATA FILTERING---------------------------------------
-filtered_peaks = peaks.copy()
+filter_state = (
+    search_input,
+    tuple(elevation_range) if elevation_range else None,
+    tuple(stress_range) if stress_range else None,
+    scoring,
+)
+filtered_peaks, search_found = filtered_view(filter_state)
+if not search_found:
+    st.warning("Area not found")
+profile.lap("filtering")
 
-# filter by search input
-if search_input and "name" in filtered_peaks.columns:
-    matches = filtered_peaks[
-        filtered_peaks["name"].str.contains(search_input, case=False, na=False)
-    ]
-    if len(matches) > 0:
-        filtered_peaks = matches
-    else:
-        st.warning("Area not found")
-        filtered_peaks = peaks.copy()
-
-# filter by elevation
-if elevation_range and "ele" in filtered_peaks.columns:
-    filtered_peaks = filtered_peaks[
-        (filtered_peaks["ele"] >= elevation_range[0])
-        & (filtered_peaks["ele"] <= elevation_range[1])
-    ]
+# ---------------------------------METRICS--------------------------------------
+scored = scored_peaks(scoring)
+with metrics_row:
+    col1, col2, col3, col4 = st.columns(4)
 
-# filter by stress score
-if stress_range and stress_col:
-    filtered_peaks = filtered_peaks[
-        (filtered_peaks[stress_col] >= stress_range[0])
-        & (filtered_peaks[stress_col] <= stress_range[1])
-    ]
+    # total peaks with data
+    with col1:
+        st.metric(label="Total Peaks", value=f"{len(peaks):,}")
+
+    # total stressed areas
+    with col2:
+        if stress_col:
+            healthy_areas = len(scored[scored[stress_col] > 0])
+            st.metric(label="Stressed Areas", value=f"{healthy_areas:,}")
+        else:
+            st.metric(label="Stressed Areas", value="N/A")
+
+    # average stress score in the region
+    with col3:
+        if stress_col:
+            avg_stress = scored[stress_col].mean()
+            st.metric(label="Avg Stress Score", value=f"{avg_stress:.2f}")
+        else:
+            st.metric(label="Avg Stress Score", value="N/A")
+
+    # amount of protected areas
+    with col4:
+        st.metric(label="Protected Areas", value=f"{len(protected):,}")
+profile.lap("metrics")
 
 # ------------------------MAP AND CHARTS--------------------------------------
 col1, col2 = st.columns([2, 1])
@@ -164,203 +484,119 @@ col1, col2 = st.columns([2, 1])
 with col1:
     st.subheader("Interactive Map")
 
-    if show_protected:
-        prot = protected.copy()
-
-        prot["lat"] = prot.geometry.centroid.y
-        prot["lon"] = prot.geometry.centroid.x
-
-        fig_map = px.scatter_mapbox(
-            prot,
-            lat="lat",
-            lon="lon",
-            hover_name="name" if "name" in prot.columns else None,
-            hover_data=None,
-            color_discrete_sequence=["green"],
-            zoom=8,
-            height=500,
-        )
-
-        fig_map.update_traces(marker=dict(size=12))
-
-    else:
-        hover_data_dict = {}
-        if "ele" in filtered_peaks.columns:
-            hover_data_dict["ele"] = ":.0f"
-        if stress_col:
-            hover_data_dict[stress_col] = ":.2f"
-
-        fig_map = px.scatter_mapbox(
-            filtered_peaks,
-            lat="latitude",
-            lon="longitude",
-            hover_name="name" if "name" in filtered_peaks.columns else None,
-            hover_data=hover_data_dict if hover_data_dict else None,
-            color=stress_col
-            if stress_col
-            else ("ele" if "ele" in filtered_peaks.columns else None),
-            color_continuous_scale="RdYlGn_r" if stress_col else "Viridis",
-            zoom=8,
-            height=500,
-            labels={stress_col: "Stress Score"} if stress_col else None,
-        )
-
-        fig_map.update_traces(marker=dict(size=12))
-
-    fig_map.update_layout(
-        mapbox_style="open-street-map", margin={"r": 0, "t": 0, "l": 0, "b": 0}
+    st.plotly_chart(
+        profile.payload("map", map_figure(filter_state, show_protected, map_mode, show_heatmap)),
+        use_container_width=True,
     )
-
-    st.plotly_chart(fig_map, use_container_width=True)
+    profile.lap("map")
 
 with col2:
     st.subheader("Statistics")
 
-    if show_protected:
-        st.info("Statistics off for protected areas.")
-
-    else:
-        if stress_col:
-            # histogram
-            fig_hist = px.histogram(
-                filtered_peaks,
-                x=stress_col,
-                nbins=30,
-                labels={stress_col: "Stress Score", "count": "Number of Peaks"},
-                title="Stress Score Distribution",
-            )
-            fig_hist.update_layout(
-                height=250, margin=dict(l=0, r=0, t=30, b=0), showlegend=False
+    if stress_col:
+        # histogram
+        st.plotly_chart(profile.payload("histogram", histogram_figure(filter_state)), use_container_width=True)
+        profile.lap("histogram")
+
+        # highest stress scores
+        st.markdown("**Top 10 Highest Stress Scores**")
+        if "name" in filtered_peaks.columns:
+            st.dataframe(
+                profile.payload("top_stress_table", top_stress_table(filter_state)),
+                use_container_width=True,
+                hide_index=True,
+                height=250,
             )
-            st.plotly_chart(fig_hist, use_container_width=True)
-
-            # highest stress scores
-            st.markdown("**Top 10 Highest Stress Scores**")
-            if "name" in filtered_peaks.columns:
-                top_stress = filtered_peaks.nlargest(10, stress_col)[
-                    ["name", stress_col]
-                ]
-                top_stress.columns = ["Peak Name", "Stress Score"]
-                st.dataframe(
-                    top_stress.reset_index(drop=True),
-                    use_container_width=True,
-                    hide_index=True,
-                    height=250,
-                )
-            else:
-                st.info("Peak names not available.")
+            profile.lap("top_stress_table")
         else:
-            st.warning("Stress score data not found in the dataset.")
+            st.info("Peak names not available.")
+    else:
+        st.warning("Stress score data not found in the dataset.")
 
 
 # ------------------------STRESS SCORE RANGE ANALYSIS-----------------------------
 if stress_col:
     st.subheader("Peaks by Stress Score Range")
 
-    bins = [-1, -0.6, -0.2, 0.2, 0.6, 1.0]
-    labels = [
-        "Very Low (-1 to -0.6)",
-        "Low (-0.6 to -0.2)",
-        "Moderate (-0.2 to 0.2)",
-        "High (0.2 to 0.6)",
-        "Very High (0.6 to 1.0)",
-    ]
-
-    filtered_peaks["stress_range"] = pd.cut(
-        filtered_peaks[stress_col], bins=bins, labels=labels, include_lowest=True
-    )
-
-    range_counts = filtered_peaks["stress_range"].value_counts().sort_index()
+    fig_bar, fig_pie = stress_range_figures(filter_state)
+    profile.lap("range_figures")
 
     col1, col2 = st.columns(2)
 
     # bar chart
     with col1:
-        color_map = {
-            "Very Low (-1 to -0.6)": "#d7191c",
-            "Low (-0.6 to -0.2)": "#fdae61",
-            "Moderate (-0.2 to 0.2)": "#ffffbf",
-            "High (0.2 to 0.6)": "#a6d96a",
-            "Very High (0.6 to 1.0)": "#1a9641",
-        }
-
-        fig_bar = px.bar(
-            x=range_counts.index,
-            y=range_counts.values,
-            labels={"x": "Stress Score Range", "y": "Number of Peaks"},
-            title="Peak Distribution by Stress Level",
-            color=range_counts.index,
-            color_discrete_map=color_map,
-        )
-        fig_bar.update_layout(
-            height=350, margin=dict(l=0, r=0, t=30, b=0), showlegend=False
-        )
-        st.plotly_chart(fig_bar, use_container_width=True)
+        st.plotly_chart(profile.payload("bar", fig_bar), use_container_width=True)
+        profile.lap("bar")
 
     # pie chart
     with col2:
-        color_map = {
-            "Very Low (-1 to -0.6)": "#d7191c",
-            "Low (-0.6 to -0.2)": "#fdae61",
-            "Moderate (-0.2 to 0.2)": "#ffffbf",
-            "High (0.2 to 0.6)": "#a6d96a",
-            "Very High (0.6 to 1.0)": "#1a9641",
-        }
-
-        range_counts_filtered = range_counts[range_counts > 0]
-
-        fig_pie = px.pie(
-            values=range_counts_filtered.values,
-            names=range_counts_filtered.index,
-            title="Percentage Distribution",
-            hole=0.4,
-            color=range_counts_filtered.index,
-            color_discrete_map=color_map,
-        )
-        fig_pie.update_layout(height=350, margin=dict(l=0, r=0, t=30, b=0))
-
-        st.plotly_chart(fig_pie, use_container_width=True)
+        st.plotly_chart(profile.payload("pie", fig_pie), use_container_width=True)
+        profile.lap("pie")
+
+# ------------------------STRESS TREND-----------------------------------------
+history_runs = len(stress_history.load_runs())
+if history_runs and "id" in filtered_peaks.columns and "name" in filtered_peaks.columns and len(filtered_peaks):
+    st.subheader("Stress Trend")
+    trend_peaks = filtered_peaks.sort_values("name")
+    trend_pos = st.selectbox(
+        "Peak",
+        range(len(trend_peaks)),
+        format_func=lambda i: trend_peaks["name"].iloc[i],
+    )
+    st.plotly_chart(
+        profile.payload("trend", trend_figure(
+            int(trend_peaks["id"].iloc[trend_pos]), trend_peaks["name"].iloc[trend_pos], history_runs
+        )),
+        use_container_width=True,
+    )
+profile.lap("trend")
 
 st.markdown("---")
 
 # ------------------------DATA TABLE------------------------------------------
 st.subheader("Peak Stress Details")
 
-display_cols = []
-if "name" in filtered_peaks.columns:
-    display_cols.append("name")
-if stress_col:
-    display_cols.append(stress_col)
-if "ele" in filtered_peaks.columns:
-    display_cols.append("ele")
-display_cols.extend(["latitude", "longitude"])
-
-display_df = filtered_peaks[display_cols].copy()
-
-# stress score table sorted by stress
-if stress_col:
-    display_df = display_df.sort_values(by=stress_col, ascending=False)
-
-
-if "ele" in display_df.columns:
-    display_df["ele"] = display_df["ele"].round(0)
-if stress_col:
-    display_df[stress_col] = display_df[stress_col].round(3)
-
-column_rename = {
-    "name": "Peak Name",
-    "ele": "Elevation (m)",
-    "latitude": "Latitude",
-    "longitude": "Longitude",
-}
-if stress_col:
-    column_rename[stress_col] = "Stress Score"
-
-display_df = display_df.rename(columns=column_rename)
-
-st.dataframe(display_df, use_container_width=True, hide_index=True, height=400)
+st.dataframe(
+    profile.payload("details_table", details_table(filter_state)),
+    use_container_width=True,
+    hide_index=True,
+    height=400,
+)
+profile.lap("details_table")
 
 # ------------------------FOOTER----------------------------------------------
 st.markdown("---")
 
 st.markdown("*Data source: OpenStreetMap & Stress Score Analysis*")
+profile.lap("footer")
+
+# ------------------------RENDER PROFILE (ADMIN)-------------------------------
+# only with DASHBOARD_PROFILE=1; the panel itself is not part of the measured rerun
+record = profile.finish(len(peaks), len(filtered_peaks))
+if record:
+    with st.expander("Render Profile", expanded=False):
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric(label="Rerun", value=f"{record['total_ms']:.0f} ms")
+        col2.metric(
+            label="Server Memory",
+            value=f"{record['rss_mb']:,.0f} MB" if record["rss_mb"] else "N/A",
+            delta=f"{record['rss_delta_mb']:+.1f} MB" if record["rss_delta_mb"] is not None else None,
+            delta_color="inverse",
+        )
+        col3.metric(label="Sessions", value=record["sessions"] if record["sessions"] else "N/A")
+        col4.metric(
+            label="Memory per Session",
+            value=f"{record['rss_per_session_mb']:,.0f} MB" if record["rss_per_session_mb"] else "N/A",
+        )
+
+        st.markdown("**This rerun**")
+        st.dataframe(dashboard_profiling.record_table(record), use_container_width=True)
+
+        st.markdown("**Recent reruns of this server**")
+        st.dataframe(
+            dashboard_profiling.summarize(dashboard_profiling.recent_records()),
+            use_container_width=True,
+            hide_index=True,
+        )
+        st.caption(f"Every rerun is also appended to {dashboard_profiling.PROFILE_LOG}; "
+                   "`python dashboard_profiling.py` compares the sections across data sizes.")
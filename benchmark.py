@@ -0,0 +1,265 @@
+import argparse
+import ctypes
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import pyarrow as pa
+from polyline import encode  # pip install polyline
+
+from convert_strava_lines_to_json import segments_to_gdf
+from calculate_avg_number_of_athletes_strava import average_athletes_per_peak
+from adding_webcam_data_to_gpkg import sum_webcam_people_per_peak
+from add_protected_status_to_peaks import add_protect_class
+from calculate_scores import calculate_stress_scores
+import dashboard_data
+from dashboard_profiling import rss_bytes
+
+# End-to-end benchmark of the pipeline stages on synthetic Tyrol-like data.
+#
+#   python benchmark.py --scales 100 1000 10000
+#   python benchmark.py --scales 100 1000 --save-baseline
+#
+# Results are written to RESULTS_FILE. If a baseline exists, the run fails
+# (exit code 1) when a stage got slower than the baseline by more than --threshold.
+
+RESULTS_FILE = "Data/benchmarks/results.json"
+BASELINE_FILE = "Data/benchmarks/baseline.json"
+TYROL_BOUNDS = (10.1, 46.65, 12.97, 47.75)
+# ignore regressions smaller than this, timings of tiny stages are mostly noise
+MIN_REGRESSION_SECONDS = 0.05
+# how often the resident memory is sampled during the memory run
+RSS_SAMPLE_SECONDS = 0.002
+
+
+# -----------------------------SYNTHETIC DATA----------------------------------
+
+def generate_synthetic_data(n, seed=0):
+    """
+    Generate n peaks and Strava segments, n/2 webcams and n/20 protected areas.
+
+    Segments start near a random peak so the buffer aggregations find matches.
+    Strava segments are returned as API-like dicts with encoded polylines, as in
+    Data/segments2.json.
+    """
+    rng = np.random.default_rng(seed)
+    minx, miny, maxx, maxy = TYROL_BOUNDS
+
+    lon = rng.uniform(minx, maxx, n)
+    lat = rng.uniform(miny, maxy, n)
+    peaks = gpd.GeoDataFrame({
+        "name": [f"Peak {i}" for i in range(n)],
+        "ele": rng.uniform(1000, 3800, n).round().astype(int).astype(str),
+        "wikipedia_views": rng.lognormal(6, 1.5, n).round(),
+    }, geometry=gpd.points_from_xy(lon, lat), crs="EPSG:4326")
+
+    segments = []
+    start_peak = rng.integers(0, n, n)
+    n_vertices = rng.integers(5, 40, n)
+    created = pd.Timestamp("2010-01-01") + pd.to_timedelta(rng.integers(0, 5000, n), unit="D")
+    athletes = rng.integers(1, 5000, n)
+    for i in range(n):
+        steps = rng.normal(0, 0.0007, (n_vertices[i], 2)).cumsum(axis=0)
+        start = (lat[start_peak[i]] + rng.uniform(-0.04, 0.04), lon[start_peak[i]] + rng.uniform(-0.05, 0.05))
+        coords = [(start[0] + dy, start[1] + dx) for dy, dx in steps]
+        segments.append({
+            "id": i,
+            "name": f"Segment {i}",
+            "activity_type": "Ride",
+            "distance": float(n_vertices[i] * 80),
+            "athlete_count": int(athletes[i]),
+            "effort_count": int(athletes[i] * 3),
+            "created_at": created[i].strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "map": {"polyline": encode(coords)},
+        })
+
+    n_webcams = max(n // 2, 1)
+    webcam_lon = rng.uniform(minx, maxx, n_webcams)
+    webcam_lat = rng.uniform(miny, maxy, n_webcams)
+    webcams = gpd.GeoDataFrame({
+        "count": rng.poisson(2, n_webcams),
+        "lon": webcam_lon,
+        "lat": webcam_lat,
+    }, geometry=gpd.points_from_xy(webcam_lon, webcam_lat), crs="EPSG:4326")
+
+    n_protected = max(n // 20, 1)
+    centers = gpd.GeoSeries(gpd.points_from_xy(rng.uniform(minx, maxx, n_protected),
+                                               rng.uniform(miny, maxy, n_protected)), crs="EPSG:4326")
+    protected = gpd.GeoDataFrame({
+        "name": [f"Protected {i}" for i in range(n_protected)],
+        "protect_class": rng.choice(["4", "5"], n_protected),
+    }, geometry=centers.to_crs(32632).buffer(rng.uniform(1000, 10000, n_protected)).to_crs(4326))
+
+    return {"peaks": peaks, "segments": segments, "webcams": webcams, "protected": protected}
+
+
+# ---------------------------------STAGES--------------------------------------
+# Every stage is (name, setup, run): setup(ctx) prepares the arguments outside
+# of the measurement, run(*args) is measured and its result stored in ctx.
+
+def _setup_load_data(ctx):
+    peaks = ctx["peaks"].copy()
+    peaks["stress_score"] = ctx["scores"]["stress_score"].to_numpy()
+    peaks_path = os.path.join(ctx["tmpdir"], "peaks.gpkg")
+    protected_path = os.path.join(ctx["tmpdir"], "protected.gpkg")
+    peaks.to_file(peaks_path, layer="peaks", driver="GPKG")
+    ctx["protected"].to_file(protected_path, driver="GPKG")
+    ctx["dashboard_sources"] = (peaks_path, protected_path)
+    # no artifact directory: measure the GeoPackage fallback
+    return peaks_path, protected_path, None
+
+
+def _setup_load_artifact(ctx):
+    peaks_path, protected_path = ctx["dashboard_sources"]
+    artifact_dir = os.path.join(ctx["tmpdir"], "dashboard")
+    dashboard_data.build_dashboard_artifact(peaks_path, protected_path, artifact_dir)
+    return peaks_path, protected_path, artifact_dir
+
+
+def _setup_scores(ctx):
+    indicators = ctx["protected_peaks"][["wikipedia_views", "protect_class"]].copy()
+    indicators["avg_athlete_count_per_year"] = ctx["avg_athletes"].to_numpy()
+    indicators["people_on_webcams"] = ctx["webcam_people"].to_numpy()
+    return (indicators,)
+
+
+STAGES = [
+    ("polyline_conversion", lambda ctx: (ctx["segments"],), segments_to_gdf, "lines"),
+    ("protection_lookup", lambda ctx: (ctx["peaks"], ctx["protected"]), add_protect_class, "protected_peaks"),
+    ("strava_aggregation", lambda ctx: (ctx["protected_peaks"], ctx["lines"]), average_athletes_per_peak,
+     "avg_athletes"),
+    ("webcam_aggregation", lambda ctx: (ctx["protected_peaks"], ctx["webcams"]), sum_webcam_people_per_peak,
+     "webcam_people"),
+    ("scoring", _setup_scores, calculate_stress_scores, "scores"),
+    ("dashboard_load_data", _setup_load_data, dashboard_data.load_data, "dashboard"),
+    ("dashboard_load_artifact", _setup_load_artifact, dashboard_data.load_data, "dashboard"),
+]
+
+
+def release_free_memory():
+    """Return freed heap memory to the OS, so the next stage's allocations show up in the RSS."""
+    gc.collect()
+    pa.default_memory_pool().release_unused()
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        # not glibc, freed memory may be reused without raising the RSS
+        pass
+
+
+def peak_rss_growth(fn, args):
+    """
+    Peak growth of the process' resident memory while ``fn(*args)`` runs, in MB. Unlike
+    tracemalloc this includes native buffers (GEOS, Arrow, GDAL, numpy). None without
+    RSS readings.
+    """
+    release_free_memory()
+    start = rss_bytes()
+    if start is None:
+        fn(*args)
+        return None
+    peak = [start]
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(RSS_SAMPLE_SECONDS):
+            peak[0] = max(peak[0], rss_bytes())
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    try:
+        fn(*args)
+    finally:
+        done.set()
+        sampler.join()
+    return (max(peak[0], rss_bytes()) - start) / 2**20
+
+
+def measure(fn, args, repeat=1, memory=True):
+    """Best wall time over ``repeat`` runs and peak RSS growth of one extra run."""
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        times.append(time.perf_counter() - start)
+    peak_mb = peak_rss_growth(fn, args) if memory else None
+    return result, min(times), peak_mb
+
+
+def run_benchmark(scales, repeat=1, memory=True, seed=0):
+    results = {}
+    for n in scales:
+        print(f"📦 Generating {n:,} synthetic features...")
+        ctx = generate_synthetic_data(n, seed)
+        results[str(n)] = {}
+        with tempfile.TemporaryDirectory() as tmpdir:
+            ctx["tmpdir"] = tmpdir
+            for name, setup, fn, key in STAGES:
+                ctx[key], seconds, peak_mb = measure(fn, setup(ctx), repeat, memory)
+                results[str(n)][name] = {"seconds": round(seconds, 4),
+                                         "peak_rss_mb": round(peak_mb, 2) if peak_mb is not None else None}
+                mem = f"{peak_mb:10.1f} MB RSS" if peak_mb is not None else ""
+                print(f"  {name:<26}{seconds:10.3f} s{mem}")
+    return results
+
+
+def find_regressions(results, baseline, threshold):
+    """List of (scale, stage, seconds, baseline_seconds) slower than baseline * (1 + threshold)."""
+    regressions = []
+    for scale, stages in results.items():
+        for stage, entry in stages.items():
+            base = baseline.get(scale, {}).get(stage)
+            if base is None:
+                continue
+            limit = base["seconds"] * (1 + threshold)
+            if entry["seconds"] > limit and entry["seconds"] - base["seconds"] > MIN_REGRESSION_SECONDS:
+                regressions.append((scale, stage, entry["seconds"], base["seconds"]))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark pipeline stages on synthetic data.")
+    parser.add_argument("--scales", type=int, nargs="+", default=[100, 1000, 10000],
+                        help="number of peaks/segments per run (10^2 to 10^6)")
+    parser.add_argument("--repeat", type=int, default=1, help="timing runs per stage (best is kept)")
+    parser.add_argument("--no-memory", action="store_true", help="skip the memory (peak RSS) run")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown vs. baseline")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    results = run_benchmark(args.scales, args.repeat, not args.no_memory, args.seed)
+
+    os.makedirs(os.path.dirname(RESULTS_FILE), exist_ok=True)
+    with open(RESULTS_FILE, "w") as f:
+        json.dump({
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "results": results,
+        }, f, indent=2)
+    print(f"📁 Results saved to {RESULTS_FILE}")
+
+    if args.save_baseline:
+        with open(BASELINE_FILE, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"📁 Baseline saved to {BASELINE_FILE}")
+    elif os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE) as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline, args.threshold)
+        for scale, stage, seconds, base in regressions:
+            print(f"❌ {stage} at {scale}: {seconds:.3f} s vs. baseline {base:.3f} s")
+        if regressions:
+            sys.exit(1)
+        print("✅ No regressions against the baseline")
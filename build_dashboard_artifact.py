@@ -0,0 +1,8 @@
+from dashboard_data import build_dashboard_artifact, PEAKS_PATH, PROTECTED_PATH
+
+# Precompile the dashboard data so app.py does not have to parse and reproject
+# the GeoPackages on a cold start.
+
+if __name__ == '__main__':
+    peaks_file, protected_file = build_dashboard_artifact(PEAKS_PATH, PROTECTED_PATH)
+    print(f"📁 Dashboard artifact written: {peaks_file}, {protected_file}")
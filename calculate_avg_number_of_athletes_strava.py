@@ -1,46 +1,58 @@
-import geopandas as gpd
-
-# Load your layers (assuming they are in the same GeoPackage)
-perfect_gpkg = "Data/200_tyrol_mountains_wiki_protected.gpkg"
-
-# Read layers
-gdf_lines = gpd.read_file(perfect_gpkg, layer="strava_segments")
-gdf_points = gpd.read_file(perfect_gpkg, layer="peaks")
-
-# Reproject to a local UTM (metric) CRS
-# This uses the centroid of the lines to pick an appropriate UTM zone
-centroid = gdf_lines.unary_union.centroid
-utm_zone = int((centroid.x + 180) // 6) + 1
-utm_crs = f"EPSG:{32600 + utm_zone}"  # WGS84 / UTM northern hemisphere
-print("Using projected CRS:", utm_crs)
+import argparse
 
-gdf_lines = gdf_lines.to_crs(utm_crs)
-gdf_points = gdf_points.to_crs(utm_crs)
+import geopandas as gpd
+from dataset_store import read_layer, add_columns
+from tiled_aggregation import TILE_SIZE, WORKERS, tiled_aggregate
 
 # Create buffer in meters
 buffer_distance = 5000  # meters
-gdf_points['geometry_buffer'] = gdf_points.geometry.buffer(buffer_distance)
-gdf_points = gdf_points.drop(columns=["index_right"])
-# Spatial join
-joined = gpd.sjoin(
-    gpd.GeoDataFrame(gdf_lines, geometry=gdf_lines.geometry),
-    gpd.GeoDataFrame(gdf_points, geometry='geometry_buffer'),
-    how='inner',
-    predicate='intersects'
-)
-
-# Average athlete_count_per_year per point
-avg_per_point = joined.groupby('index_right')['athlete_count_per_year'].mean()
-
-# Add back to points GeoDataFrame
-gdf_points['avg_athlete_count_per_year'] = gdf_points.index.map(avg_per_point)
-
-# Drop temporary buffer
-gdf_points = gdf_points.drop(columns=['geometry_buffer'])
-
-# Reproject back to WGS84 if needed
-gdf_points = gdf_points.to_crs("EPSG:4326")
-
-# Save updated points layer to GeoPackage
-gdf_points.to_file("points_with_avg.gpkg", layer="peaks", driver="GPKG")
-gdf_lines.to_file("points_with_avg.gpkg", layer="strava_segments", driver="GPKG")
\ No newline at end of file
+
+
+def average_athletes_per_peak(gdf_points, gdf_lines, buffer_distance=buffer_distance, tile_size=None, workers=WORKERS):
+    """
+    Mean athlete_count_per_year of all segments within buffer_distance of each peak.
+    With ``tile_size`` (meters) the join runs tile by tile in a process pool (tiled_aggregation.py).
+    """
+    # Reproject to a local UTM (metric) CRS
+    # This uses the centroid of the lines to pick an appropriate UTM zone
+    centroid = gdf_lines.to_crs("EPSG:4326").union_all().centroid
+    utm_zone = int((centroid.x + 180) // 6) + 1
+    utm_crs = f"EPSG:{32600 + utm_zone}"  # WGS84 / UTM northern hemisphere
+    print("Using projected CRS:", utm_crs)
+
+    gdf_lines = gdf_lines.to_crs(utm_crs)
+    gdf_points = gdf_points.to_crs(utm_crs)
+
+    if tile_size:
+        avg_per_point = tiled_aggregate(gdf_points, gdf_lines, 'athlete_count_per_year', 'mean',
+                                        buffer_distance, 'intersects', tile_size, workers)
+        return gdf_points.index.map(avg_per_point)
+
+    buffers = gpd.GeoDataFrame(geometry=gdf_points.geometry.buffer(buffer_distance), crs=gdf_points.crs)
+    # Spatial join
+    joined = gpd.sjoin(
+        gpd.GeoDataFrame(gdf_lines, geometry=gdf_lines.geometry),
+        buffers,
+        how='inner',
+        predicate='intersects'
+    )
+
+    # Average athlete_count_per_year per point
+    avg_per_point = joined.groupby('index_right')['athlete_count_per_year'].mean()
+    return gdf_points.index.map(avg_per_point)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Mean Strava athletes per year around each peak.")
+    parser.add_argument("--tiled", action="store_true", help="join tile by tile in a process pool")
+    parser.add_argument("--tile-size", type=float, default=TILE_SIZE, help="tile size in meters")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    args = parser.parse_args()
+
+    # Read only the columns needed from the dataset store
+    gdf_lines = read_layer("strava_segments", columns=["athlete_count_per_year"])
+    gdf_points = read_layer("peaks", columns=[])
+
+    # Add the new column to the peaks layer, nothing else is rewritten
+    add_columns("peaks", {"avg_athlete_count_per_year": average_athletes_per_peak(
+        gdf_points, gdf_lines, tile_size=args.tile_size if args.tiled else None, workers=args.workers)})
@@ -1,14 +1,26 @@
-import geopandas as gpd
+import argparse
+import hashlib
+import json
+
 import numpy as np
-# Load your layers (assuming they are in the same GeoPackage)
-perfect_gpkg = "peaks_strava_wiki_web.gpkg"
+import pandas as pd
+from dataset_store import read_layer, add_columns, export_gpkg
+import stress_history
 
-# Read layers
-gdf_lines = gpd.read_file(perfect_gpkg, layer="strava_segments")
-gdf_webcams = gpd.read_file(perfect_gpkg, layer="webcams")
-gdf_points = gpd.read_file(perfect_gpkg, layer="peaks")
+# GeoPackage read by the dashboard (app.py)
+final_gpkg = "Data/200_tyrol_mountains_final_stress_score.gpkg"
 
-import pandas as pd
+# "buffer": hard 5000 m buffer indicators
+# "kernel": distance-decay indicators from kernel_aggregation.py
+AGGREGATION_MODE = "buffer"
+INDICATOR_COLUMNS = {
+    "buffer": {"strava": "avg_athlete_count_per_year", "webcam": "people_on_webcams"},
+    "kernel": {"strava": "kernel_athlete_count_per_year", "webcam": "kernel_people_on_webcams"},
+}
+
+PROTECT_THRESHOLDS = {0: 0.9, 4: 0.7, 5: 0.6}
+# weights of the wiki, strava and webcam popularity measures
+POPULARITY_WEIGHTS = (1.0, 1.0, 1.0)
 
 
 def weighted_mean_columns(gdf, columns, weights=None, result_col="weighted_sum"):
@@ -38,39 +50,167 @@ def weighted_mean_columns(gdf, columns, weights=None, result_col="weighted_sum")
         if len(weights) != len(columns):
             raise ValueError("Length of weights must match length of columns")
 
-    def weighted_row(row):
-        vals = [row[c] for c in columns if pd.notnull(row[c])]
-        if not vals:
-            return np.nan
-        if weights is None:
-            w = [1 / len(vals)] * len(vals)
-        else:
-            # normalize weights but only for non-null columns
-            valid_weights = [w for c, w in zip(columns, weights) if pd.notnull(row[c])]
-            s = sum(valid_weights)
-            w = [vw / s for vw in valid_weights]
-        return np.dot(vals, w)
-
-    df[result_col] = df.apply(weighted_row, axis=1)
+    df[result_col] = weighted_mean(df[columns].to_numpy(dtype=float), weights)
     return df
 
 
-# higher score is more popularity
-gdf_points["wikipedia_views"]= np.log( gdf_points["wikipedia_views"] )
-gdf_points["avg_athlete_count_per_year"]= np.log( gdf_points["avg_athlete_count_per_year"] )
-gdf_points["wiki_pop_measure"] = gdf_points["wikipedia_views"] / gdf_points["wikipedia_views"].max()
-gdf_points["strava_pop_measure"] = gdf_points["avg_athlete_count_per_year"] / gdf_points["avg_athlete_count_per_year"].max()
-gdf_points.loc[gdf_points["people_on_webcams"] == 0, "people_on_webcams"] = np.nan
-gdf_points["webcam_pop_measure"] = gdf_points["people_on_webcams"] / gdf_points["people_on_webcams"].max()
-gdf_points = weighted_mean_columns(gdf_points, ["wiki_pop_measure", "strava_pop_measure", "webcam_pop_measure"],
-                                   result_col="gdf_total_popularity_score")
+def weighted_mean(values, weights=None):
+    """
+    Vectorized row-wise weighted mean of a 2-d array over its non-null entries.
+
+    The weights of every row are normalized over the columns that are not null
+    in that row; rows without any value (or with zero total weight) are NaN.
+    """
+    values = np.asarray(values, dtype=float)
+    weights = np.ones(values.shape[1]) if weights is None else np.asarray(weights, dtype=float)
+    valid = ~np.isnan(values)
+    total_weight = valid @ weights
+    with np.errstate(invalid="ignore", divide="ignore"):
+        result = np.where(valid, values, 0.0) @ weights / total_weight
+    result[total_weight == 0] = np.nan
+    return result
+
+
+def scoring_fingerprint(aggregation_mode=AGGREGATION_MODE):
+    """Hash of the scoring configuration; scores of a run with another configuration are stale."""
+    config = {
+        "aggregation_mode": aggregation_mode,
+        "indicators": INDICATOR_COLUMNS[aggregation_mode],
+        "protect_thresholds": {str(k): v for k, v in sorted(PROTECT_THRESHOLDS.items())},
+        "weights": list(POPULARITY_WEIGHTS),
+    }
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def _popularity_inputs(gdf_points, aggregation_mode):
+    strava_col = INDICATOR_COLUMNS[aggregation_mode]["strava"]
+    webcam_col = INDICATOR_COLUMNS[aggregation_mode]["webcam"]
+    log_wiki = np.log(gdf_points["wikipedia_views"])
+    log_strava = np.log(gdf_points[strava_col])
+    webcams = gdf_points[webcam_col].where(gdf_points[webcam_col] != 0)
+    return log_wiki, log_strava, webcams
+
+
+def normalization_maxima(gdf_points, aggregation_mode=AGGREGATION_MODE):
+    """Dataset-wide maxima the popularity measures are divided by."""
+    return tuple(float(v.max()) for v in _popularity_inputs(gdf_points, aggregation_mode))
+
+
+def calculate_stress_scores(gdf_points, aggregation_mode=AGGREGATION_MODE, maxima=None):
+    """
+    Normalize the popularity indicators and derive the stress score per peak.
+
+    ``maxima`` (see normalization_maxima) lets a subset of the peaks be scored
+    against the maxima of the whole dataset.
+    """
+    scores = pd.DataFrame(index=gdf_points.index)
+
+    # higher score is more popularity
+    log_wiki, log_strava, webcams = _popularity_inputs(gdf_points, aggregation_mode)
+    max_wiki, max_strava, max_webcams = maxima or normalization_maxima(gdf_points, aggregation_mode)
+    scores["wiki_pop_measure"] = log_wiki / max_wiki
+    scores["strava_pop_measure"] = log_strava / max_strava
+    scores["webcam_pop_measure"] = webcams / max_webcams
+    scores = weighted_mean_columns(scores, ["wiki_pop_measure", "strava_pop_measure", "webcam_pop_measure"],
+                                   weights=list(POPULARITY_WEIGHTS), result_col="gdf_total_popularity_score")
+
+    scores["protect_threshold"] = gdf_points["protect_class"].map(PROTECT_THRESHOLDS)
+
+    scores["stress_score"] = scores["gdf_total_popularity_score"] - scores["protect_threshold"]
+    return scores
+
+
+def history_values(gdf_points, scores, aggregation_mode=AGGREGATION_MODE):
+    """Indicators (under the generic names of stress_history) and scores per peak id."""
+    indicators = INDICATOR_COLUMNS[aggregation_mode]
+    values = pd.DataFrame({
+        stress_history.KEY_COL: gdf_points["id"].to_numpy(),
+        "wikipedia_views": gdf_points["wikipedia_views"].to_numpy(),
+        "strava_indicator": gdf_points[indicators["strava"]].to_numpy(),
+        "webcam_indicator": gdf_points[indicators["webcam"]].to_numpy(),
+        "protect_class": gdf_points["protect_class"].to_numpy(),
+    })
+    for col in stress_history.SCORE_COLUMNS:
+        values[col] = scores[col].to_numpy()
+    return values
+
+
+def incremental_stress_scores(gdf_points, previous, aggregation_mode=AGGREGATION_MODE):
+    """
+    Score only the peaks whose indicators changed since the previous run.
+
+    Unchanged peaks keep their previous scores, unless a dataset-wide maximum
+    changed - then every peak is rescored.
+
+    Parameters
+    ----------
+    gdf_points : DataFrame
+        Indicator columns and ``id`` of all peaks.
+    previous : DataFrame
+        stress_history.load_latest() of the last run.
+
+    Returns
+    -------
+    tuple
+        (scores DataFrame in the order of gdf_points, number of rescored peaks)
+    """
+    indicators = INDICATOR_COLUMNS[aggregation_mode]
+    maxima = normalization_maxima(gdf_points, aggregation_mode)
+    previous_points = previous.rename(columns={"strava_indicator": indicators["strava"],
+                                               "webcam_indicator": indicators["webcam"]})
+    if normalization_maxima(previous_points, aggregation_mode) != maxima:
+        return calculate_stress_scores(gdf_points, aggregation_mode, maxima), len(gdf_points)
+
+    current = history_values(gdf_points, pd.DataFrame(np.nan, index=gdf_points.index,
+                                                      columns=stress_history.SCORE_COLUMNS), aggregation_mode)
+    current = current.set_index(stress_history.KEY_COL)
+    changed = ~stress_history.unchanged_rows(current, previous, stress_history.INDICATOR_COLUMNS).to_numpy()
+
+    scores = previous.reindex(gdf_points["id"])[stress_history.SCORE_COLUMNS]
+    scores.index = gdf_points.index
+    if changed.any():
+        scores.loc[changed] = calculate_stress_scores(gdf_points[changed], aggregation_mode, maxima)[
+            stress_history.SCORE_COLUMNS]
+    return scores, int(changed.sum())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Calculate the stress scores and record them in the history.")
+    parser.add_argument("--full", action="store_true", help="rescore every peak, even unchanged ones")
+    parser.add_argument("--run-date", help="ISO date the run is recorded under (default: today)")
+    args = parser.parse_args()
+    # before anything is written: a run dated before the last one cannot be recorded
+    try:
+        run_date = stress_history.check_run_date(args.run_date)
+    except ValueError as e:
+        parser.error(str(e))
+    fingerprint = scoring_fingerprint()
+
+    # Read only the indicator columns, no geometry is needed for scoring
+    indicators = INDICATOR_COLUMNS[AGGREGATION_MODE]
+    gdf_points = read_layer(
+        "peaks",
+        columns=["id", "wikipedia_views", indicators["strava"], indicators["webcam"], "protect_class"],
+        geometry=False,
+    )
+
+    previous = None
+    last_run = stress_history.last_run()
+    if not args.full and last_run and last_run.get("scoring") == fingerprint:
+        previous = stress_history.load_latest()
+    elif last_run and not args.full:
+        print("Scoring configuration changed since the last run, rescoring every peak")
+    if previous is None:
+        scores, rescored = calculate_stress_scores(gdf_points), len(gdf_points)
+    else:
+        scores, rescored = incremental_stress_scores(gdf_points, previous)
 
-mapping = {0: 0.9, 4: 0.7, 5: 0.6}
-gdf_points["protect_threshold"] = gdf_points["protect_class"].map(mapping)
+    # Add only the score columns to the peaks layer
+    add_columns("peaks", scores)
 
-gdf_points["stress_score"] = gdf_points["gdf_total_popularity_score"] - gdf_points["protect_threshold"]
+    # Refresh the peaks layer of the dashboard GeoPackage
+    export_gpkg("peaks", final_gpkg)
 
-# Save updated points layer to GeoPackage
-gdf_webcams.to_file("200_tyrol_mountains_final_stress_score.gpkg", layer="webcams", driver="GPKG")
-gdf_points.to_file("200_tyrol_mountains_final_stress_score.gpkg", layer="peaks", driver="GPKG")
-gdf_lines.to_file("200_tyrol_mountains_final_stress_score.gpkg", layer="strava_segments", driver="GPKG")
\ No newline at end of file
+    changed = stress_history.record_run(history_values(gdf_points, scores), run_date, scoring=fingerprint)
+    print(f"✅ Scored {len(gdf_points)} peaks ({rescored} rescored), exported to {final_gpkg}")
+    print(f"📈 {changed} changed peaks recorded in {stress_history.HISTORY_DIR}")
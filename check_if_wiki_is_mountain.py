@@ -1,13 +1,27 @@
+import argparse
+import os
 import requests
 import geopandas as gpd
 from urllib.parse import quote
 from tqdm import tqdm
+from crawl_metrics import CrawlMetrics
+from wikidata_dump import WikidataLookup
 
 # --- Settings ---
 HEADERS = {"User-Agent": "TyrolPeaksBot/1.0 (contact: your_email@example.com)"}
 LANG = "de"
 TYROL_QID = "Q42880"  # Tyrol region
 MOUNTAIN_QIDS = ["Q8502", "Q271669", "Q8072"]  # mountain, natural feature, volcano
+WIKIPEDIA_API_URL = os.environ.get("WIKIPEDIA_API_URL", "https://{lang}.wikipedia.org/w/api.php")
+WIKIDATA_ENTITY_URL = os.environ.get("WIKIDATA_ENTITY_URL", "https://www.wikidata.org/wiki/Special:EntityData")
+
+parser = argparse.ArgumentParser(description="Check which Wikipedia peaks are mountains located in Tyrol.")
+parser.add_argument("--lookup", help="offline lookup built by wikidata_dump.py instead of the Wikidata API "
+                                     "(region membership through all P131 levels)")
+args = parser.parse_args()
+lookup = WikidataLookup(args.lookup) if args.lookup else None
+
+metrics = CrawlMetrics("wikidata_check")
 
 # --- Load data ---
 gdf = gpd.read_file("./Data/tyrol_peaks_wiki_seq.gpkg")
@@ -19,14 +33,19 @@ gdf_top = gdf.sort_values("wikipedia_views", ascending=False).copy()
 
 def get_wikidata_entity(title, lang="de"):
     """Get Wikidata entity ID from a Wikipedia title."""
-    url = f"https://{lang}.wikipedia.org/w/api.php?action=query&titles={quote(title)}&prop=pageprops&format=json"
+    url = f"{WIKIPEDIA_API_URL.format(lang=lang)}?action=query&titles={quote(title)}&prop=pageprops&format=json"
     try:
-        r = requests.get(url, headers=HEADERS, timeout=10)
+        r = metrics.get("wikipedia", "pageprops", url, headers=HEADERS, timeout=10)
         r.raise_for_status()
         pages = r.json().get("query", {}).get("pages", {})
-        return next(iter(pages.values())).get("pageprops", {}).get("wikibase_item")
-    except Exception:
+        wikidata_id = next(iter(pages.values()), {}).get("pageprops", {}).get("wikibase_item")
+    except (requests.RequestException, ValueError, AttributeError) as e:
+        metrics.error("wikipedia", "pageprops", e)
+        metrics.drop("wikipedia", "pageprops", "error")
         return None
+    if not wikidata_id:
+        metrics.drop("wikipedia", "pageprops", "no_wikidata_item")
+    return wikidata_id
 
 
 def check_mountain_and_tyrol(wikidata_id):
@@ -34,9 +53,9 @@ def check_mountain_and_tyrol(wikidata_id):
     if not wikidata_id:
         return (False, False)
 
-    url = f"https://www.wikidata.org/wiki/Special:EntityData/{wikidata_id}.json"
+    url = f"{WIKIDATA_ENTITY_URL}/{wikidata_id}.json"
     try:
-        r = requests.get(url, headers=HEADERS, timeout=10)
+        r = metrics.get("wikidata", "entity", url, headers=HEADERS, timeout=10)
         r.raise_for_status()
         entities = r.json().get("entities", {})
         entity = entities.get(wikidata_id, {})
@@ -61,7 +80,10 @@ def check_mountain_and_tyrol(wikidata_id):
 
         return (is_mountain, in_tyrol)
 
-    except Exception:
+    except (requests.RequestException, ValueError, KeyError, TypeError) as e:
+        # counted in the metrics, the peak is treated as not verified
+        metrics.error("wikidata", "entity", e)
+        metrics.drop("wikidata", "entity", "error")
         return (False, False)
 
 
@@ -78,10 +100,13 @@ for _, row in tqdm(gdf_top.iterrows(), total=len(gdf_top)):
         in_tyrol_flags.append(False)
         continue
 
-    wikidata_id = get_wikidata_entity(name, lang=LANG)
+    if lookup:
+        wikidata_id = lookup.qid_for_title(name)
+        is_mountain, in_tyrol = lookup.is_mountain(wikidata_id), lookup.in_region(wikidata_id, TYROL_QID)
+    else:
+        wikidata_id = get_wikidata_entity(name, lang=LANG)
+        is_mountain, in_tyrol = check_mountain_and_tyrol(wikidata_id)
     wikidata_ids.append(wikidata_id)
-
-    is_mountain, in_tyrol = check_mountain_and_tyrol(wikidata_id)
     is_mountain_flags.append(is_mountain)
     in_tyrol_flags.append(in_tyrol)
 
@@ -89,9 +114,8 @@ for _, row in tqdm(gdf_top.iterrows(), total=len(gdf_top)):
 gdf_top["wikidata_id"] = wikidata_ids
 gdf_top["is_mountain"] = is_mountain_flags
 gdf_top["in_tyrol"] = in_tyrol_flags
-gdf_filtered = gdf_top[(gdf_top["is_mountain"] == True) & (gdf_top["in_tyrol"] == True)].copy()
-# --- Save results ---
-gdf_filtered.to_file("top_tyrol_mountains.gpkg", driver="GPKG")
+# --- Save results (filtered by filter_only_ones_in_tirol_and_mountains.py) ---
+gdf_top.to_file("./Data/tyrol_peaks_top200_wikidata.gpkg", driver="GPKG")
 
-print(f"✅ Done: Saved Wikidata checks for {len(gdf_filtered)} peaks.")
-print("📁 Output: tyrol_peaks_top200_wikidata.gpkg")
+print(f"✅ Done: Saved Wikidata checks for {len(gdf_top)} peaks.")
+print("📁 Output: ./Data/tyrol_peaks_top200_wikidata.gpkg")
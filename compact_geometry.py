@@ -0,0 +1,153 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import geopandas as gpd
+import numpy as np
+import pyarrow as pa
+import shapely
+
+import dataset_store
+
+# Compact encoding of LineString layers for the dataset store.
+#
+# Geometries are projected to a metric CRS, optionally simplified (topology
+# preserving) and snapped to a fixed precision. Every line is then stored as two
+# int32 list columns: the first vertex in precision units, the following vertices
+# as deltas to the previous one. Small integers compress far better than WKB
+# doubles, and decoding is a single cumulative sum over all vertices.
+#
+# Accuracy: snapping moves a vertex by at most precision / sqrt(2), simplification
+# keeps the line within its tolerance, so the distance to the original line is at
+# most simplify + precision / sqrt(2). Strava polylines are encoded at 1e-5 degrees
+# (~1.1 m), so the default 1 m precision without simplification keeps their accuracy.
+#
+#   python compact_geometry.py              size / load time / error report for strava_segments
+#
+# The error is measured against the layer as stored, so write it with
+# convert_strava_lines_to_json.py --full-precision first for the real accuracy loss.
+
+COMPACT_CRS = "EPSG:3035"
+DEFAULT_PRECISION = 1.0  # meters
+X_COL = "geometry_dx"
+Y_COL = "geometry_dy"
+METADATA_KEY = b"compact_geometry"
+REPORT_FILE = "Data/benchmarks/geometry_report.json"
+
+
+def compact_lines(geometries, crs, precision=DEFAULT_PRECISION, simplify=None):
+    """Project, simplify and snap lines. Returns a GeoSeries in COMPACT_CRS."""
+    lines = gpd.GeoSeries(geometries, crs=crs).to_crs(COMPACT_CRS)
+    if simplify:
+        lines = lines.simplify(simplify, preserve_topology=True)
+    # snapping also drops vertices that collapse onto their neighbour
+    return gpd.GeoSeries(shapely.set_precision(lines.to_numpy(), precision), index=lines.index, crs=COMPACT_CRS)
+
+
+def encode_lines(geometries, precision=DEFAULT_PRECISION):
+    """
+    Delta-encode metric LineStrings (already snapped to ``precision``).
+
+    Returns
+    -------
+    tuple
+        (x ListArray, y ListArray) of int32, empty lists for missing or empty geometries.
+    """
+    geometries = np.asarray(geometries, dtype=object)
+    coords, line_ids = shapely.get_coordinates(geometries, return_index=True)
+    q = np.round(coords / precision).astype(np.int64)
+
+    counts = np.bincount(line_ids, minlength=len(geometries))
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    deltas = np.diff(q, axis=0, prepend=np.zeros((1, 2), dtype=np.int64))
+    starts = offsets[:-1][counts > 0]
+    deltas[starts] = q[starts]
+    if len(deltas) and np.abs(deltas).max() > np.iinfo(np.int32).max:
+        raise ValueError("Coordinates do not fit int32 at this precision")
+
+    offsets = pa.array(offsets.astype(np.int32))
+    return (pa.ListArray.from_arrays(offsets, pa.array(deltas[:, 0].astype(np.int32))),
+            pa.ListArray.from_arrays(offsets, pa.array(deltas[:, 1].astype(np.int32))))
+
+
+def decode_lines(x_lists, y_lists, precision=DEFAULT_PRECISION):
+    """Inverse of encode_lines(): numpy array of LineStrings (None where the list is empty)."""
+    x_lists = pa.chunked_array(x_lists).combine_chunks() if not isinstance(x_lists, pa.ListArray) else x_lists
+    y_lists = pa.chunked_array(y_lists).combine_chunks() if not isinstance(y_lists, pa.ListArray) else y_lists
+    offsets = x_lists.offsets.to_numpy()
+    counts = np.diff(offsets)
+
+    # absolute start + deltas: cumulative sum over everything, minus the sum before each line
+    xy = np.column_stack([x_lists.values.to_numpy(), y_lists.values.to_numpy()]).astype(np.int64)
+    total = np.cumsum(xy, axis=0)
+    before = np.vstack([np.zeros((1, 2), dtype=np.int64), total])[offsets[:-1]]
+    coords = (total - np.repeat(before, counts, axis=0)) * precision
+
+    result = np.full(len(counts), None, dtype=object)
+    valid = counts >= 2
+    line_ids = np.repeat(np.arange(len(counts)), counts)
+    keep = valid[line_ids]
+    if keep.any():
+        result[valid] = shapely.linestrings(coords[keep], indices=np.repeat(np.arange(valid.sum()), counts[valid]))
+    return result
+
+
+def geometry_table(gdf, precision=DEFAULT_PRECISION, simplify=None):
+    """Attributes plus the encoded geometry as an arrow table, with the decoding parameters in the schema."""
+    lines = compact_lines(gdf.geometry, gdf.crs, precision, simplify)
+    x_lists, y_lists = encode_lines(lines.to_numpy(), precision)
+    table = pa.Table.from_pandas(gdf.drop(columns=gdf.geometry.name).reset_index(drop=True), preserve_index=False)
+    table = table.append_column(X_COL, x_lists).append_column(Y_COL, y_lists)
+    meta = {"crs": COMPACT_CRS, "precision": precision, "simplify": simplify}
+    return table.replace_schema_metadata({**(table.schema.metadata or {}), METADATA_KEY: json.dumps(meta).encode()})
+
+
+def read_compact_geometry(table, metadata):
+    """GeoSeries decoded from a table holding the encoded columns."""
+    meta = json.loads(metadata[METADATA_KEY])
+    geometries = decode_lines(table.column(X_COL), table.column(Y_COL), meta["precision"])
+    return gpd.GeoSeries(geometries, crs=meta["crs"])
+
+
+def geometry_report(gdf, precision=DEFAULT_PRECISION, simplify=None, repeat=3):
+    """Size, load time and maximum error of the compact encoding vs. plain GeoParquet (WKB)."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        dataset_store.write_layer(gdf, "plain", tmpdir)
+        dataset_store.write_layer(gdf, "compact", tmpdir, precision=precision, simplify=simplify)
+
+        report = {"segments": len(gdf), "precision_m": precision, "simplify_m": simplify}
+        for name in ("plain", "compact"):
+            path = os.path.join(tmpdir, name, dataset_store.BASE_FILE)
+            times = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                lines = dataset_store.read_layer(name, columns=[], store_dir=tmpdir)
+                times.append(time.perf_counter() - start)
+            report[name] = {"bytes": os.path.getsize(path), "load_seconds": round(min(times), 4),
+                            "vertices": int(shapely.get_num_coordinates(lines.geometry.to_numpy()).sum())}
+            if name == "compact":
+                compact = lines.geometry
+        original = gdf.geometry.to_crs(COMPACT_CRS).reset_index(drop=True)
+        valid = compact.notna().to_numpy()
+        errors = shapely.hausdorff_distance(original.to_numpy()[valid], compact.to_numpy()[valid])
+        report["max_error_m"] = round(float(errors.max()), 3) if len(errors) else 0.0
+        report["size_ratio"] = round(report["compact"]["bytes"] / report["plain"]["bytes"], 3)
+        report["load_time_ratio"] = round(report["compact"]["load_seconds"] / report["plain"]["load_seconds"], 3)
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Report size, load time and error of the compact geometry encoding.")
+    parser.add_argument("--layer", default="strava_segments")
+    parser.add_argument("--precision", type=float, default=DEFAULT_PRECISION, help="coordinate precision in meters")
+    parser.add_argument("--simplify", type=float, help="simplification tolerance in meters")
+    args = parser.parse_args()
+
+    report = geometry_report(dataset_store.read_layer(args.layer), args.precision, args.simplify)
+    print(json.dumps(report, indent=2))
+    os.makedirs(os.path.dirname(REPORT_FILE), exist_ok=True)
+    with open(REPORT_FILE, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"📁 Report saved to {REPORT_FILE}")
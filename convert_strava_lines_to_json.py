@@ -1,68 +1,94 @@
+import argparse
 import json
 import geopandas as gpd
 from shapely.geometry import LineString
 from polyline import decode  # pip install polyline
 import pandas as pd
+from dataset_store import write_layer
 
+segments_path = "./Data/segments2.json"
 
-perfect_gpkg = "Data/200_tyrol_mountains_wiki_protected.gpkg"
-# Load your JSON
-with open("./Data/segments2.json") as f:
-    data = json.load(f)
-
-features = []
-for seg in data:
-    poly = seg.get("map", {}).get("polyline")
-    if not poly:
-        continue
-
-    # Decode polyline -> list of (lat, lon)
-    coords = decode(poly)
-    print(coords)
-    # polyline returns (lat, lon) but shap ely wants (lon, lat)
-    line = LineString([(lon, lat) for lat, lon in coords])
-
-    features.append({
-        "id": seg["id"],
-        "name": seg.get("name"),
-        "activity_type": seg.get("activity_type"),
-        "distance": seg.get("distance"),
-        "city": seg.get("city"),
-        "state": seg.get("state"),
-        "country": seg.get("country"),
-        "effort_count": seg.get("effort_count"),
-        "athlete_count": seg.get("athlete_count"),
-        "star_count": seg.get("star_count"),
-        "start_latlng": seg.get("start_latlng"),
-        "end_latlng": seg.get("end_latlng"),
-        "created_at": seg.get("created_at"),
-        "updated_at": seg.get("updated_at"),
-        "geometry": line
-    })
-
-# Convert to GeoDataFrame
-gdf = gpd.GeoDataFrame(features, crs="EPSG:4326")
-# Parse the dates
-gdf['created_at'] = pd.to_datetime(gdf['created_at'])
-
-if gdf["created_at"].dt.tz is None:
-    # created_at is tz-naive
-    now = pd.Timestamp.now(tz=None)
-else:
-    # created_at is tz-aware
-    now = pd.Timestamp.now(tz=gdf["created_at"].dt.tz)
-# Calculate timespan in years
-gdf['timespan_years'] = (now - gdf['created_at']).dt.total_seconds() / (365.25 * 24 * 3600)
-
-# Avoid division by zero (if created_at == updated_at)
-gdf['timespan_years'] = gdf['timespan_years'].replace(0, 1/365.25)  # assume 1 day if zero
-
-# Calculate athlete_count_per_year
-gdf['athlete_count_per_year'] = gdf['athlete_count'] / gdf['timespan_years']
-
-# Optional: round to 2 decimals
-gdf['athlete_count_per_year'] = gdf['athlete_count_per_year'].round(2)
-# Write to GeoPackage
-gdf.to_file(perfect_gpkg, layer="strava_segments", driver="GPKG")
-
-print(f"Wrote {len(gdf)} LineStrings to 'segments.gpkg'")
\ No newline at end of file
+# Segment geometry is stored compact in the dataset store (see compact_geometry.py):
+# snapped to GEOMETRY_PRECISION meters, simplified by GEOMETRY_SIMPLIFY meters if set.
+# 1 m keeps the ~1 m accuracy of Strava's encoded polylines.
+GEOMETRY_PRECISION = 1.0
+GEOMETRY_SIMPLIFY = None
+
+
+def segments_to_gdf(data):
+    """Convert Strava segment detail responses to a LineString GeoDataFrame."""
+    features = []
+    for seg in data:
+        poly = seg.get("map", {}).get("polyline")
+        if not poly:
+            continue
+
+        # Decode polyline -> list of (lat, lon)
+        coords = decode(poly)
+        # polyline returns (lat, lon) but shap ely wants (lon, lat)
+        line = LineString([(lon, lat) for lat, lon in coords])
+
+        features.append({
+            "id": seg["id"],
+            "name": seg.get("name"),
+            "activity_type": seg.get("activity_type"),
+            "distance": seg.get("distance"),
+            "city": seg.get("city"),
+            "state": seg.get("state"),
+            "country": seg.get("country"),
+            "effort_count": seg.get("effort_count"),
+            "athlete_count": seg.get("athlete_count"),
+            "star_count": seg.get("star_count"),
+            "start_latlng": seg.get("start_latlng"),
+            "end_latlng": seg.get("end_latlng"),
+            "created_at": seg.get("created_at"),
+            "updated_at": seg.get("updated_at"),
+            "geometry": line
+        })
+
+    # Convert to GeoDataFrame
+    gdf = gpd.GeoDataFrame(features, crs="EPSG:4326")
+    # Parse the dates
+    gdf['created_at'] = pd.to_datetime(gdf['created_at'])
+
+    if gdf["created_at"].dt.tz is None:
+        # created_at is tz-naive
+        now = pd.Timestamp.now(tz=None)
+    else:
+        # created_at is tz-aware
+        now = pd.Timestamp.now(tz=gdf["created_at"].dt.tz)
+    # Calculate timespan in years
+    gdf['timespan_years'] = (now - gdf['created_at']).dt.total_seconds() / (365.25 * 24 * 3600)
+
+    # Avoid division by zero (if created_at == updated_at)
+    gdf['timespan_years'] = gdf['timespan_years'].replace(0, 1/365.25)  # assume 1 day if zero
+
+    # Calculate athlete_count_per_year
+    gdf['athlete_count_per_year'] = gdf['athlete_count'] / gdf['timespan_years']
+
+    # Optional: round to 2 decimals
+    gdf['athlete_count_per_year'] = gdf['athlete_count_per_year'].round(2)
+    return gdf
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Convert the Strava segment responses to the strava_segments layer.")
+    parser.add_argument("--precision", type=float, default=GEOMETRY_PRECISION,
+                        help="coordinate precision in meters")
+    parser.add_argument("--simplify", type=float, default=GEOMETRY_SIMPLIFY,
+                        help="topology-preserving simplification tolerance in meters")
+    parser.add_argument("--full-precision", action="store_true", help="store plain WKB geometry instead")
+    args = parser.parse_args()
+
+    # Load your JSON
+    with open(segments_path) as f:
+        data = json.load(f)
+
+    gdf = segments_to_gdf(data)
+    # Write to the dataset store
+    if args.full_precision:
+        write_layer(gdf, "strava_segments")
+    else:
+        write_layer(gdf, "strava_segments", precision=args.precision, simplify=args.simplify)
+
+    print(f"Wrote {len(gdf)} LineStrings to layer 'strava_segments'")
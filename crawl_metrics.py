@@ -0,0 +1,171 @@
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime
+
+import requests
+
+# Shared instrumentation for the crawlers (retrieve.py, add_wiki_frequency_add_trends.py,
+# check_if_wiki_is_mountain.py, image_classification.py).
+#
+# Per source and endpoint it counts requests, status codes, bytes, a latency
+# histogram, retries, seconds slept on Retry-After / throttling, cache hits,
+# errors by exception type and dropped results (requests that ended without data).
+#
+# A one-line summary is printed every SUMMARY_INTERVAL seconds while crawling, and
+# the full metrics are written as JSON to METRICS_DIR when the crawl ends:
+#
+#   metrics = CrawlMetrics("strava_crawl")
+#   r = metrics.get("strava", "segments/{id}", url, headers=HEADERS)
+
+METRICS_DIR = "Data/logs/crawl_metrics"
+SUMMARY_INTERVAL = 10  # seconds
+# upper bounds of the latency histogram buckets in seconds (last bucket is open)
+LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+
+
+class EndpointMetrics:
+    def __init__(self):
+        self.requests = 0
+        self.status = defaultdict(int)
+        self.bytes = 0
+        self.seconds = 0.0
+        self.latency = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.retries = 0
+        self.sleep_seconds = 0.0
+        self.cache_hits = 0
+        self.errors = defaultdict(int)
+        self.dropped = defaultdict(int)
+
+    def to_dict(self):
+        return {
+            "requests": self.requests,
+            "status": {str(k): v for k, v in sorted(self.status.items(), key=lambda kv: str(kv[0]))},
+            "bytes": self.bytes,
+            "request_seconds": round(self.seconds, 3),
+            "latency_histogram": {(f"<={b}" if b is not None else f">{LATENCY_BUCKETS[-1]}"): n
+                                  for b, n in zip(LATENCY_BUCKETS + [None], self.latency)},
+            "retries": self.retries,
+            "sleep_seconds": round(self.sleep_seconds, 3),
+            "cache_hits": self.cache_hits,
+            "errors": dict(self.errors),
+            "dropped": dict(self.dropped),
+        }
+
+
+class CrawlMetrics:
+    """Thread-safe metrics of one crawl run."""
+
+    def __init__(self, run_name, metrics_dir=METRICS_DIR, summary_interval=SUMMARY_INTERVAL, save_on_exit=True):
+        self.run_name = run_name
+        self.metrics_dir = metrics_dir
+        self.summary_interval = summary_interval
+        self.started = datetime.now()
+        self._start = time.perf_counter()
+        self._last_summary = self._start
+        self._endpoints = defaultdict(EndpointMetrics)
+        self._lock = threading.Lock()
+        self._saved = None
+        if save_on_exit:
+            # also written when the crawl crashes or is interrupted
+            atexit.register(self.save)
+
+    def _endpoint(self, source, endpoint):
+        return self._endpoints[(source, endpoint)]
+
+    def record(self, source, endpoint, status, seconds, nbytes=0):
+        with self._lock:
+            m = self._endpoint(source, endpoint)
+            m.requests += 1
+            m.status[status] += 1
+            m.bytes += nbytes
+            m.seconds += seconds
+            m.latency[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.maybe_print_summary()
+
+    def retry(self, source, endpoint):
+        with self._lock:
+            self._endpoint(source, endpoint).retries += 1
+
+    def sleep(self, source, endpoint, seconds):
+        """Sleep (Retry-After or throttling) and account the time to the endpoint."""
+        with self._lock:
+            self._endpoint(source, endpoint).sleep_seconds += seconds
+        time.sleep(seconds)
+
+    def cache_hit(self, source, endpoint):
+        with self._lock:
+            self._endpoint(source, endpoint).cache_hits += 1
+
+    def error(self, source, endpoint, exc):
+        with self._lock:
+            self._endpoint(source, endpoint).errors[type(exc).__name__] += 1
+
+    def drop(self, source, endpoint, reason):
+        """A request that ended without usable data (not found, retries exhausted, bad payload...)."""
+        with self._lock:
+            self._endpoint(source, endpoint).dropped[reason] += 1
+
+    def get(self, source, endpoint, url, **kwargs):
+        """requests.get with the request recorded. Exceptions are recorded and re-raised."""
+        start = time.perf_counter()
+        try:
+            response = requests.get(url, **kwargs)
+        except requests.RequestException as e:
+            self.error(source, endpoint, e)
+            self.record(source, endpoint, "exception", time.perf_counter() - start)
+            raise
+        self.record(source, endpoint, response.status_code, time.perf_counter() - start, len(response.content))
+        return response
+
+    def summary_line(self):
+        elapsed = time.perf_counter() - self._start
+        by_source = defaultdict(lambda: [0, 0, 0.0, 0, 0])
+        with self._lock:
+            for (source, _), m in self._endpoints.items():
+                s = by_source[source]
+                s[0] += m.requests
+                s[1] += sum(n for status, n in m.status.items() if status == 429)
+                s[2] += m.sleep_seconds
+                s[3] += m.cache_hits
+                s[4] += sum(m.errors.values()) + sum(m.dropped.values())
+        parts = [f"{source}: {req} req {req / max(elapsed, 1e-9):.1f}/s, {limited} x429, "
+                 f"{slept:.0f}s slept, {hits} cached, {lost} lost"
+                 for source, (req, limited, slept, hits, lost) in sorted(by_source.items())]
+        return f"[{self.run_name} {elapsed:.0f}s] " + " | ".join(parts)
+
+    def maybe_print_summary(self):
+        now = time.perf_counter()
+        if now - self._last_summary >= self.summary_interval:
+            self._last_summary = now
+            print(self.summary_line(), file=sys.stderr, flush=True)
+
+    def to_dict(self):
+        with self._lock:
+            endpoints = defaultdict(dict)
+            for (source, endpoint), m in sorted(self._endpoints.items()):
+                endpoints[source][endpoint] = m.to_dict()
+        return {
+            "run": self.run_name,
+            "started": self.started.isoformat(timespec="seconds"),
+            "seconds": round(time.perf_counter() - self._start, 3),
+            "sources": endpoints,
+        }
+
+    def save(self):
+        """Write the metrics file of this run (once) and print the final summary. Returns its path."""
+        if self._saved:
+            return self._saved
+        os.makedirs(self.metrics_dir, exist_ok=True)
+        path = os.path.join(self.metrics_dir, f"{self.run_name}_{self.started:%Y%m%d_%H%M%S}.json")
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        self._saved = path
+        print(self.summary_line(), file=sys.stderr, flush=True)
+        print(f"📊 Crawl metrics saved to {path}", file=sys.stderr, flush=True)
+        return path
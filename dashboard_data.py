@@ -0,0 +1,370 @@
+import base64
+import io
+import json
+import math
+import os
+
+import geopandas as gpd
+import numpy as np
+import shapely
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+import peak_schema
+from calculate_scores import POPULARITY_WEIGHTS, PROTECT_THRESHOLDS, weighted_mean
+
+# Data loading for the dashboard (app.py), kept free of streamlit so it can be
+# reused by the benchmark suite and other tools.
+#
+# build_dashboard_artifact() turns the GeoPackages into two small, pre-typed
+# Feather files (peaks in the compact schema of peak_schema.py with stress bins;
+# protected-area centroids). load_data() memory-maps them and
+# only falls back to parsing and reprojecting the GeoPackages if they are
+# missing or older than their sources.
+#
+# The protected-area polygons are additionally written as a small
+# level-of-detail pyramid (GeoJSON per simplification tolerance, clipped to
+# the peaks' region) so the map can draw outlines at a detail that fits the zoom.
+#
+# WhatIfScorer recomputes the stress score for other indicator weights and
+# protect_class thresholds from the normalized measures kept in the artifact.
+#
+# heatmap_overlay() renders the visible part of the Strava heatmap raster
+# (strava_heatmap.py) as a PNG image layer, read from the overview level that fits the map width.
+
+PEAKS_PATH = "Data/200_tyrol_mountains_final_stress_score.gpkg"
+PROTECTED_PATH = "Data/austria_osm_protected_areas.gpkg"
+ARTIFACT_DIR = "Data/dashboard"
+HEATMAP_PATH = "Data/strava_heatmap.tif"
+
+# simplification tolerance in meters -> minimum map zoom the level is used from
+PROTECTED_LOD_LEVELS = {500: 0, 100: 9, 20: 11}
+# margin around the peaks' extent that protected areas are clipped to (degrees)
+REGION_MARGIN = 0.1
+COORD_PRECISION = 1e-5  # ~1 m
+
+# grid map mode: roughly this many cells across one 512 px map tile
+GRID_CELLS_PER_TILE = 16
+
+# heatmap color ramp: position -> RGBA (transparent where there is no activity)
+HEATMAP_COLORS = {0.0: (255, 255, 178, 0), 0.3: (254, 204, 92, 150), 0.6: (253, 141, 60, 190),
+                  1.0: (227, 26, 28, 230)}
+
+# normalized popularity measures the what-if weighting recombines (calculate_scores.py)
+WHATIF_MEASURES = ["wiki_pop_measure", "strava_pop_measure", "webcam_pop_measure"]
+
+STRESS_BINS = [-1, -0.6, -0.2, 0.2, 0.6, 1.0]
+STRESS_LABELS = [
+    "Very Low (-1 to -0.6)",
+    "Low (-0.6 to -0.2)",
+    "Moderate (-0.2 to 0.2)",
+    "High (0.2 to 0.6)",
+    "Very High (0.6 to 1.0)",
+]
+
+
+def _artifact_paths(artifact_dir):
+    return os.path.join(artifact_dir, "peaks.feather"), os.path.join(artifact_dir, "protected.feather")
+
+
+def prepare_frames(peaks, protected):
+    """
+    Turn the raw GeoDataFrames into the plain frames the dashboard uses.
+
+    Returns
+    -------
+    tuple
+        (peaks DataFrame, protected DataFrame with centroid lat/lon, name of the stress column or None)
+    """
+    peaks, stress_col = prepare_peaks(peaks)
+    return peaks, prepare_protected(protected), stress_col
+
+
+def prepare_peaks(peaks):
+    """Peaks in the compact schema (peak_schema.py) plus stress bins. Returns (peaks, stress_col)."""
+    peaks = peak_schema.compact_peaks(peaks)
+    stress_col = peak_schema.STRESS_COL if peak_schema.STRESS_COL in peaks.columns else None
+    if stress_col:
+        peaks["stress_range"] = stress_bins(peaks[stress_col])
+    return peaks, stress_col
+
+
+def stress_bins(stress):
+    return pd.cut(stress, bins=STRESS_BINS, labels=STRESS_LABELS, include_lowest=True)
+
+
+class WhatIfScorer:
+    """
+    Stress scores for other measure weights and protect_class thresholds.
+
+    The measures are copied into one (n, 3) float64 array and protect_class is reduced
+    to category codes once, so every recompute is a weighted mean over that array plus
+    a threshold lookup per code - a few milliseconds even for large regions.
+    """
+
+    def __init__(self, peaks):
+        self.measures = peaks[WHATIF_MEASURES].to_numpy(dtype=float)
+        protect_class = peaks["protect_class"].astype("category")
+        self.classes = list(protect_class.cat.categories)
+        self.codes = protect_class.cat.codes.to_numpy()
+
+    @classmethod
+    def available(cls, peaks):
+        return all(c in peaks.columns for c in WHATIF_MEASURES + ["protect_class"])
+
+    def score(self, weights=POPULARITY_WEIGHTS, thresholds=PROTECT_THRESHOLDS):
+        """Stress score per peak (float32 like the compact frame); classes without a threshold are NaN."""
+        # one threshold per category, NaN code (-1) picks the appended NaN
+        per_code = np.array([thresholds.get(c, np.nan) for c in self.classes] + [np.nan])
+        total = weighted_mean(self.measures, weights)
+        return (total - per_code[self.codes]).astype(np.float32)
+
+
+def prepare_protected(protected):
+    """Protected-area centroids (name, lat, lon)."""
+    # centroids in a metric CRS, then back to lat/lon
+    centroids = protected.geometry.to_crs("EPSG:3035").centroid.to_crs("EPSG:4326")
+    protected_points = pd.DataFrame({"lat": centroids.y.to_numpy(), "lon": centroids.x.to_numpy()})
+    if "name" in protected.columns:
+        protected_points.insert(0, "name", protected["name"].to_numpy())
+    return protected_points
+
+
+def build_dashboard_artifact(peaks_path=PEAKS_PATH, protected_path=PROTECTED_PATH, artifact_dir=ARTIFACT_DIR):
+    """Write the pre-typed Feather artifact read by load_data()."""
+    protected_gdf = gpd.read_file(protected_path)
+    peaks, protected, stress_col = prepare_frames(gpd.read_file(peaks_path, layer="peaks"), protected_gdf)
+
+    keep = [c for c in ["id", "name", "ele", stress_col, "stress_range", "latitude", "longitude",
+                        *WHATIF_MEASURES, "protect_class"] if c in peaks.columns]
+    peaks_table = pa.Table.from_pandas(peaks[keep], preserve_index=False)
+    peaks_table = peaks_table.replace_schema_metadata(
+        {**(peaks_table.schema.metadata or {}), b"stress_col": (stress_col or "").encode()})
+
+    os.makedirs(artifact_dir, exist_ok=True)
+    peaks_file, protected_file = _artifact_paths(artifact_dir)
+    # uncompressed so the files can be memory-mapped without decoding
+    feather.write_feather(peaks_table, peaks_file, compression="uncompressed")
+    feather.write_feather(protected, protected_file, compression="uncompressed")
+
+    region = (peaks["longitude"].min() - REGION_MARGIN, peaks["latitude"].min() - REGION_MARGIN,
+              peaks["longitude"].max() + REGION_MARGIN, peaks["latitude"].max() + REGION_MARGIN)
+    build_protected_lod(protected_gdf, region, artifact_dir)
+    return peaks_file, protected_file
+
+
+def _lod_path(artifact_dir, tolerance):
+    return os.path.join(artifact_dir, f"protected_lod_{tolerance}m.geojson")
+
+
+def build_protected_lod(protected, region_bounds, artifact_dir=ARTIFACT_DIR, levels=PROTECTED_LOD_LEVELS):
+    """
+    Write one GeoJSON file per simplification tolerance.
+
+    Polygons are clipped to ``region_bounds`` (minx, miny, maxx, maxy in EPSG:4326),
+    simplified topology-preserving in a metric CRS and snapped to ~1 m precision.
+    Every feature carries its bbox so the dashboard can drop features out of view.
+    """
+    protected = protected.to_crs("EPSG:4326").clip(region_bounds)
+    protected = protected[~protected.geometry.is_empty]
+    metric = protected.geometry.to_crs("EPSG:3035")
+    names = protected["name"].to_numpy() if "name" in protected.columns else [None] * len(protected)
+
+    os.makedirs(artifact_dir, exist_ok=True)
+    paths = []
+    for tolerance in levels:
+        simplified = metric.simplify(tolerance, preserve_topology=True).to_crs("EPSG:4326")
+        simplified = shapely.set_precision(simplified.to_numpy(), COORD_PRECISION)
+        features = [
+            {"type": "Feature", "bbox": list(geom.bounds), "properties": {"name": name},
+             "geometry": shapely.geometry.mapping(geom)}
+            for geom, name in zip(simplified, names) if not geom.is_empty
+        ]
+        path = _lod_path(artifact_dir, tolerance)
+        with open(path, "w") as f:
+            json.dump({"type": "FeatureCollection", "features": features}, f, separators=(",", ":"))
+        paths.append(path)
+    return paths
+
+
+def load_protected_lod(tolerance, artifact_dir=ARTIFACT_DIR):
+    """Features of one level of detail, empty if the level was not built."""
+    path = _lod_path(artifact_dir, tolerance)
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)["features"]
+
+
+def lod_for_zoom(zoom, levels=PROTECTED_LOD_LEVELS):
+    """Finest simplification tolerance whose minimum zoom is reached."""
+    usable = [tol for tol, min_zoom in levels.items() if zoom >= min_zoom]
+    return min(usable) if usable else max(levels)
+
+
+def features_in_view(features, bounds):
+    """FeatureCollection of the features whose bbox intersects bounds (minx, miny, maxx, maxy)."""
+    minx, miny, maxx, maxy = bounds
+    return {"type": "FeatureCollection", "features": [
+        f for f in features
+        if f["bbox"][0] <= maxx and f["bbox"][2] >= minx and f["bbox"][1] <= maxy and f["bbox"][3] >= miny
+    ]}
+
+
+def map_view(lon, lat, width_px=800, height_px=500, max_zoom=13):
+    """
+    Center, zoom and visible bounds for a web-mercator map fitting the given points.
+
+    Returns
+    -------
+    tuple
+        ((center_lat, center_lon), zoom, (minx, miny, maxx, maxy))
+    """
+    if len(lon) == 0:
+        return (47.25, 11.4), 8, (10.1, 46.65, 12.97, 47.75)
+    min_lon, max_lon = float(lon.min()), float(lon.max())
+    min_lat, max_lat = float(lat.min()), float(lat.max())
+
+    def merc_y(v):
+        return math.log(math.tan(math.pi / 4 + math.radians(v) / 2))
+
+    lon_span = max(max_lon - min_lon, 1e-4) / 360
+    lat_span = max(merc_y(max_lat) - merc_y(min_lat), 1e-4) / (2 * math.pi)
+    # 512 px world size at zoom 0 for mapbox
+    zoom = min(math.log2(width_px / 512 / lon_span), math.log2(height_px / 512 / lat_span), max_zoom)
+    zoom = max(zoom - 0.3, 1)
+
+    center = ((min_lat + max_lat) / 2, (min_lon + max_lon) / 2)
+    # bounds actually visible at that zoom
+    half_lon = 360 * width_px / 512 / 2 ** zoom / 2
+    half_lat = half_lon * height_px / width_px * math.cos(math.radians(center[0]))
+    view = (center[1] - half_lon, center[0] - half_lat, center[1] + half_lon, center[0] + half_lat)
+    return center, zoom, view
+
+
+def grid_cell_size(zoom):
+    """Grid cell size in degrees for an (integer) map zoom."""
+    return 360 / 2 ** int(zoom) / GRID_CELLS_PER_TILE
+
+
+def grid_cells(lon, lat, values, cell_size):
+    """
+    Bin points into a square lon/lat grid with per-cell statistics.
+
+    Returns
+    -------
+    DataFrame
+        One row per non-empty cell: cell center lon/lat, count, mean and max of ``values``.
+    """
+    lon = np.asarray(lon, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+    values = np.asarray(values, dtype=float)
+    ix = np.floor(lon / cell_size).astype(np.int64)
+    iy = np.floor(lat / cell_size).astype(np.int64)
+
+    cells, inverse = np.unique(np.column_stack([ix, iy]), axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    n = len(cells)
+    count = np.bincount(inverse, minlength=n)
+
+    valid = ~np.isnan(values)
+    value_count = np.bincount(inverse[valid], minlength=n)
+    value_sum = np.bincount(inverse[valid], weights=values[valid], minlength=n)
+    value_max = np.full(n, -np.inf)
+    np.maximum.at(value_max, inverse[valid], values[valid])
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = value_sum / value_count
+    return pd.DataFrame({
+        "lon": (cells[:, 0] + 0.5) * cell_size,
+        "lat": (cells[:, 1] + 0.5) * cell_size,
+        "count": count,
+        "mean": np.where(value_count > 0, mean, np.nan),
+        "max": np.where(value_count > 0, value_max, np.nan),
+    })
+
+
+def heatmap_overlay(view_bounds, width_px=800, path=HEATMAP_PATH):
+    """
+    Mapbox image layer source of the heatmap inside view_bounds (minx, miny, maxx, maxy in EPSG:4326).
+
+    Returns
+    -------
+    dict or None
+        {"source": PNG data URI, "coordinates": lon/lat corners clockwise from top left},
+        None if the raster was not built or does not cover the view.
+    """
+    if not os.path.exists(path):
+        return None
+    # only needed for the heatmap overlay, loading the peaks does not require GDAL
+    import rasterio
+    from PIL import Image
+    from rasterio.enums import Resampling
+    from rasterio.errors import WindowError
+    from rasterio.warp import transform as transform_coords, transform_bounds
+    from rasterio.windows import Window, from_bounds
+
+    with rasterio.open(path) as src:
+        bounds = transform_bounds("EPSG:4326", src.crs, *view_bounds)
+        try:
+            window = from_bounds(*bounds, transform=src.transform).intersection(
+                Window(0, 0, src.width, src.height))
+        except WindowError:
+            return None
+        window = window.round_offsets().round_lengths()
+        if window.width < 1 or window.height < 1:
+            return None
+        # about one raster cell per screen pixel, GDAL picks the matching overview
+        scale = max(window.width / width_px, 1)
+        out_shape = (max(int(window.height / scale), 1), max(int(window.width / scale), 1))
+        values = src.read(1, window=window, out_shape=out_shape, resampling=Resampling.average)
+        left, bottom, right, top = src.window_bounds(window)
+        lons, lats = transform_coords(src.crs, "EPSG:4326", [left, right, right, left], [top, top, bottom, bottom])
+
+    # log scale against the busiest cells in view
+    values = np.log1p(np.maximum(values, 0))
+    nonzero = values[values > 0]
+    if not len(nonzero):
+        return None
+    level = np.clip(values / np.quantile(nonzero, 0.99), 0, 1)
+    stops = list(HEATMAP_COLORS)
+    rgba = np.stack([np.interp(level, stops, [c[i] for c in HEATMAP_COLORS.values()]) for i in range(4)], axis=-1)
+
+    buffer = io.BytesIO()
+    Image.fromarray(rgba.astype(np.uint8), "RGBA").save(buffer, format="PNG", optimize=True)
+    return {
+        "source": "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode(),
+        "coordinates": [[lon, lat] for lon, lat in zip(lons, lats)],
+    }
+
+
+def _artifact_is_fresh(files, sources):
+    if not all(os.path.exists(f) for f in files):
+        return False
+    built = min(os.path.getmtime(f) for f in files)
+    return all(os.path.getmtime(s) <= built for s in sources if os.path.exists(s))
+
+
+def _read_peaks_artifact(peaks_file):
+    peaks_table = feather.read_table(peaks_file, memory_map=True)
+    stress_col = peaks_table.schema.metadata.get(b"stress_col", b"").decode() or None
+    return peak_schema.enforce_schema(peaks_table.to_pandas()), stress_col
+
+
+def load_peaks(peaks_path=PEAKS_PATH, artifact_dir=ARTIFACT_DIR):
+    """Only the peaks frame, for tools that do not need the protected areas. Returns (peaks, stress_col)."""
+    if artifact_dir and _artifact_is_fresh(_artifact_paths(artifact_dir)[:1], [peaks_path]):
+        return _read_peaks_artifact(_artifact_paths(artifact_dir)[0])
+    return prepare_peaks(gpd.read_file(peaks_path, layer="peaks"))
+
+
+def load_data(peaks_path=PEAKS_PATH, protected_path=PROTECTED_PATH, artifact_dir=ARTIFACT_DIR):
+    if artifact_dir and _artifact_is_fresh(_artifact_paths(artifact_dir), [peaks_path, protected_path]):
+        peaks_file, protected_file = _artifact_paths(artifact_dir)
+        peaks, stress_col = _read_peaks_artifact(peaks_file)
+        protected = feather.read_table(protected_file, memory_map=True).to_pandas()
+        return peaks, protected, stress_col
+
+    # load stress score data
+    return prepare_frames(gpd.read_file(peaks_path, layer="peaks"), gpd.read_file(protected_path))
@@ -0,0 +1,226 @@
+import argparse
+import glob
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+import pandas as pd
+import pyarrow as pa
+
+# Opt-in render profiling of the dashboard (app.py).
+#
+# With DASHBOARD_PROFILE=1 every rerun of app.py records
+#   - the wall time of each dashboard section (load_data, filters, map, charts, table, ...),
+#     measured as laps between the section hooks, so the sections add up to the rerun
+#   - the size of what is sent to the browser per element: the plotly figure JSON and
+#     the Arrow IPC stream of the dataframes
+#   - the resident memory of the server process, its change during the rerun and the
+#     memory per active session
+# Each rerun is appended as one JSON line to PROFILE_LOG (rotated by size) and kept in
+# memory for the "Render Profile" panel of the dashboard. Without the variable the hooks
+# do nothing.
+#
+#   DASHBOARD_PROFILE=1 streamlit run app.py
+#   python dashboard_profiling.py   # sections per dataset size from the log
+
+PROFILE_LOG = "Data/logs/dashboard_profile.jsonl"
+LOG_MAX_BYTES = 5_000_000
+LOG_BACKUPS = 5
+RECENT_RUNS = 500  # reruns kept in memory for the panel
+ENABLED = os.environ.get("DASHBOARD_PROFILE", "") not in ("", "0")
+
+_recent = deque(maxlen=RECENT_RUNS)
+_recent_lock = threading.Lock()
+_logger = None
+
+
+def rss_bytes():
+    """Resident memory of this process, None where it cannot be read."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        pass
+    try:
+        import resource
+        # peak instead of current RSS on platforms without /proc (kilobytes, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+    except (ImportError, OSError):
+        return None
+
+
+def active_sessions():
+    """Number of connected dashboard sessions, None outside a streamlit server."""
+    try:
+        from streamlit.runtime import Runtime
+        return Runtime.instance()._session_mgr.num_active_sessions()
+    except Exception:
+        return None
+
+
+def payload_bytes(obj):
+    """Bytes a streamlit element sends to the browser for a plotly figure or a dataframe."""
+    if hasattr(obj, "to_plotly_json"):
+        return len(obj.to_json().encode())
+    if isinstance(obj, pd.DataFrame):
+        table = pa.Table.from_pandas(obj, preserve_index=False)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().size
+    return len(json.dumps(obj, default=str).encode())
+
+
+def _log():
+    global _logger
+    if _logger is None:
+        os.makedirs(os.path.dirname(PROFILE_LOG), exist_ok=True)
+        logger = logging.getLogger("dashboard_profile")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        if not logger.handlers:
+            handler = RotatingFileHandler(PROFILE_LOG, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+        _logger = logger
+    return _logger
+
+
+class RenderProfile:
+    """
+    Timings of one rerun. ``lap(section)`` closes a section: it gets the time since the
+    previous lap. ``payload(name, obj)`` records the payload size of an element and returns
+    the object unchanged; the time spent measuring is kept out of the sections.
+    """
+
+    def __init__(self, enabled=ENABLED, session=None):
+        self.enabled = enabled
+        if not enabled:
+            return
+        self.started = datetime.now()
+        self.session = hashlib.sha1(session.encode()).hexdigest()[:8] if session else None
+        self.sections = {}
+        self.payloads = {}
+        self.overhead = 0.0
+        self._start = self._lap = time.perf_counter()
+        self._rss_start = rss_bytes()
+
+    def lap(self, section):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.sections[section] = self.sections.get(section, 0.0) + (now - self._lap) * 1000
+        self._lap = now
+
+    def payload(self, name, obj):
+        if not self.enabled:
+            return obj
+        start = time.perf_counter()
+        self.payloads[name] = self.payloads.get(name, 0) + payload_bytes(obj)
+        elapsed = time.perf_counter() - start
+        self.overhead += elapsed
+        self._lap += elapsed
+        return obj
+
+    def finish(self, peaks, filtered):
+        """
+        Close the rerun, log it and keep it for the panel. ``peaks`` and ``filtered`` are the
+        dataset size and the number of peaks after filtering. Returns the record.
+        """
+        if not self.enabled:
+            return None
+        total = (time.perf_counter() - self._start - self.overhead) * 1000
+        rss = rss_bytes()
+        sessions = active_sessions()
+        record = {
+            "time": self.started.isoformat(timespec="seconds"),
+            "session": self.session,
+            "peaks": int(peaks),
+            "filtered": int(filtered),
+            "total_ms": round(total, 2),
+            "sections_ms": {k: round(v, 2) for k, v in self.sections.items()},
+            "payload_bytes": self.payloads,
+            "rss_mb": round(rss / 2**20, 1) if rss else None,
+            "rss_delta_mb": round((rss - self._rss_start) / 2**20, 2) if rss and self._rss_start else None,
+            "sessions": sessions,
+            "rss_per_session_mb": round(rss / 2**20 / sessions, 1) if rss and sessions else None,
+            "profiling_ms": round(self.overhead * 1000, 2),
+        }
+        with _recent_lock:
+            _recent.append(record)
+        _log().info(json.dumps(record))
+        return record
+
+
+def recent_records():
+    """Reruns profiled by this server process, oldest first."""
+    with _recent_lock:
+        return list(_recent)
+
+
+def read_log(path=PROFILE_LOG):
+    """All records of the rolling log including the rotated files, oldest first."""
+    records = []
+    for file in sorted(glob.glob(path + ".*"), key=lambda p: -int(p.rsplit(".", 1)[1])) + [path]:
+        if not os.path.exists(file):
+            continue
+        with open(file) as f:
+            records.extend(json.loads(line) for line in f if line.strip())
+    return records
+
+
+def record_table(record):
+    """One rerun as a table: time and payload per section, largest first."""
+    table = pd.DataFrame({
+        "ms": pd.Series(record["sections_ms"], dtype="float64"),
+        "payload_kb": pd.Series(record["payload_bytes"], dtype="float64") / 1024,
+    })
+    table["share"] = table["ms"] / max(record["total_ms"], 1e-9)
+    return table.sort_values("ms", ascending=False).round(2)
+
+
+def summarize(records, by="peaks"):
+    """
+    Median, p95 and max time and median payload per section over many reruns, grouped by
+    ``by`` (dataset size by default) so runs on different data sizes can be compared.
+    """
+    rows = []
+    for record in records:
+        sections = dict(record["sections_ms"], total=record["total_ms"])
+        for section, ms in sections.items():
+            rows.append({by: record.get(by), "section": section, "ms": ms,
+                         "payload_kb": record["payload_bytes"].get(section, 0) / 1024})
+    if not rows:
+        return pd.DataFrame(columns=[by, "section", "runs", "p50_ms", "p95_ms", "max_ms", "payload_kb"])
+    grouped = pd.DataFrame(rows).groupby([by, "section"], sort=False)
+    summary = grouped["ms"].agg(runs="count", p50_ms="median", p95_ms=lambda s: s.quantile(0.95), max_ms="max")
+    summary["payload_kb"] = grouped["payload_kb"].median()
+    return summary.reset_index().sort_values([by, "p50_ms"], ascending=[True, False]).round(2)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Dashboard render times per section from the profile log.")
+    parser.add_argument("--log", default=PROFILE_LOG)
+    parser.add_argument("--by", default="peaks", help="record field to group by, e.g. peaks or filtered")
+    parser.add_argument("--since", help="only reruns from this ISO date/time on")
+    config = parser.parse_args()
+
+    records = read_log(config.log)
+    if config.since:
+        records = [r for r in records if r["time"] >= config.since]
+    if not records:
+        print(f"No profiled reruns in {config.log} (run the dashboard with DASHBOARD_PROFILE=1)")
+    else:
+        print(f"{len(records)} reruns from {records[0]['time']} to {records[-1]['time']}")
+        with pd.option_context("display.width", 200, "display.max_rows", None):
+            print(summarize(records, config.by).to_string(index=False))
+        rss = [r["rss_per_session_mb"] for r in records if r.get("rss_per_session_mb")]
+        if rss:
+            print(f"Memory per session: median {pd.Series(rss).median():.1f} MB, max {max(rss):.1f} MB")
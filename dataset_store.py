@@ -0,0 +1,182 @@
+import argparse
+import os
+import shutil
+
+import geopandas as gpd
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import compact_geometry
+
+# Columnar dataset store shared by all pipeline stages.
+#
+# Every layer ("peaks", "strava_segments", "webcams", ...) is a directory:
+#
+#   Data/store/<layer>/_base.parquet    GeoParquet written once by the stage creating the layer
+#   Data/store/<layer>/<column>.parquet one file per column added by a later stage
+#
+# Rows are matched by position, so a stage that only adds a column writes just
+# that column, and a stage that only needs two columns reads just those two
+# (parquet projection pushdown) instead of rewriting/reading whole GeoPackages.
+#
+# Line layers can be written with compact geometry (write_layer(..., precision=...),
+# see compact_geometry.py): the base file then holds delta-encoded integer
+# coordinates instead of WKB and read_layer() decodes them transparently.
+
+STORE_DIR = "Data/store"
+BASE_FILE = "_base.parquet"
+GEOMETRY_COL = "geometry"
+
+
+def _layer_dir(layer, store_dir=STORE_DIR):
+    return os.path.join(store_dir, layer)
+
+
+def _column_files(layer, store_dir=STORE_DIR):
+    """Map added column name -> parquet file for a layer."""
+    layer_dir = _layer_dir(layer, store_dir)
+    return {
+        f[:-len(".parquet")]: os.path.join(layer_dir, f)
+        for f in sorted(os.listdir(layer_dir))
+        if f.endswith(".parquet") and f != BASE_FILE
+    }
+
+
+def layer_exists(layer, store_dir=STORE_DIR):
+    return os.path.exists(os.path.join(_layer_dir(layer, store_dir), BASE_FILE))
+
+
+def num_rows(layer, store_dir=STORE_DIR):
+    return pq.ParquetFile(os.path.join(_layer_dir(layer, store_dir), BASE_FILE)).metadata.num_rows
+
+
+def list_columns(layer, store_dir=STORE_DIR):
+    """All attribute columns of a layer (without geometry), added columns last."""
+    base = pq.read_schema(os.path.join(_layer_dir(layer, store_dir), BASE_FILE)).names
+    added = _column_files(layer, store_dir)
+    geometry_cols = {GEOMETRY_COL, compact_geometry.X_COL, compact_geometry.Y_COL}
+    return [c for c in base if c not in geometry_cols and c not in added] + list(added)
+
+
+def write_layer(gdf, layer, store_dir=STORE_DIR, precision=None, simplify=None):
+    """
+    Create (or replace) a layer. Previously added columns of the layer are dropped.
+
+    With ``precision`` (meters) the LineString geometry is stored compact: snapped,
+    optionally simplified by ``simplify`` meters and delta-encoded (compact_geometry.py).
+    """
+    layer_dir = _layer_dir(layer, store_dir)
+    if os.path.isdir(layer_dir):
+        shutil.rmtree(layer_dir)
+    os.makedirs(layer_dir)
+    base_path = os.path.join(layer_dir, BASE_FILE)
+    if precision is None:
+        gdf.reset_index(drop=True).to_parquet(base_path, index=False)
+    else:
+        pq.write_table(compact_geometry.geometry_table(gdf, precision, simplify), base_path, compression="zstd")
+
+
+def add_columns(layer, df, store_dir=STORE_DIR):
+    """
+    Add or replace columns of an existing layer without touching the rest of it.
+
+    Parameters
+    ----------
+    layer : str
+        Layer name.
+    df : DataFrame or dict
+        New columns, one value per row of the layer (in layer row order).
+    """
+    df = pd.DataFrame(df).reset_index(drop=True)
+    n = num_rows(layer, store_dir)
+    if len(df) != n:
+        raise ValueError(f"Layer '{layer}' has {n} rows but {len(df)} values were given")
+    layer_dir = _layer_dir(layer, store_dir)
+    for col in df.columns:
+        if col == GEOMETRY_COL or col == BASE_FILE[:-len(".parquet")]:
+            raise ValueError(f"Cannot add column '{col}'")
+        table = pa.Table.from_pandas(df[[col]], preserve_index=False)
+        pq.write_table(table, os.path.join(layer_dir, f"{col}.parquet"))
+
+
+def read_layer(layer, columns=None, geometry=True, store_dir=STORE_DIR):
+    """
+    Read a layer, loading only the requested columns.
+
+    Parameters
+    ----------
+    layer : str
+        Layer name.
+    columns : list[str] or None
+        Attribute columns to load. None loads all of them.
+    geometry : bool
+        Whether to load the geometry column.
+
+    Returns
+    -------
+    GeoDataFrame or DataFrame
+        A GeoDataFrame if ``geometry`` is True, else a plain DataFrame.
+    """
+    base_path = os.path.join(_layer_dir(layer, store_dir), BASE_FILE)
+    added = _column_files(layer, store_dir)
+    if columns is None:
+        columns = list_columns(layer, store_dir)
+
+    missing = set(columns) - set(list_columns(layer, store_dir))
+    if missing:
+        raise KeyError(f"Layer '{layer}' has no columns {sorted(missing)}")
+
+    base_cols = [c for c in columns if c not in added]
+    metadata = pq.read_schema(base_path).metadata or {}
+    if geometry and compact_geometry.METADATA_KEY in metadata:
+        table = pq.read_table(base_path, columns=base_cols + [compact_geometry.X_COL, compact_geometry.Y_COL])
+        df = gpd.GeoDataFrame(table.select(base_cols).to_pandas(),
+                              geometry=compact_geometry.read_compact_geometry(table, metadata))
+    elif geometry:
+        df = gpd.read_parquet(base_path, columns=base_cols + [GEOMETRY_COL])
+    elif base_cols:
+        df = pd.read_parquet(base_path, columns=base_cols)
+    else:
+        df = pd.DataFrame(index=pd.RangeIndex(num_rows(layer, store_dir)))
+
+    for col in columns:
+        if col in added:
+            df[col] = pd.read_parquet(added[col], columns=[col])[col].to_numpy()
+    ordered = columns + ([GEOMETRY_COL] if geometry else [])
+    return df[ordered]
+
+
+def import_gpkg(path, layer, gpkg_layer=None, store_dir=STORE_DIR):
+    """Load a GeoPackage layer into the store."""
+    write_layer(gpd.read_file(path, layer=gpkg_layer), layer, store_dir)
+
+
+def export_gpkg(layer, path, gpkg_layer=None, store_dir=STORE_DIR):
+    """Write a store layer to a GeoPackage layer (only this layer of the file is replaced)."""
+    read_layer(layer, store_dir=store_dir).to_file(path, layer=gpkg_layer or layer, driver="GPKG")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Inspect or convert layers of the dataset store.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_info = sub.add_parser("info", help="list layers and their columns")
+    p_import = sub.add_parser("import", help="import a GeoPackage layer")
+    p_import.add_argument("gpkg")
+    p_import.add_argument("layer")
+    p_import.add_argument("--gpkg-layer")
+    p_export = sub.add_parser("export", help="export a layer to a GeoPackage")
+    p_export.add_argument("layer")
+    p_export.add_argument("gpkg")
+    args = parser.parse_args()
+
+    if args.command == "info":
+        for name in sorted(os.listdir(STORE_DIR)) if os.path.isdir(STORE_DIR) else []:
+            if layer_exists(name):
+                print(f"{name} ({num_rows(name)} rows): {', '.join(list_columns(name))}")
+    elif args.command == "import":
+        import_gpkg(args.gpkg, args.layer, args.gpkg_layer)
+        print(f"✅ Imported {args.gpkg} into layer '{args.layer}'")
+    elif args.command == "export":
+        export_gpkg(args.layer, args.gpkg)
+        print(f"📁 Exported layer '{args.layer}' to {args.gpkg}")
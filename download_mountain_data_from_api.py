@@ -16,6 +16,6 @@ cols = [c for c in ["name", "ele", "geometry"] if c in peaks.columns]
 peaks = peaks[cols]
 
 # Save locally
-peaks.to_file("tyrol_mountain_peaks.gpkg", driver="GPKG")
+peaks.to_file("Data/tyrol_mountain_peaks.gpkg", driver="GPKG")
 
 print(f"✅ Saved {len(peaks)} peaks.")
\ No newline at end of file
@@ -23,9 +23,9 @@ cols = [c for c in ["name", "protect_class", "protect_title", "leisure", "bounda
 gdf = gdf[cols]
 
 # Save to GeoPackage and GeoJSON
-gdf.to_file("austria_osm_protected_areas.gpkg", driver="GPKG")
-gdf.to_file("austria_osm_protected_areas.geojson", driver="GeoJSON")
+gdf.to_file("Data/austria_osm_protected_areas.gpkg", driver="GPKG")
+gdf.to_file("Data/austria_osm_protected_areas.geojson", driver="GeoJSON")
 
 print("🎉 Done!")
 print(f"Number of protected polygons: {len(gdf)}")
-print("📁 Files saved: austria_osm_protected_areas.gpkg, austria_osm_protected_areas.geojson")
\ No newline at end of file
+print("📁 Files saved: Data/austria_osm_protected_areas.gpkg, Data/austria_osm_protected_areas.geojson")
\ No newline at end of file
@@ -1,7 +1,7 @@
 import geopandas as gpd
 
 # --- Load your Wikidata-enriched GeoPackage ---
-gdf = gpd.read_file("tyrol_peaks_top200_wikidata.gpkg")
+gdf = gpd.read_file("./Data/tyrol_peaks_top200_wikidata.gpkg")
 
 # --- Filter only mountains located in Tyrol ---
 gdf_filtered = gdf[(gdf["is_mountain"] == True) & (gdf["in_tyrol"] == True)].copy()
@@ -9,7 +9,7 @@ gdf_filtered = gdf[(gdf["is_mountain"] == True) & (gdf["in_tyrol"] == True)].cop
 print(f"✅ Found {len(gdf_filtered)} peaks that are mountains in Tyrol.")
 
 # --- Save to new GeoPackage ---
-output_file = "top_tyrol_mountains.gpkg"
+output_file = "./Data/top_tyrol_mountains.gpkg"
 gdf_filtered.to_file(output_file, driver="GPKG")
 
 print(f"📁 Saved filtered dataset to: {output_file}")
\ No newline at end of file
@@ -0,0 +1,338 @@
+import argparse
+import base64
+import hashlib
+import json
+import os
+import random
+import re
+import struct
+import threading
+import time
+import zlib
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl, unquote
+
+import requests
+from polyline import encode  # pip install polyline
+
+# Local stand-in for the APIs used by the crawlers (retrieve.py,
+# add_wiki_frequency_add_trends.py, check_if_wiki_is_mountain.py,
+# image_classification.py), so crawls can be benchmarked offline.
+#
+# The server answers on the same paths as the real services, so pointing the
+# crawlers at it only needs the base URL environment variables printed on start.
+#
+# Modes:
+#   synthetic  deterministic generated responses
+#   replay     recorded responses from the cassette directory, synthetic if missing
+#   record     forward to the real service and store the response (any status, with the
+#              retry and rate-limit headers) as a cassette; 502 if the upstream fails
+#
+# Strava rate limits are emulated with the same headers as the real API
+# (X-RateLimit-Limit / X-RateLimit-Usage) and 429 + Retry-After once exceeded.
+
+CASSETTE_DIR = "Data/cassettes"
+# upstream response headers kept in cassettes, the crawlers' retry and throttling depends on them
+RECORDED_HEADERS = ("retry-after", "x-ratelimit-limit", "x-ratelimit-usage",
+                    "x-readratelimit-limit", "x-readratelimit-usage")
+RATE_LIMIT_HEADERS = ("x-ratelimit-", "x-readratelimit-")
+
+# source name -> (path pattern, real upstream host)
+ROUTES = [
+    ("strava", re.compile(r"^/api/v3/segments/"), "https://www.strava.com"),
+    ("wikimedia", re.compile(r"^/api/rest_v1/metrics/pageviews/per-article/"), "https://wikimedia.org"),
+    ("wikipedia", re.compile(r"^/w/api\.php$"), "https://de.wikipedia.org"),
+    ("wikidata", re.compile(r"^/wiki/Special:EntityData/"), "https://www.wikidata.org"),
+    ("bergfex_images", re.compile(r"^/(ajax/webcamsarchive/|synthetic/)"), "https://images.bergfex.at"),
+    ("bergfex", re.compile(r"^/sommer/"), "https://www.bergfex.at"),
+]
+
+TYROL_QID = "Q42880"
+# Tyrol bounding box used for synthetic coordinates
+TYROL_BOUNDS = (10.1, 46.65, 12.97, 47.75)
+
+
+def _seed(*parts):
+    return int(hashlib.sha256("|".join(map(str, parts)).encode()).hexdigest()[:12], 16)
+
+
+def _tiny_png(size=32, shade=128):
+    """A valid grayscale PNG so image downloads and YOLO have something to read."""
+    raw = b"".join(b"\x00" + bytes([shade]) * size for _ in range(size))
+
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", size, size, 8, 0, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b"")
+
+
+# ----------------------------SYNTHETIC RESPONSES-------------------------------
+
+def synthetic_response(source, path, query, base_url):
+    """Return (status, content_type, body bytes) for a request path."""
+    if source == "strava":
+        if path.rstrip("/").endswith("/segments/explore"):
+            lat_sw, lon_sw, lat_ne, lon_ne = (float(v) for v in query.get("bounds", "0,0,0,0").split(","))
+            rng = random.Random(_seed(query.get("bounds")))
+            segments = [{"id": _seed(query.get("bounds"), n) % 10**8, "name": f"Segment {n}"}
+                        for n in range(rng.randint(0, 10))]
+            return 200, "application/json", json.dumps({"segments": segments}).encode()
+        segment_id = int(path.rstrip("/").rsplit("/", 1)[-1])
+        return 200, "application/json", json.dumps(synthetic_segment(segment_id)).encode()
+
+    if source == "wikimedia":
+        parts = path.split("/")
+        article, start, end = unquote(parts[-4]), parts[-2], parts[-1]
+        rng = random.Random(_seed(article))
+        day, last = datetime.strptime(start[:8], "%Y%m%d"), datetime.strptime(end[:8], "%Y%m%d")
+        items = []
+        while day <= last:
+            items.append({"article": article, "timestamp": day.strftime("%Y%m%d00"), "views": rng.randint(0, 200)})
+            day += timedelta(days=1)
+        return 200, "application/json", json.dumps({"items": items}).encode()
+
+    if source == "wikipedia":
+        title = query.get("titles", "")
+        qid = f"Q{_seed(title) % 10**7}"
+        pages = {str(_seed(title) % 10**6): {"title": title, "pageprops": {"wikibase_item": qid}}}
+        return 200, "application/json", json.dumps({"query": {"pages": pages}}).encode()
+
+    if source == "wikidata":
+        qid = path.rsplit("/", 1)[-1].split(".")[0]
+
+        def claim(value):
+            return {"mainsnak": {"datavalue": {"value": {"id": value}}}}
+
+        entity = {"id": qid, "claims": {"P31": [claim("Q8502")], "P131": [claim(TYROL_QID)]}}
+        return 200, "application/json", json.dumps({"entities": {qid: entity}}).encode()
+
+    if source == "bergfex":
+        return 200, "text/html; charset=utf-8", synthetic_bergfex_page(path).encode()
+
+    if source == "bergfex_images":
+        if path.startswith("/synthetic/"):
+            return 200, "image/png", _tiny_png(shade=_seed(path) % 256)
+        webcam_id = query.get("id", "0")
+        rng = random.Random(_seed(webcam_id, query.get("date")))
+        images = [{"src": f"{base_url}/synthetic/{webcam_id}/{query.get('date')}/{n}.png"} for n in range(rng.randint(0, 6))]
+        return 200, "application/json", json.dumps(images).encode()
+
+    return 404, "text/plain", b"not found"
+
+
+def synthetic_segment(segment_id):
+    rng = random.Random(segment_id)
+    lon = rng.uniform(TYROL_BOUNDS[0], TYROL_BOUNDS[2])
+    lat = rng.uniform(TYROL_BOUNDS[1], TYROL_BOUNDS[3])
+    coords = [(lat, lon)]
+    for _ in range(rng.randint(5, 60)):
+        lat += rng.uniform(-0.001, 0.001)
+        lon += rng.uniform(-0.001, 0.001)
+        coords.append((lat, lon))
+    created = date(2010, 1, 1) + timedelta(days=rng.randint(0, 5000))
+    athletes = rng.randint(1, 5000)
+    return {
+        "id": segment_id,
+        "name": f"Synthetic Segment {segment_id}",
+        "activity_type": rng.choice(["Ride", "Run", "Hike"]),
+        "distance": round(rng.uniform(200, 8000), 1),
+        "city": "Innsbruck", "state": "Tirol", "country": "Austria",
+        "effort_count": athletes * rng.randint(1, 5),
+        "athlete_count": athletes,
+        "star_count": rng.randint(0, 100),
+        "start_latlng": list(coords[0]), "end_latlng": list(coords[-1]),
+        "created_at": f"{created.isoformat()}T00:00:00Z",
+        "updated_at": f"{created.isoformat()}T00:00:00Z",
+        "map": {"id": f"s{segment_id}", "polyline": encode(coords)},
+    }
+
+
+def synthetic_bergfex_page(path):
+    rng = random.Random(_seed(path))
+    match = re.search(r"/webcams/c(\d+)/", path)
+    if match:
+        webcam_id = int(match.group(1))
+        lon = random.Random(webcam_id).uniform(TYROL_BOUNDS[0], TYROL_BOUNDS[2])
+        lat = random.Random(-webcam_id).uniform(TYROL_BOUNDS[1], TYROL_BOUNDS[3])
+        geo = {"locationCreated": {"geo": {"latitude": lat, "longitude": lon}}}
+        return f'<html><script type="application/ld+json">{json.dumps(geo)}</script></html>'
+    if path.rstrip("/") == "/sommer/tirol/webcams":
+        regions = [f'<li class="hastotals"><a href="/sommer/region{n}/webcams/">Region {n}</a></li>' for n in range(5)]
+        return f"<html><ul>{''.join(regions)}</ul></html>"
+    links = [f'<a href="/sommer/x/webcams/c{rng.randint(1000, 99999)}/">cam</a>' for _ in range(rng.randint(1, 8))]
+    return f"<html>{''.join(links)}</html>"
+
+
+# ------------------------------RATE LIMITING-----------------------------------
+
+class StravaRateLimiter:
+    """Fixed 15-minute and daily windows, like Strava's read limits."""
+
+    def __init__(self, short_limit=100, daily_limit=1000, window_scale=1.0):
+        self.short_limit = short_limit
+        self.daily_limit = daily_limit
+        self.short_window = 900 * window_scale
+        self.daily_window = 86400 * window_scale
+        self.lock = threading.Lock()
+        self.start = time.time()
+        self.short_count = self.daily_count = 0
+        self.short_start = self.daily_start = self.start
+
+    def hit(self):
+        """Register a request. Returns (allowed, headers)."""
+        with self.lock:
+            now = time.time()
+            if now - self.short_start >= self.short_window:
+                self.short_start, self.short_count = now, 0
+            if now - self.daily_start >= self.daily_window:
+                self.daily_start, self.daily_count = now, 0
+
+            allowed = self.short_count < self.short_limit and self.daily_count < self.daily_limit
+            if allowed:
+                self.short_count += 1
+                self.daily_count += 1
+            headers = {
+                "X-RateLimit-Limit": f"{self.short_limit},{self.daily_limit}",
+                "X-RateLimit-Usage": f"{self.short_count},{self.daily_count}",
+            }
+            if not allowed:
+                if self.daily_count >= self.daily_limit:
+                    wait_s = self.daily_window - (now - self.daily_start)
+                else:
+                    wait_s = self.short_window - (now - self.short_start)
+                headers["Retry-After"] = str(max(1, int(wait_s + 0.999)))
+            return allowed, headers
+
+
+# -------------------------------CASSETTES--------------------------------------
+
+def cassette_path(cassette_dir, source, method, path, query):
+    key = hashlib.sha256(f"{method} {path}?{sorted(query.items())}".encode()).hexdigest()[:24]
+    return os.path.join(cassette_dir, source, f"{key}.json")
+
+
+def load_cassette(path):
+    """Returns (status, content type, body, headers); older cassettes have no headers."""
+    with open(path) as f:
+        entry = json.load(f)
+    return entry["status"], entry["content_type"], base64.b64decode(entry["body"]), entry.get("headers", {})
+
+
+def save_cassette(path, request_path, status, content_type, body, headers=None):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"path": request_path, "status": status, "content_type": content_type,
+                   "headers": headers or {}, "body": base64.b64encode(body).decode()}, f)
+
+
+# ---------------------------------SERVER---------------------------------------
+
+def make_handler(config, limiter):
+    class StandInHandler(BaseHTTPRequestHandler):
+        def log_message(self, fmt, *args):
+            if config.verbose:
+                super().log_message(fmt, *args)
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            path, query = url.path, dict(parse_qsl(url.query))
+            source, upstream = next(((s, u) for s, p, u in ROUTES if p.search(path)), (None, None))
+            if source is None:
+                return self._send(404, "text/plain", b"no stand-in for this path")
+
+            if config.latency or config.jitter:
+                time.sleep(max(0.0, config.latency + random.uniform(-config.jitter, config.jitter)))
+
+            headers = {}
+            # when recording, the real service answers with its own limits and errors
+            emulate = config.mode != "record"
+            if emulate and source == "strava":
+                allowed, headers = limiter.hit()
+                if not allowed:
+                    return self._send(429, "application/json", b'{"message": "Rate Limit Exceeded"}', headers)
+            elif emulate and config.error_rate and random.random() < config.error_rate:
+                return self._send(429, "text/plain", b"Too Many Requests", {"Retry-After": str(config.retry_after)})
+
+            cassette = cassette_path(config.cassettes, source, "GET", path, query)
+            if config.mode == "record":
+                forward = {k: v for k, v in self.headers.items() if k.lower() in ("authorization", "user-agent")}
+                try:
+                    r = requests.get(upstream + self.path, headers=forward, timeout=30)
+                except requests.RequestException as e:
+                    # not recorded, the next run retries the upstream
+                    return self._send(502, "text/plain", f"upstream error: {e}".encode(), headers)
+                status, content_type, body = r.status_code, r.headers.get("Content-Type", ""), r.content
+                # every status is recorded (404 of a missing article, 429 ...), replay has to reproduce
+                # them; a transient 429/5xx does not replace a successful recording
+                recorded = {k: v for k, v in r.headers.items() if k.lower() in RECORDED_HEADERS}
+                transient = status == 429 or status >= 500
+                if not (transient and os.path.exists(cassette) and 200 <= load_cassette(cassette)[0] < 300):
+                    save_cassette(cassette, self.path, status, content_type, body, recorded)
+                headers = recorded
+            elif config.mode == "replay" and os.path.exists(cassette):
+                status, content_type, body, recorded = load_cassette(cassette)
+                if source == "strava":
+                    # the emulated limiter's usage counts, not the ones of the recorded session
+                    recorded = {k: v for k, v in recorded.items() if not k.lower().startswith(RATE_LIMIT_HEADERS)}
+                headers = {**recorded, **headers}
+            else:
+                base_url = f"http://{self.headers.get('Host', f'{config.host}:{config.port}')}"
+                status, content_type, body = synthetic_response(source, path, query, base_url)
+            self._send(status, content_type, body, headers)
+
+        def _send(self, status, content_type, body, headers=None):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(body)
+
+    return StandInHandler
+
+
+def crawler_environment(base_url):
+    """Environment variables pointing the crawlers at the stand-in."""
+    return {
+        "STRAVA_BASE_URL": f"{base_url}/api/v3",
+        "STRAVA_ACCESS_TOKEN": "standin",
+        "WIKIMEDIA_PAGEVIEWS_URL": f"{base_url}/api/rest_v1/metrics/pageviews/per-article",
+        "WIKIPEDIA_API_URL": f"{base_url}/w/api.php",
+        "WIKIDATA_ENTITY_URL": f"{base_url}/wiki/Special:EntityData",
+        "BERGFEX_URL": base_url,
+        "BERGFEX_IMAGES_URL": base_url,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Local stand-in for Strava, Wikimedia, Wikidata and bergfex.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--mode", choices=["synthetic", "replay", "record"], default="replay")
+    parser.add_argument("--cassettes", default=CASSETTE_DIR, help="directory of recorded responses")
+    parser.add_argument("--latency", type=float, default=0.0, help="added latency per request in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random +/- latency in seconds")
+    parser.add_argument("--strava-limits", default="100,1000", help="15-minute and daily Strava request limits")
+    parser.add_argument("--window-scale", type=float, default=1.0,
+                        help="scale Strava's 15 min/daily windows, e.g. 0.01 for fast experiments")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="probability of a 429 for the non-Strava sources")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds for injected 429s")
+    parser.add_argument("--verbose", action="store_true")
+    config = parser.parse_args()
+
+    short_limit, daily_limit = (int(v) for v in config.strava_limits.split(","))
+    limiter = StravaRateLimiter(short_limit, daily_limit, config.window_scale)
+    server = ThreadingHTTPServer((config.host, config.port), make_handler(config, limiter))
+
+    print(f"📡 Stand-in running on http://{config.host}:{config.port} ({config.mode} mode)")
+    print("Point the crawlers at it with:")
+    for key, value in crawler_environment(f"http://{config.host}:{config.port}").items():
+        print(f"  export {key}={value}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
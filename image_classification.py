@@ -1,17 +1,22 @@
 import csv
 import json
+import os
 from datetime import date, timedelta
 
-from ultralytics import YOLO
-
-import requests
 from bs4 import BeautifulSoup
 import re
 from urllib.parse import urljoin
 
 from tqdm import tqdm
 
-model = YOLO("yolo11l.pt")
+from crawl_metrics import CrawlMetrics
+import yolo_worker
+
+BERGFEX_URL = os.environ.get("BERGFEX_URL", "https://www.bergfex.at")
+BERGFEX_IMAGES_URL = os.environ.get("BERGFEX_IMAGES_URL", "https://images.bergfex.at")
+
+# saved explicitly at the end of the crawl, importing this module writes nothing
+metrics = CrawlMetrics("webcam_detection", save_on_exit=False)
 
 def get_coordinates_for_webcam(html_content:str):
     # Parse the HTML
@@ -40,8 +45,10 @@ def get_coordinates_for_webcam(html_content:str):
 
 
 def get_webcam_ids(base_url):
-    response = requests.get(base_url)
+    response = metrics.get("bergfex", "webcam_regions", base_url)
     webcam_pages = []
+    if response.status_code != 200:
+        metrics.drop("bergfex", "webcam_regions", f"http_{response.status_code}")
     if response.status_code==200:
         soup = BeautifulSoup(response.text, 'html.parser')
 
@@ -57,7 +64,9 @@ def get_webcam_ids(base_url):
 
     for webcam_page in webcam_pages:
         print(f"Scraping webcams from: {webcam_page}")
-        res = requests.get(webcam_page)
+        res = metrics.get("bergfex", "region_webcams", webcam_page)
+        if res.status_code != 200:
+            metrics.drop("bergfex", "region_webcams", f"http_{res.status_code}")
         if res.status_code == 200:
             page_soup = BeautifulSoup(res.text, 'html.parser')
 
@@ -65,7 +74,9 @@ def get_webcam_ids(base_url):
             for a in page_soup.find_all('a', href=True):
                 match = re.search(r'/webcams/(c\d+)/', a['href'])
                 if match:
-                    response = requests.get('https://www.bergfex.at' + a['href'])
+                    response = metrics.get("bergfex", "webcam_page", BERGFEX_URL + a['href'])
+                    if response.status_code != 200:
+                        metrics.drop("bergfex", "webcam_page", f"http_{response.status_code}")
                     all_ids[match.group(1)] = get_coordinates_for_webcam(response.text) if response.status_code == 200 else None
 
 
@@ -74,47 +85,48 @@ def get_webcam_ids(base_url):
 def get_webcam_images(webcam_id, webcam_date):
     #date str format = 2025-11-06
     date_str = webcam_date.strftime('%Y-%m-%d')
-    response = requests.get(f"https://images.bergfex.at/ajax/webcamsarchive/?id={webcam_id}&date={date_str}&size=6")
+    response = metrics.get("bergfex_images", "webcamsarchive",
+                           f"{BERGFEX_IMAGES_URL}/ajax/webcamsarchive/?id={webcam_id}&date={date_str}&size=6")
     if response.status_code == 200:
-        return json.loads(response.content) or {}
+        try:
+            return json.loads(response.content) or {}
+        except json.JSONDecodeError as e:
+            metrics.error("bergfex_images", "webcamsarchive", e)
+            metrics.drop("bergfex_images", "webcamsarchive", "bad_json")
+            return {}
     else:
+        metrics.drop("bergfex_images", "webcamsarchive", f"http_{response.status_code}")
         return {}
 
 def classify_images(image_paths: list[str]):
-    results = model.predict(source=image_paths, conf=0.35)
-    num_persons = [x.boxes.cls.tolist().count(0) for x in results]
-    num_cars = [x.boxes.cls.tolist().count(2) for x in results]
-    num_bicycle = [x.boxes.cls.tolist().count(1) for x in results]
-    # for idx, detections in enumerate(num_persons):
-    #     if detections:
-    #         results[idx].show()  # display to screen
-    #         results[idx].save(filename="result.jpg")  # save to disk
-    return {"persons": num_persons, "cars": num_cars, "bicycle": num_bicycle}
+    # the model is loaded on first use, or the batch goes to a running yolo_worker.py (YOLO_WORKER)
+    return yolo_worker.classify(image_paths, conf=0.35)
 
 
 if __name__ == '__main__':
-    base_url = "https://www.bergfex.at/sommer/tirol/webcams/"
-    webcam_ids = get_webcam_ids(base_url)
-    with open("webcam_ids.txt", "w") as f:
-        f.write("\n".join(webcam_ids))
-    current_day = date.today()
-    webcam_images = {}
-    webcam_detections = {}
-
-    for webcam_id, coords in tqdm(webcam_ids.items()):
-        print(webcam_id)
-        images = []
-        for i in range(7):
-            this_day = date.today() - timedelta(days=i)
-            images.extend(get_webcam_images(webcam_id[1:], this_day))
-        webcam_images[webcam_id] = images
-
-        classification_results = classify_images([x["src"] for x in images]) if images else {"persons": [0], "cars": [0], "bicycle": [0]}
-        num_ppl =  sum(classification_results["persons"])
-        with open("Data/ppl_on_mountains_tyrol.csv", "a", newline="", encoding="utf-8") as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow([coords, num_ppl, webcam_id])
-
-
+    base_url = f"{BERGFEX_URL}/sommer/tirol/webcams/"
+    try:
+        webcam_ids = get_webcam_ids(base_url)
+        with open("webcam_ids.txt", "w") as f:
+            f.write("\n".join(webcam_ids))
+        current_day = date.today()
+        webcam_images = {}
+        webcam_detections = {}
+
+        for webcam_id, coords in tqdm(webcam_ids.items()):
+            print(webcam_id)
+            images = []
+            for i in range(7):
+                this_day = date.today() - timedelta(days=i)
+                images.extend(get_webcam_images(webcam_id[1:], this_day))
+            webcam_images[webcam_id] = images
+
+            classification_results = classify_images([x["src"] for x in images]) if images else {"persons": [0], "cars": [0], "bicycle": [0]}
+            num_ppl =  sum(classification_results["persons"])
+            with open("Data/ppl_on_mountains_tyrol.csv", "a", newline="", encoding="utf-8") as csvfile:
+                writer = csv.writer(csvfile)
+                writer.writerow([coords, num_ppl, webcam_id])
+    finally:
+        metrics.save()
 
     print()
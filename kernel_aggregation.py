@@ -0,0 +1,137 @@
+import numpy as np
+from scipy.spatial import cKDTree
+from dataset_store import read_layer, add_columns
+
+# Distance-decay alternative to the hard 5000 m buffers used in
+# calculate_avg_number_of_athletes_strava.py and adding_webcam_data_to_gpkg.py.
+# Instead of counting a segment/webcam fully inside the buffer and not at all
+# outside of it, every feature contributes with a weight that decays smoothly
+# with its distance to the peak.
+
+KERNEL = "gaussian"  # "gaussian" or "exponential"
+BANDWIDTH = 2500  # meters (sigma for gaussian, decay length for exponential)
+TRUNCATE = 3  # ignore features further away than TRUNCATE * BANDWIDTH
+
+
+def kernel_weights(distances, bandwidth, kernel="gaussian"):
+    """Vectorized distance-decay weights for an array of distances in meters."""
+    d = np.asarray(distances, dtype=float) / bandwidth
+    if kernel == "gaussian":
+        return np.exp(-0.5 * d * d)
+    if kernel == "exponential":
+        return np.exp(-d)
+    raise ValueError(f"Unknown kernel: {kernel}")
+
+
+def metric_crs(gdf):
+    """Pick the local UTM zone (WGS84, northern hemisphere) for a GeoDataFrame."""
+    centroid = gdf.to_crs("EPSG:4326").geometry.union_all().centroid
+    utm_zone = int((centroid.x + 180) // 6) + 1
+    return f"EPSG:{32600 + utm_zone}"
+
+
+def _neighbour_pairs(peak_xy, feature_xy, max_distance):
+    """
+    Return (peak_idx, feature_idx, distance) for all pairs closer than max_distance.
+    Both sides are indexed with a KD-tree, so this is O(n log n) plus the number of pairs.
+    """
+    peak_tree = cKDTree(peak_xy)
+    feature_tree = cKDTree(feature_xy)
+    pairs = peak_tree.sparse_distance_matrix(feature_tree, max_distance, output_type="ndarray")
+    return pairs["i"], pairs["j"], pairs["v"]
+
+
+def kernel_aggregate_points(peaks, points, value_col, bandwidth=BANDWIDTH, kernel=KERNEL,
+                            truncate=TRUNCATE, how="sum"):
+    """
+    Kernel-weighted aggregation of point values around each peak.
+
+    Parameters
+    ----------
+    peaks : GeoDataFrame
+        Reference points (same metric CRS as ``points``).
+    points : GeoDataFrame
+        Points carrying the values to aggregate (e.g. webcams).
+    value_col : str
+        Column of ``points`` to aggregate.
+    bandwidth : float
+        Kernel bandwidth in meters.
+    kernel : str
+        "gaussian" or "exponential".
+    truncate : float
+        Features beyond ``truncate * bandwidth`` get weight 0.
+    how : str
+        "sum" for a weighted sum, "mean" for a weighted mean.
+
+    Returns
+    -------
+    numpy.ndarray
+        One value per peak, NaN where no feature is in range.
+    """
+    peak_xy = np.column_stack([peaks.geometry.x, peaks.geometry.y])
+    point_xy = np.column_stack([points.geometry.x, points.geometry.y])
+    values = points[value_col].to_numpy(dtype=float)
+
+    i, j, dist = _neighbour_pairs(peak_xy, point_xy, truncate * bandwidth)
+    return _reduce(len(peaks), i, kernel_weights(dist, bandwidth, kernel), values[j], how)
+
+
+def kernel_aggregate_lines(peaks, lines, value_col, bandwidth=BANDWIDTH, kernel=KERNEL,
+                           truncate=TRUNCATE, how="mean"):
+    """
+    Kernel-weighted aggregation of line values around each peak.
+
+    A line's distance to a peak is the distance to its closest vertex, so every
+    segment contributes at most once per peak. Parameters as in
+    ``kernel_aggregate_points``.
+    """
+    coords = lines.geometry.get_coordinates().to_numpy()
+    line_idx = np.repeat(np.arange(len(lines)), lines.geometry.count_coordinates())
+    peak_xy = np.column_stack([peaks.geometry.x, peaks.geometry.y])
+    values = lines[value_col].to_numpy(dtype=float)
+
+    i, j, dist = _neighbour_pairs(peak_xy, coords, truncate * bandwidth)
+    seg = line_idx[j]
+
+    # keep the closest vertex per (peak, segment) pair
+    order = np.lexsort((dist, seg, i))
+    i, seg, dist = i[order], seg[order], dist[order]
+    first = np.ones(len(i), dtype=bool)
+    first[1:] = (i[1:] != i[:-1]) | (seg[1:] != seg[:-1])
+    i, seg, dist = i[first], seg[first], dist[first]
+
+    return _reduce(len(peaks), i, kernel_weights(dist, bandwidth, kernel), values[seg], how)
+
+
+def _reduce(n, peak_idx, weights, values, how):
+    valid = ~np.isnan(values)
+    peak_idx, weights, values = peak_idx[valid], weights[valid], values[valid]
+    weighted = np.bincount(peak_idx, weights=weights * values, minlength=n)
+    if how == "sum":
+        result = weighted
+    elif how == "mean":
+        total_weight = np.bincount(peak_idx, weights=weights, minlength=n)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            result = weighted / total_weight
+    else:
+        raise ValueError(f"Unknown aggregation: {how}")
+    covered = np.bincount(peak_idx, minlength=n) > 0
+    return np.where(covered, result, np.nan)
+
+
+if __name__ == '__main__':
+    gdf_lines = read_layer("strava_segments", columns=["athlete_count_per_year"])
+    gdf_webcams = read_layer("webcams", columns=["count"])
+    gdf_points = read_layer("peaks", columns=[])
+
+    utm_crs = metric_crs(gdf_points)
+    print("Using projected CRS:", utm_crs)
+    peaks_m = gdf_points.to_crs(utm_crs)
+
+    add_columns("peaks", {
+        "kernel_athlete_count_per_year": kernel_aggregate_lines(
+            peaks_m, gdf_lines.to_crs(utm_crs), "athlete_count_per_year", how="mean"),
+        "kernel_people_on_webcams": kernel_aggregate_points(
+            peaks_m, gdf_webcams.to_crs(utm_crs), "count", how="sum"),
+    })
+    print(f"Added {KERNEL} kernel indicators (bandwidth {BANDWIDTH} m) for {len(gdf_points)} peaks.")
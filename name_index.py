@@ -0,0 +1,131 @@
+import re
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+# Prebuilt search index over peak names for the dashboard search box.
+#
+# Names are normalized (case, accents, umlaut spellings, ß) so "Grossglockner",
+# "Großglockner" and "GROSSGLOCKNER" share one key. Every name containing the
+# query matches (a substring scan over the keys, so "spitz" finds "Wildspitze");
+# trigram postings add typo-tolerant matches. Prefix matches (sorted key list,
+# bisect) and trigram similarity only decide the ranking.
+
+# minimum share of the query's trigrams a name must contain to match ...
+MIN_COVERAGE = 0.6
+# ... and at most this far below the best match (exact queries stay strict,
+# misspelled ones still find something)
+MAX_COVERAGE_GAP = 0.25
+
+_UMLAUT_SPELLINGS = [("ae", "a"), ("oe", "o"), ("ue", "u")]
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_name(name):
+    """Lowercase ASCII key: accents stripped, ß -> ss, ae/oe/ue -> a/o/u, punctuation -> space."""
+    if not isinstance(name, str):
+        return ""
+    name = name.casefold().replace("ß", "ss")
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(c for c in name if not unicodedata.combining(c))
+    for spelled, plain in _UMLAUT_SPELLINGS:
+        name = name.replace(spelled, plain)
+    return _NON_ALNUM.sub(" ", name).strip()
+
+
+def trigrams(key):
+    """Trigrams of every word, padded like pg_trgm ("  w", " wo", ..., "rd ")."""
+    grams = set()
+    for word in key.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class NameIndex:
+    """Normalized prefix and trigram index over a list of names."""
+
+    def __init__(self, names):
+        self.names = list(names)
+        self.keys = [normalize_name(n) for n in self.names]
+        self.key_lengths = np.array([len(k) for k in self.keys])
+        self._key_series = pd.Series(self.keys, dtype="string[pyarrow]")
+
+        # prefixes of the full key and of every word
+        entries = set()
+        for i, key in enumerate(self.keys):
+            words = key.split()
+            for start in range(len(words)):
+                entries.add((" ".join(words[start:]), i))
+        self._prefix_keys = sorted(entries)
+        self._prefix_strings = [k for k, _ in self._prefix_keys]
+
+        postings = defaultdict(list)
+        self._trigram_counts = np.zeros(len(self.keys), dtype=np.int32)
+        for i, key in enumerate(self.keys):
+            grams = trigrams(key)
+            self._trigram_counts[i] = len(grams)
+            for gram in grams:
+                postings[gram].append(i)
+        self._postings = {g: np.array(ids, dtype=np.int32) for g, ids in postings.items()}
+
+    def __len__(self):
+        return len(self.names)
+
+    def _prefix_ids(self, query):
+        ids = set()
+        pos = bisect_left(self._prefix_strings, query)
+        while pos < len(self._prefix_strings) and self._prefix_strings[pos].startswith(query):
+            ids.add(self._prefix_keys[pos][1])
+            pos += 1
+        return ids
+
+    def _scores(self, query):
+        """
+        Score every name against a normalized query.
+
+        Returns
+        -------
+        tuple
+            (match mask, ranking score) arrays, one entry per name.
+        """
+        n = len(self.keys)
+        prefix = np.zeros(n, dtype=bool)
+        prefix[list(self._prefix_ids(query))] = True
+        substring = self._key_series.str.contains(query, regex=False).to_numpy(dtype=bool, na_value=False)
+
+        grams = trigrams(query)
+        if n == 0 or len(query.replace(" ", "")) < 3 or not grams:
+            # too short for trigrams (or nothing indexed), exact matches only
+            return substring, prefix * 2.0 + substring
+
+        hits = [self._postings[g] for g in grams if g in self._postings]
+        shared = np.bincount(np.concatenate(hits), minlength=n) if hits else np.zeros(n, dtype=np.int64)
+        coverage = shared / len(grams)
+        jaccard = shared / (len(grams) + self._trigram_counts - shared)
+        # typo-tolerant matches on top of the substring matches
+        threshold = max(MIN_COVERAGE, coverage.max() - MAX_COVERAGE_GAP)
+        matched = substring | (coverage >= threshold)
+        # prefix matches first, then other substring matches, then the closest names by trigram similarity
+        return matched, prefix * 2 + substring + coverage + jaccard
+
+    def search(self, query, limit=10):
+        """Ranked (position, name) matches for a query, best first."""
+        query = normalize_name(query)
+        if not query:
+            return []
+        matched, score = self._scores(query)
+        ids = np.flatnonzero(matched)
+        # shorter names first on equal scores
+        order = np.lexsort((self.key_lengths[ids], -score[ids]))[:limit]
+        return [(int(i), self.names[i]) for i in ids[order]]
+
+    def mask(self, query):
+        """Boolean array marking every name that matches the query."""
+        query = normalize_name(query)
+        if not query:
+            return np.ones(len(self.keys), dtype=bool)
+        return self._scores(query)[0]
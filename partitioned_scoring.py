@@ -0,0 +1,172 @@
+import argparse
+import json
+import os
+
+import numpy as np
+
+from dataset_store import read_layer, add_columns, layer_exists
+from calculate_scores import AGGREGATION_MODE, INDICATOR_COLUMNS, calculate_stress_scores
+
+# Scoring of several regions on one comparable scale, one region in memory at a time.
+#
+# Every region is a layer of the dataset store (e.g. "peaks" for Tyrol,
+# "peaks_austria", "peaks_bavaria") with the indicator columns of calculate_scores.py.
+#
+#   python partitioned_scoring.py peaks peaks_austria peaks_bavaria --normalization quantile
+#
+# Pass 1 streams the indicator columns of every region and collects global
+# statistics: the maxima calculate_scores.py normalizes by, and a fixed-size
+# reservoir sample per indicator for robust quantiles. Pass 2 scores each region
+# against those global statistics and adds the score columns to its layer.
+#
+# normalization "max" gives exactly the scores of calculate_scores.py run on all
+# regions at once; "quantile" divides by a high quantile instead and caps the
+# indicators there, so a single extreme peak does not compress everyone else's scores.
+#
+# The statistics are saved to STATS_FILE; --stats reuses them to score a new
+# region on the scale of an earlier run.
+
+STATS_FILE = "Data/score_stats.json"
+RESERVOIR_SIZE = 100_000
+DEFAULT_QUANTILE = 0.99
+INDICATORS = ["wiki", "strava", "webcam"]
+
+
+class StreamingStats:
+    """Count, max and a uniform reservoir sample of a stream of values."""
+
+    def __init__(self, size=RESERVOIR_SIZE, seed=0):
+        self.size = size
+        self.count = 0
+        self.max = -np.inf
+        self.sample = np.empty(0)
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[np.isfinite(values)]
+        if not len(values):
+            return
+        self.max = max(self.max, float(values.max()))
+
+        # fill the reservoir first, then replace with probability size / seen (algorithm R)
+        free = max(self.size - len(self.sample), 0)
+        self.sample = np.concatenate([self.sample, values[:free]])
+        rest = values[free:]
+        if len(rest):
+            seen = self.count + free + np.arange(1, len(rest) + 1)
+            slots = self._rng.integers(0, seen)
+            keep = slots < self.size
+            self.sample[slots[keep]] = rest[keep]
+        self.count += len(values)
+
+    def quantile(self, q):
+        return float(np.quantile(self.sample, q)) if len(self.sample) else np.nan
+
+
+def _transformed_indicators(points, aggregation_mode):
+    """The values calculate_stress_scores() normalizes: log wiki views, log Strava athletes, webcam people."""
+    columns = INDICATOR_COLUMNS[aggregation_mode]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {
+            "wiki": np.log(points["wikipedia_views"].to_numpy(dtype=float)),
+            "strava": np.log(points[columns["strava"]].to_numpy(dtype=float)),
+            "webcam": points[columns["webcam"]].to_numpy(dtype=float),
+        }
+
+
+def _indicator_columns(aggregation_mode):
+    columns = INDICATOR_COLUMNS[aggregation_mode]
+    return ["wikipedia_views", columns["strava"], columns["webcam"], "protect_class"]
+
+
+def collect_stats(layers, aggregation_mode=AGGREGATION_MODE, quantile=DEFAULT_QUANTILE):
+    """
+    Pass 1: global statistics over all regions, reading one region's indicator columns at a time.
+
+    Returns
+    -------
+    dict
+        {"aggregation_mode", "quantile", "regions": {layer: rows},
+         indicator: {"count", "max", "quantile"}} for every indicator.
+    """
+    stats = {name: StreamingStats(seed=i) for i, name in enumerate(INDICATORS)}
+    regions = {}
+    for layer in layers:
+        points = read_layer(layer, columns=_indicator_columns(aggregation_mode), geometry=False)
+        regions[layer] = len(points)
+        values = _transformed_indicators(points, aggregation_mode)
+        # zero webcam counts are ignored by the scoring, so they do not count here either
+        values["webcam"] = values["webcam"][values["webcam"] != 0]
+        for name in INDICATORS:
+            stats[name].update(values[name])
+        del points, values
+
+    result = {"aggregation_mode": aggregation_mode, "quantile": quantile, "regions": regions}
+    for name in INDICATORS:
+        result[name] = {"count": stats[name].count, "max": stats[name].max, "quantile": stats[name].quantile(quantile)}
+    return result
+
+
+def score_partition(points, stats, normalization="max"):
+    """
+    Pass 2: score one region against the global statistics.
+
+    With "quantile" normalization the indicators are capped at the global
+    quantile before scoring, so every measure stays within 1.
+    """
+    aggregation_mode = stats["aggregation_mode"]
+    if normalization == "max":
+        return calculate_stress_scores(points, aggregation_mode, tuple(stats[n]["max"] for n in INDICATORS))
+
+    columns = INDICATOR_COLUMNS[aggregation_mode]
+    points = points.copy()
+    # the quantiles are of the log values for wiki and Strava, undo the log to cap the raw columns
+    caps = {
+        "wikipedia_views": np.exp(stats["wiki"]["quantile"]),
+        columns["strava"]: np.exp(stats["strava"]["quantile"]),
+        columns["webcam"]: stats["webcam"]["quantile"],
+    }
+    for col, cap in caps.items():
+        points[col] = points[col].clip(upper=cap)
+    return calculate_stress_scores(points, aggregation_mode, tuple(stats[n]["quantile"] for n in INDICATORS))
+
+
+def score_partitions(layers, stats, normalization="max"):
+    """Score and update every region layer, one at a time. Returns {layer: scored rows}."""
+    scored = {}
+    for layer in layers:
+        points = read_layer(layer, columns=_indicator_columns(stats["aggregation_mode"]), geometry=False)
+        add_columns(layer, score_partition(points, stats, normalization))
+        scored[layer] = len(points)
+        print(f"✅ Scored {len(points):,} peaks of '{layer}'")
+        del points
+    return scored
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Score several region layers on one global scale.")
+    parser.add_argument("layers", nargs="+", help="store layers, one per region")
+    parser.add_argument("--normalization", choices=["max", "quantile"], default="max")
+    parser.add_argument("--quantile", type=float, default=DEFAULT_QUANTILE,
+                        help="quantile used by --normalization quantile")
+    parser.add_argument("--aggregation-mode", choices=sorted(INDICATOR_COLUMNS), default=AGGREGATION_MODE)
+    parser.add_argument("--stats", help="reuse statistics of an earlier run instead of pass 1")
+    args = parser.parse_args()
+
+    missing = [layer for layer in args.layers if not layer_exists(layer)]
+    if missing:
+        parser.error(f"unknown layers: {missing}")
+
+    if args.stats:
+        with open(args.stats) as f:
+            stats = json.load(f)
+        print(f"📂 Using statistics from {args.stats}")
+    else:
+        stats = collect_stats(args.layers, args.aggregation_mode, args.quantile)
+        os.makedirs(os.path.dirname(STATS_FILE), exist_ok=True)
+        with open(STATS_FILE, "w") as f:
+            json.dump(stats, f, indent=2)
+        print(f"📊 Global statistics of {sum(stats['regions'].values()):,} peaks saved to {STATS_FILE}")
+
+    score_partitions(args.layers, stats, args.normalization)
@@ -0,0 +1,176 @@
+import argparse
+import json
+import os
+
+import geopandas as gpd
+import pandas as pd
+import shapely
+
+# Canonical compact schema of the peaks layer as held in memory by the dashboard,
+# the stress API and other readers.
+#
+# The GeoPackage / store frames carry everything the pipeline ever added: object
+# strings, float64 everywhere, intermediate columns (geometry_buffer / index_right
+# leftovers of older runs, wikidata flags, ...) and shapely points. The compact
+# frame keeps only the columns below, as float32 numbers, categorical class /
+# title / bin columns and the point geometry as two float32 coordinate columns
+# (around 47° N / 11° E the float32 step is ~0.4 m in latitude and ~0.07 m in
+# longitude, enough for map markers and bbox queries). The normalized popularity
+# measures are kept for the what-if weighting of the dashboard.
+#
+#   peaks, stress_col = peak_schema.load_compact_peaks()
+#   python peak_schema.py   # memory of today's frames vs. the compact one
+
+REPORT_FILE = "Data/benchmarks/peak_memory_report.json"
+STRESS_COL = "stress_score"
+# other names the stress column had in older outputs
+STRESS_ALIASES = ["final_stress_score", "stress", "score"]
+
+PEAK_SCHEMA = {
+    "id": "int64",
+    "name": "string[pyarrow]",
+    "ele": "float32",
+    "longitude": "float32",
+    "latitude": "float32",
+    "wikipedia_views": "float32",
+    "avg_athlete_count_per_year": "float32",
+    "people_on_webcams": "float32",
+    "kernel_athlete_count_per_year": "float32",
+    "kernel_people_on_webcams": "float32",
+    "wiki_pop_measure": "float32",
+    "strava_pop_measure": "float32",
+    "webcam_pop_measure": "float32",
+    "protect_class": "category",
+    "protect_title": "category",
+    "gdf_total_popularity_score": "float32",
+    "protect_threshold": "float32",
+    STRESS_COL: "float32",
+    "stress_range": "category",
+}
+# id is optional: older exports have none, readers fall back to the row position
+REQUIRED_COLUMNS = ["longitude", "latitude"]
+
+
+def compact_peaks(peaks):
+    """
+    Bring a peaks frame into the compact schema.
+
+    Parameters
+    ----------
+    peaks : GeoDataFrame or DataFrame
+        A GeoDataFrame (any CRS) or a frame that already has longitude/latitude columns.
+
+    Returns
+    -------
+    DataFrame
+        Only the columns of PEAK_SCHEMA that are present, in schema order and dtype.
+    """
+    if isinstance(peaks, gpd.GeoDataFrame):
+        points = peaks.geometry.to_crs("EPSG:4326") if peaks.crs else peaks.geometry
+        coords = shapely.get_coordinates(points.to_numpy())
+        peaks = pd.DataFrame(peaks.drop(columns=peaks.geometry.name))
+        peaks["longitude"], peaks["latitude"] = coords[:, 0], coords[:, 1]
+    if STRESS_COL not in peaks.columns:
+        alias = next((c for c in STRESS_ALIASES if c in peaks.columns), None)
+        if alias:
+            peaks = peaks.rename(columns={alias: STRESS_COL})
+    return enforce_schema(peaks)
+
+
+def enforce_schema(peaks):
+    """Select and cast the schema columns; raises ValueError if a required column is missing."""
+    missing = [c for c in REQUIRED_COLUMNS if c not in peaks.columns]
+    if missing:
+        raise ValueError(f"Peaks frame has no columns {missing}")
+    columns = {}
+    for col, dtype in PEAK_SCHEMA.items():
+        if col not in peaks.columns:
+            continue
+        values = peaks[col]
+        if dtype == "float32" and not pd.api.types.is_numeric_dtype(values):
+            # e.g. ele is stored as text in the OSM export
+            values = pd.to_numeric(values, errors="coerce")
+        columns[col] = values.astype(dtype) if values.dtype != dtype else values
+    return pd.DataFrame(columns).reset_index(drop=True)
+
+
+def load_compact_peaks(peaks_path=None, layer="peaks", store_layer=None):
+    """
+    Load the peaks in the compact schema, from the dataset store layer if given,
+    otherwise from the GeoPackage. Returns (peaks, stress_col or None).
+    """
+    if store_layer:
+        from dataset_store import read_layer, list_columns
+        columns = [c for c in list_columns(store_layer) if c in PEAK_SCHEMA or c in STRESS_ALIASES]
+        peaks = compact_peaks(read_layer(store_layer, columns=columns))
+    else:
+        import dashboard_data
+        peaks = compact_peaks(gpd.read_file(peaks_path or dashboard_data.PEAKS_PATH, layer=layer))
+    return peaks, STRESS_COL if STRESS_COL in peaks.columns else None
+
+
+def frame_memory(df):
+    """
+    Deep memory of a frame per column in bytes. pandas counts a geometry column as one
+    pointer per row, so the WKB size of the geometries is added as a lower bound of
+    what the GEOS objects occupy.
+    """
+    usage = df.memory_usage(deep=True, index=True)
+    per_column = {str(k): int(v) for k, v in usage.items()}
+    for col in df.columns:
+        if isinstance(df[col].dtype, gpd.array.GeometryDtype):
+            per_column[col] += int(sum(len(b) for b in shapely.to_wkb(df[col].to_numpy()) if b is not None))
+    return per_column
+
+
+def memory_report(frames):
+    """Compare the memory of several frames; ``frames`` maps a label to a frame."""
+    report = {}
+    for label, df in frames.items():
+        per_column = frame_memory(df)
+        total = sum(per_column.values())
+        report[label] = {
+            "rows": len(df),
+            "columns": len(df.columns),
+            "bytes": total,
+            "bytes_per_row": round(total / max(len(df), 1), 1),
+            "per_column": dict(sorted(per_column.items(), key=lambda kv: -kv[1])),
+        }
+    return report
+
+
+def print_memory_report(report):
+    baseline = max(r["bytes"] for r in report.values())
+    print(f"{'frame':34s} {'rows':>6s} {'cols':>5s} {'bytes':>10s} {'bytes/row':>10s} {'vs largest':>10s}")
+    for label, r in report.items():
+        print(f"{label:34s} {r['rows']:6d} {r['columns']:5d} {r['bytes']:10,d} {r['bytes_per_row']:10.1f} "
+              f"{r['bytes'] / baseline:10.0%}")
+
+
+if __name__ == '__main__':
+    import dashboard_data
+    from dataset_store import layer_exists, read_layer
+
+    parser = argparse.ArgumentParser(description="Memory of today's peaks frames vs. the compact schema.")
+    parser.add_argument("--peaks", default=dashboard_data.PEAKS_PATH, help="scored peaks GeoPackage")
+    parser.add_argument("--report", default=REPORT_FILE)
+    config = parser.parse_args()
+
+    peaks_gdf = gpd.read_file(config.peaks, layer="peaks")
+    frames = {"GeoPackage GeoDataFrame": peaks_gdf}
+    if layer_exists("peaks"):
+        frames["dataset store layer (all columns)"] = read_layer("peaks")
+    # what prepare_peaks() produced before the compact schema: every column, float64
+    points = peaks_gdf.geometry.to_crs("EPSG:4326")
+    wide = pd.DataFrame(peaks_gdf.drop(columns="geometry")).assign(latitude=points.y, longitude=points.x)
+    if "ele" in wide.columns:
+        wide["ele"] = pd.to_numeric(wide["ele"], errors="coerce")
+    frames["dashboard frame (wide)"] = wide
+    frames["compact schema"] = dashboard_data.prepare_peaks(peaks_gdf)[0]
+
+    report = memory_report(frames)
+    print_memory_report(report)
+    os.makedirs(os.path.dirname(config.report), exist_ok=True)
+    with open(config.report, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {config.report}")
@@ -1,16 +1,28 @@
+import argparse
+import os
+from datetime import date
 import geopandas as gpd
 import requests
 import json
-import time
+from shapely.geometry import Point
+from crawl_metrics import CrawlMetrics
+import strava_crawl_planner as planner
 
-ACCESS_TOKEN = '936d81f88312c1d058de5c6a069b963c5d7fb619'
-GPKG_PATH = 'top_tyrol_mountains.gpkg'
+ACCESS_TOKEN = os.environ.get('STRAVA_ACCESS_TOKEN', '')
+GPKG_PATH = 'Data/top_tyrol_mountains.gpkg'
 LAYER_NAME = 'top_tyrol_mountains'
+SEGMENTS_PATH = 'Data/segments2.json'
 BUFFER_DISTANCE = 0.02  # degrees ~ 1 km if using lat/lng
 
-BASE_URL = 'https://www.strava.com/api/v3'
+BASE_URL = os.environ.get('STRAVA_BASE_URL', 'https://www.strava.com/api/v3')
 HEADERS = {'Authorization': f'Bearer {ACCESS_TOKEN}'}
 
+# saved explicitly at the end of the crawl, importing this module writes nothing
+metrics = CrawlMetrics("strava_crawl", save_on_exit=False)
+# remaining Strava quota, every request waits for it and updates it from the response headers
+budget = planner.RateBudget()
+SAVE_EVERY = 10  # peaks between saves of the crawl state and the segment details
+
 def get_bounding_box(point, buffer_distance):
     """
     Returns bounding box coordinates of a buffered point geometry.
@@ -23,7 +35,7 @@ def explore_segments(bounds_tuple, max_retries=3):
     """
     Calls Strava's segment explore API for a bounding box.
     Handles rate limits by retrying automatically if needed.
-    Returns a list of found segment IDs within the bounding box.
+    Returns a list of found segment IDs within the bounding box, None if the request failed.
     """
     minx, miny, maxx, maxy = bounds_tuple
     bounds_str = f"{miny},{minx},{maxy},{maxx}"  #lat_sw, lon_sw, lat_ne, lon_ne
@@ -32,11 +44,17 @@ def explore_segments(bounds_tuple, max_retries=3):
     url = f'{BASE_URL}/segments/explore'
     retries = 0
     while retries < max_retries:
-        response = requests.get(url, headers=HEADERS, params=params)
+        budget.wait(metrics)
+        response = metrics.get("strava", "segments/explore", url, headers=HEADERS, params=params)
+        budget.update(response.headers)
         if response.status_code == 429:
             retry_after = int(response.headers.get("Retry-After", 15))
+            if budget.daily_remaining() <= 0:
+                # no point in retrying before tomorrow
+                break
             print(f"Rate limit hit for explore_segments. Sleeping for {retry_after} seconds.")
-            time.sleep(retry_after)
+            metrics.retry("strava", "segments/explore")
+            metrics.sleep("strava", "segments/explore", retry_after)
             retries += 1
         else:
             try:
@@ -45,9 +63,11 @@ def explore_segments(bounds_tuple, max_retries=3):
                 return [segment['id'] for segment in data.get('segments', [])]
             except requests.HTTPError as e:
                 print(f"HTTP error in explore_segments: {e}")
-                break
+                metrics.drop("strava", "segments/explore", f"http_{response.status_code}")
+                return None
     print("Max retries reached for explore_segments")
-    return []
+    metrics.drop("strava", "segments/explore", "retries_exhausted")
+    return None
 
 def get_segment_details_with_retry(segment_id, max_retries=3):
     """
@@ -57,11 +77,17 @@ def get_segment_details_with_retry(segment_id, max_retries=3):
     url = f'{BASE_URL}/segments/{segment_id}'
     retries = 0
     while retries < max_retries:
-        response = requests.get(url, headers=HEADERS)
+        budget.wait(metrics)
+        response = metrics.get("strava", "segments/{id}", url, headers=HEADERS)
+        budget.update(response.headers)
         if response.status_code == 429:
             retry_after = int(response.headers.get("Retry-After", 15))
+            if budget.daily_remaining() <= 0:
+                # no point in retrying before tomorrow
+                break
             print(f"Rate limit hit for segment {segment_id}. Sleeping for {retry_after} seconds.")
-            time.sleep(retry_after)
+            metrics.retry("strava", "segments/{id}")
+            metrics.sleep("strava", "segments/{id}", retry_after)
             retries += 1
         else:
             try:
@@ -69,31 +95,114 @@ def get_segment_details_with_retry(segment_id, max_retries=3):
                 return response.json()
             except requests.HTTPError as e:
                 print(f"HTTP error fetching segment {segment_id}: {e}")
-                break
+                metrics.drop("strava", "segments/{id}", f"http_{response.status_code}")
+                return None
     print(f"Max retries reached for segment {segment_id}")
+    metrics.drop("strava", "segments/{id}", "retries_exhausted")
     return None
 
-if __name__ == '__main__':
-    gdf = gpd.read_file(GPKG_PATH, layer=LAYER_NAME)
-    all_segment_ids = set()
-    all_details = []
+def load_segment_details(path=SEGMENTS_PATH):
+    """Segment details of earlier runs by segment id."""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return {str(segment['id']): segment for segment in json.load(f)}
+
+
+def save_crawl(state, details):
+    state['quota'] = budget.to_dict()
+    with open(SEGMENTS_PATH, 'w') as f:
+        json.dump(list(details.values()), f, indent=4)
+    planner.save_state(state)
+
+
+# results of crawl_peak
+CRAWLED, FAILED, QUOTA_SPENT = "crawled", "failed", "quota_spent"
 
-    #for each mountain point
-    for idx, row in gdf.iterrows():
-        point = row.geometry #getting geographic point of mountain location
-        bbox = get_bounding_box(point, BUFFER_DISTANCE) #creating the bounding box 
 
+def crawl_peak(peak, state, details, today, refresh_days):
+    """
+    Runs the explore and detail requests of one peak. Returns CRAWLED, FAILED (the explore
+    call failed, the peak stays queued) or QUOTA_SPENT once the daily quota is used up.
+    """
+    if not peak['pending']:
+        bbox = get_bounding_box(Point(peak['lon'], peak['lat']), BUFFER_DISTANCE)
         ids = explore_segments(bbox)
+        if ids is None:
+            # failed explore calls are retried by the next run
+            return FAILED if budget.daily_remaining() > 0 else QUOTA_SPENT
+        peak['explored'] = today.isoformat()
+        peak['segments'] = ids
+        peak['pending'] = []
         for segment_id in ids:
-            if segment_id not in all_segment_ids:
-                details = get_segment_details_with_retry(segment_id)
-                if details:
-                    all_details.append(details)
-                    all_segment_ids.add(segment_id)
-                time.sleep(2)  #2 second delay between detail requests to reduce rate limit risk
-
-    #saving all segments detail responses to JSON file
-    with open('segments2.json', 'w') as f:
-        json.dump(all_details, f, indent=4)
-
-    print(f"Saved {len(all_details)} segment details to segments.json")
+            if planner.age_days(state['segments'].get(str(segment_id)), today) <= refresh_days:
+                # already fetched recently for a neighbouring peak
+                metrics.cache_hit("strava", "segments/{id}")
+            else:
+                peak['pending'].append(segment_id)
+    for segment_id in list(peak['pending']):
+        if budget.daily_remaining() <= 0:
+            return QUOTA_SPENT
+        segment = get_segment_details_with_retry(segment_id)
+        if segment is None and budget.daily_remaining() <= 0:
+            # rate limited, the segment stays pending for the next run
+            return QUOTA_SPENT
+        if segment:
+            details[str(segment_id)] = segment
+            state['segments'][str(segment_id)] = today.isoformat()
+        peak['pending'].remove(segment_id)
+    return CRAWLED
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Crawl Strava segments around the peaks, spread over the daily quota.")
+    parser.add_argument("--refresh-days", type=int, default=planner.REFRESH_DAYS,
+                        help="re-crawl peaks whose data is older than this")
+    parser.add_argument("--reserve", type=int, default=0,
+                        help="daily requests to leave for other uses of the token")
+    parser.add_argument("--plan", action="store_true", help="only print the crawl plan")
+    args = parser.parse_args()
+
+    gdf = gpd.read_file(GPKG_PATH, layer=LAYER_NAME)
+    state = planner.sync_peaks(planner.load_state(), gdf)
+    details = load_segment_details()
+    if details:
+        # details crawled before the crawl state existed count as fetched on the file date
+        fetched = date.fromtimestamp(os.path.getmtime(SEGMENTS_PATH)).isoformat()
+        for segment_id in details:
+            state['segments'].setdefault(segment_id, fetched)
+    today = planner.today_utc()
+    budget.restore(state.get('quota'))
+    budget.reserve = args.reserve
+
+    queue = planner.build_queue(state, today, args.refresh_days)
+    planner.plan_days(queue, budget.daily_remaining(), budget.daily_limit - args.reserve)
+    planner.print_plan(queue, state)
+    if args.plan:
+        raise SystemExit(0)
+
+    results = {CRAWLED: 0, FAILED: 0}
+    quota_spent = False
+    try:
+        for task in queue:
+            if budget.daily_remaining() <= 0:
+                quota_spent = True
+                break
+            result = crawl_peak(state['peaks'][task['key']], state, details, today, args.refresh_days)
+            if result == QUOTA_SPENT:
+                quota_spent = True
+                break
+            results[result] += 1
+            if sum(results.values()) % SAVE_EVERY == 0:
+                save_crawl(state, details)
+    finally:
+        save_crawl(state, details)
+        metrics.save()
+
+    remaining = len(queue) - results[CRAWLED]
+    print(f"Crawled {results[CRAWLED]} peaks, {len(details)} segment details in {SEGMENTS_PATH}")
+    if results[FAILED]:
+        print(f"{results[FAILED]} peaks failed and are retried by the next run")
+    if remaining:
+        reason = "Daily quota spent, " if quota_spent else ""
+        print(f"{reason}{remaining} peaks remain queued in {planner.STATE_FILE} for the next run")
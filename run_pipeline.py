@@ -0,0 +1,278 @@
+import argparse
+import ast
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# Incremental runner for the pipeline scripts.
+#
+# Every stage declares the files it reads and writes. A stage is skipped when the
+# content hash of its script, the repository modules it imports (dataset_store.py,
+# tiled_aggregation.py, ...) and its inputs is the same as in the last successful
+# run and its outputs are still unchanged on disk. Stages whose inputs are ready run
+# concurrently (e.g. Wikipedia pageviews and webcam detection).
+#
+# Stages without inputs (downloads, crawls) only run once unless forced with --force.
+
+STATE_FILE = "Data/.pipeline_state.json"
+REPORT_FILE = "Data/pipeline_report.json"
+LOG_DIR = "Data/logs"
+STORE = "Data/store"
+
+STAGES = [
+    {"name": "peaks_download", "script": "download_mountain_data_from_api.py",
+     "inputs": [],
+     "outputs": ["Data/tyrol_mountain_peaks.gpkg"]},
+    {"name": "protected_download", "script": "download_osm.py",
+     "inputs": [],
+     "outputs": ["Data/austria_osm_protected_areas.gpkg"]},
+    {"name": "wiki_pageviews", "script": "add_wiki_frequency_add_trends.py",
+     "inputs": ["Data/tyrol_mountain_peaks.gpkg"],
+     "outputs": ["Data/tyrol_peaks_wiki_seq.gpkg"]},
+    {"name": "wikidata_check", "script": "check_if_wiki_is_mountain.py",
+     "inputs": ["Data/tyrol_peaks_wiki_seq.gpkg"],
+     "outputs": ["Data/tyrol_peaks_top200_wikidata.gpkg"]},
+    {"name": "tyrol_filter", "script": "filter_only_ones_in_tirol_and_mountains.py",
+     "inputs": ["Data/tyrol_peaks_top200_wikidata.gpkg"],
+     "outputs": ["Data/top_tyrol_mountains.gpkg"]},
+    {"name": "strava_crawl", "script": "retrieve.py",
+     "inputs": ["Data/top_tyrol_mountains.gpkg"],
+     "outputs": ["Data/segments2.json"]},
+    {"name": "webcam_detection", "script": "image_classification.py",
+     "inputs": [],
+     "outputs": ["Data/ppl_on_mountains_tyrol.csv"]},
+    # Data/200_tyrol_mountains_with_verfied_wiki_data.gpkg and
+    # Data/ppl_on_mountains_tyrol_cleaned.csv are manually curated inputs
+    {"name": "protection", "script": "add_protected_status_to_peaks.py",
+     "inputs": ["Data/200_tyrol_mountains_with_verfied_wiki_data.gpkg", "Data/austria_osm_protected_areas.gpkg"],
+     "outputs": [f"{STORE}/peaks/_base.parquet"]},
+    {"name": "strava_lines", "script": "convert_strava_lines_to_json.py",
+     "inputs": ["Data/segments2.json"],
+     "outputs": [f"{STORE}/strava_segments/_base.parquet"]},
+    {"name": "strava_aggregation", "script": "calculate_avg_number_of_athletes_strava.py",
+     "inputs": [f"{STORE}/peaks/_base.parquet", f"{STORE}/strava_segments/_base.parquet"],
+     "outputs": [f"{STORE}/peaks/avg_athlete_count_per_year.parquet"]},
+    {"name": "webcam_aggregation", "script": "adding_webcam_data_to_gpkg.py",
+     "inputs": [f"{STORE}/peaks/_base.parquet", "Data/ppl_on_mountains_tyrol_cleaned.csv"],
+     "outputs": [f"{STORE}/webcams/_base.parquet", f"{STORE}/peaks/people_on_webcams.parquet"]},
+    {"name": "kernel_aggregation", "script": "kernel_aggregation.py",
+     "inputs": [f"{STORE}/peaks/_base.parquet", f"{STORE}/strava_segments/_base.parquet",
+                f"{STORE}/webcams/_base.parquet"],
+     "outputs": [f"{STORE}/peaks/kernel_athlete_count_per_year.parquet",
+                 f"{STORE}/peaks/kernel_people_on_webcams.parquet"]},
+    {"name": "strava_heatmap", "script": "strava_heatmap.py",
+     "inputs": [f"{STORE}/strava_segments/_base.parquet", "Data/austria_osm_protected_areas.gpkg"],
+     "outputs": ["Data/strava_heatmap.tif", "Data/protected_areas_strava_pressure.csv"]},
+    {"name": "scores", "script": "calculate_scores.py",
+     "inputs": [f"{STORE}/peaks/_base.parquet", f"{STORE}/peaks/avg_athlete_count_per_year.parquet",
+                f"{STORE}/peaks/people_on_webcams.parquet", f"{STORE}/peaks/kernel_athlete_count_per_year.parquet",
+                f"{STORE}/peaks/kernel_people_on_webcams.parquet"],
+     "outputs": [f"{STORE}/peaks/stress_score.parquet", "Data/200_tyrol_mountains_final_stress_score.gpkg"]},
+    {"name": "dashboard_artifact", "script": "build_dashboard_artifact.py",
+     "inputs": ["Data/200_tyrol_mountains_final_stress_score.gpkg", "Data/austria_osm_protected_areas.gpkg"],
+     "outputs": ["Data/dashboard/peaks.feather", "Data/dashboard/protected.feather",
+                 "Data/dashboard/protected_lod_500m.geojson", "Data/dashboard/protected_lod_100m.geojson",
+                 "Data/dashboard/protected_lod_20m.geojson"]},
+]
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """sha256 of a file's content, None if it does not exist."""
+    if not os.path.exists(path):
+        return None
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def local_imports(script):
+    """Modules of this repository imported by ``script``, directly or through other local modules."""
+    root = os.path.dirname(os.path.abspath(script))
+    seen, todo = set(), [script]
+    while todo:
+        path = todo.pop()
+        try:
+            with open(path) as f:
+                tree = ast.parse(f.read(), filename=path)
+        except (OSError, SyntaxError):
+            continue
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                names = [node.module]
+            else:
+                continue
+            for name in names:
+                module = os.path.relpath(os.path.join(root, name.split(".")[0] + ".py"))
+                if module not in seen and module != script and os.path.exists(module):
+                    seen.add(module)
+                    todo.append(module)
+    return sorted(seen)
+
+
+def stage_fingerprint(stage):
+    """Combined hash of the stage script, the local modules it imports and all of its inputs."""
+    h = hashlib.sha256()
+    for path in [stage["script"]] + local_imports(stage["script"]) + sorted(stage["inputs"]):
+        h.update(path.encode())
+        h.update((file_hash(path) or "missing").encode())
+    return h.hexdigest()
+
+
+def build_dag(stages):
+    """Map each stage name to the names of the stages producing its inputs."""
+    producers = {}
+    for stage in stages:
+        for out in stage["outputs"]:
+            if out in producers:
+                raise ValueError(f"{out} is produced by both {producers[out]} and {stage['name']}")
+            producers[out] = stage["name"]
+
+    deps = {}
+    for stage in stages:
+        deps[stage["name"]] = {producers[i] for i in stage["inputs"] if i in producers}
+
+    # reject cycles early (Kahn's algorithm)
+    remaining = {name: set(d) for name, d in deps.items()}
+    while remaining:
+        ready = [name for name, d in remaining.items() if not d]
+        if not ready:
+            raise ValueError(f"Cycle between stages: {sorted(remaining)}")
+        for name in ready:
+            del remaining[name]
+        for d in remaining.values():
+            d.difference_update(ready)
+    return deps
+
+
+def is_up_to_date(stage, state):
+    previous = state.get(stage["name"])
+    if not previous or previous["fingerprint"] != stage_fingerprint(stage):
+        return False
+    return all(file_hash(out) == previous["outputs"].get(out) for out in stage["outputs"])
+
+
+def save_json(path, data):
+    """Write ``data`` as JSON atomically, an interrupted write keeps the previous file."""
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+def run_stage(stage):
+    """Run one stage script in a subprocess, logging its output. Returns (returncode, seconds)."""
+    os.makedirs(LOG_DIR, exist_ok=True)
+    start = time.perf_counter()
+    with open(os.path.join(LOG_DIR, f"{stage['name']}.log"), "w") as log:
+        proc = subprocess.run([sys.executable, stage["script"]], stdout=log, stderr=subprocess.STDOUT)
+    return proc.returncode, time.perf_counter() - start
+
+
+def run_pipeline(stages=STAGES, force=(), jobs=4, dry_run=False):
+    """Run all stages in dependency order, skipping unchanged ones. Returns the timing report."""
+    deps = build_dag(stages)
+    by_name = {s["name"]: s for s in stages}
+    state = {}
+    if os.path.exists(STATE_FILE):
+        with open(STATE_FILE) as f:
+            state = json.load(f)
+
+    report = {}
+    done, failed = set(), set()
+    # a stage must re-run whenever one of its upstream stages re-ran
+    rerun = set()
+    pending = set(by_name)
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        while pending or running:
+            for name in sorted(pending):
+                if not deps[name] <= (done | failed):
+                    continue
+                pending.discard(name)
+                stage = by_name[name]
+                if deps[name] & failed:
+                    failed.add(name)
+                    report[name] = {"status": "blocked", "seconds": 0.0}
+                    print(f"⏭️  {name}: blocked by a failed upstream stage")
+                    continue
+                missing = [i for i in stage["inputs"] if not os.path.exists(i)]
+                if missing and not dry_run:
+                    failed.add(name)
+                    report[name] = {"status": "missing_inputs", "seconds": 0.0, "missing": missing}
+                    print(f"❌ {name}: missing inputs {missing}")
+                    continue
+                needs_run = name in force or bool(deps[name] & rerun) or not is_up_to_date(stage, state)
+                if not needs_run:
+                    done.add(name)
+                    report[name] = {"status": "skipped", "seconds": 0.0}
+                    print(f"✔️  {name}: up to date")
+                    continue
+                if dry_run:
+                    done.add(name)
+                    rerun.add(name)
+                    report[name] = {"status": "would_run", "seconds": 0.0}
+                    print(f"▶️  {name}: would run {stage['script']}")
+                    continue
+                fingerprint = stage_fingerprint(stage)
+                print(f"▶️  {name}: running {stage['script']}")
+                running[pool.submit(run_stage, stage)] = (name, fingerprint)
+
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name, fingerprint = running.pop(future)
+                returncode, seconds = future.result()
+                if returncode == 0:
+                    done.add(name)
+                    rerun.add(name)
+                    state[name] = {
+                        "fingerprint": fingerprint,
+                        "outputs": {out: file_hash(out) for out in by_name[name]["outputs"]},
+                    }
+                    # saved right away, so an interrupted run does not repeat finished stages
+                    save_json(STATE_FILE, state)
+                    report[name] = {"status": "ran", "seconds": round(seconds, 3)}
+                    print(f"✅ {name}: finished in {seconds:.1f} s")
+                else:
+                    failed.add(name)
+                    report[name] = {"status": "failed", "seconds": round(seconds, 3), "returncode": returncode}
+                    print(f"❌ {name}: failed (see {LOG_DIR}/{name}.log)")
+
+    if not dry_run:
+        save_json(REPORT_FILE, report)
+    return report
+
+
+def print_report(report):
+    print()
+    print(f"{'stage':<22}{'status':<16}{'seconds':>10}")
+    for name, entry in report.items():
+        print(f"{name:<22}{entry['status']:<16}{entry['seconds']:>10.1f}")
+    print(f"{'total':<38}{sum(e['seconds'] for e in report.values()):>10.1f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run the pipeline, skipping stages whose inputs did not change.")
+    parser.add_argument("--force", nargs="*", default=[], help="stage names to run even if up to date")
+    parser.add_argument("--jobs", type=int, default=4, help="maximum number of stages running at once")
+    parser.add_argument("--dry-run", action="store_true", help="only show which stages would run")
+    args = parser.parse_args()
+
+    unknown = set(args.force) - {s["name"] for s in STAGES}
+    if unknown:
+        parser.error(f"unknown stages: {sorted(unknown)}")
+
+    report = run_pipeline(force=set(args.force), jobs=args.jobs, dry_run=args.dry_run)
+    print_report(report)
+    if any(e["status"] in ("failed", "missing_inputs", "blocked") for e in report.values()):
+        sys.exit(1)
@@ -0,0 +1,216 @@
+import json
+import math
+import os
+import time
+from datetime import date, datetime, timezone
+
+# Multi-day planning of the Strava segment crawl (used by retrieve.py).
+#
+# Strava allows 100 read requests per 15 minutes and 1000 per day, so crawling all
+# peaks of a region takes several days. The crawl state is persisted between runs:
+#
+#   peaks     per peak: date of the last explore call, the segment ids it found and
+#             the segment ids still waiting for their detail request
+#   segments  per segment id: date its details were last fetched
+#
+# Every run builds a queue from that state, ordered by how useful the calls are:
+#   0 resume   details still pending from an interrupted run (explore already paid)
+#   1 new      peaks without any Strava coverage yet, most viewed first
+#   2 refresh  peaks explored more than REFRESH_DAYS ago, stalest first
+# and works through it until the day's quota is spent. The remaining queue is
+# picked up by the next run.
+
+STATE_FILE = "Data/strava_crawl_state.json"
+SHORT_LIMIT = 100
+DAILY_LIMIT = 1000
+SHORT_WINDOW = 900  # seconds, Strava windows reset at :00, :15, :30 and :45 (UTC)
+DAY_WINDOW = 86400  # daily usage resets at midnight UTC
+MIN_INTERVAL = 2  # seconds between requests, even when the quota would allow more
+REFRESH_DAYS = 30
+SEGMENTS_PER_EXPLORE = 10  # explore returns at most 10 segments
+
+PRIORITY_NAMES = {0: "resume", 1: "new", 2: "refresh"}
+
+
+def today_utc():
+    return datetime.now(timezone.utc).date()
+
+
+def load_state(path=STATE_FILE):
+    if not os.path.exists(path):
+        return {"peaks": {}, "segments": {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_state(state, path=STATE_FILE):
+    # written to a temporary file first, an interrupted run never leaves a broken state
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def sync_peaks(state, peaks, key_col="id", popularity_col="wikipedia_views"):
+    """Add peaks that are not in the state yet, drop the ones no longer in the peaks file and
+    refresh name, location and popularity."""
+    keys = {str(k) for k in peaks[key_col]}
+    for key in set(state["peaks"]) - keys:
+        del state["peaks"][key]
+    for row in peaks.itertuples():
+        key = str(getattr(row, key_col))
+        popularity = getattr(row, popularity_col, None)
+        peak = state["peaks"].setdefault(key, {"explored": None, "segments": [], "pending": []})
+        peak["name"] = getattr(row, "name", None)
+        peak["lon"], peak["lat"] = row.geometry.x, row.geometry.y
+        peak["popularity"] = 0 if popularity is None or popularity != popularity else float(popularity)
+    return state
+
+
+def age_days(day, today):
+    return math.inf if day is None else (today - date.fromisoformat(day)).days
+
+
+def expected_new_segments(state):
+    """Average number of not yet fetched segments an explore call turned up so far."""
+    fetched = set()
+    new_per_explore = []
+    for peak in sorted((p for p in state["peaks"].values() if p["explored"]), key=lambda p: p["explored"]):
+        new_per_explore.append(sum(str(s) not in fetched for s in peak["segments"]))
+        fetched.update(str(s) for s in peak["segments"])
+    if not new_per_explore:
+        return SEGMENTS_PER_EXPLORE
+    return math.ceil(sum(new_per_explore) / len(new_per_explore))
+
+
+def estimate_calls(peak, state, today, refresh_days=REFRESH_DAYS, new_segments=SEGMENTS_PER_EXPLORE):
+    """Requests a peak still needs: one explore call plus the detail calls of stale segments."""
+    if peak["pending"]:
+        return len(peak["pending"])
+    if peak["explored"] is None:
+        return 1 + new_segments
+    stale = sum(age_days(state["segments"].get(str(s)), today) > refresh_days for s in peak["segments"])
+    return 1 + stale
+
+
+def build_queue(state, today=None, refresh_days=REFRESH_DAYS):
+    """Peaks that need requests, most useful first, as dicts with key, priority and calls."""
+    today = today or today_utc()
+    new_segments = expected_new_segments(state)
+    queue = []
+    for key, peak in state["peaks"].items():
+        age = age_days(peak["explored"], today)
+        if peak["pending"]:
+            priority, order = 0, -peak["popularity"]
+        elif peak["explored"] is None:
+            priority, order = 1, -peak["popularity"]
+        elif age > refresh_days:
+            priority, order = 2, -age
+        else:
+            continue
+        calls = estimate_calls(peak, state, today, refresh_days, new_segments)
+        queue.append({"key": key, "priority": priority, "order": order, "calls": calls})
+    queue.sort(key=lambda task: (task["priority"], task["order"], -state["peaks"][task["key"]]["popularity"]))
+    return queue
+
+
+def plan_days(queue, first_day_budget, daily_budget=DAILY_LIMIT):
+    """Assign every task the day (0 = today) on which the quota will reach it."""
+    spent, day, budget = 0, 0, first_day_budget
+    if first_day_budget <= 0:
+        day, budget = 1, daily_budget
+    for task in queue:
+        while spent + task["calls"] > budget and spent > 0:
+            spent, day, budget = 0, day + 1, daily_budget
+        task["day"] = day
+        spent += task["calls"]
+    return queue
+
+
+def print_plan(queue, state):
+    if not queue:
+        print("Strava crawl is up to date, nothing to do.")
+        return
+    days = queue[-1]["day"] + 1
+    today_calls = sum(t["calls"] for t in queue if t["day"] == 0)
+    print(f"Strava crawl plan: {len(queue)} peaks, ~{sum(t['calls'] for t in queue)} requests, ~{days} day(s)")
+    for priority, name in PRIORITY_NAMES.items():
+        tasks = [t for t in queue if t["priority"] == priority]
+        if tasks:
+            print(f"  {name:8s} {len(tasks):5d} peaks  ~{sum(t['calls'] for t in tasks):6d} requests")
+    print(f"  today    {sum(t['day'] == 0 for t in queue):5d} peaks  ~{today_calls:6d} requests")
+    for task in queue[:5]:
+        peak = state["peaks"][task["key"]]
+        print(f"    {PRIORITY_NAMES[task['priority']]:8s} {peak['name']} (~{task['calls']} requests)")
+
+
+class RateBudget:
+    """Remaining Strava quota, kept up to date from the rate limit headers of the responses."""
+
+    def __init__(self, short_limit=SHORT_LIMIT, daily_limit=DAILY_LIMIT, reserve=0):
+        self.short_limit = short_limit
+        self.daily_limit = daily_limit
+        self.reserve = reserve  # daily requests left for other uses of the token
+        self.short_usage = 0
+        self.daily_usage = 0
+        self._windows = self._current_windows()
+        self._last_call = 0.0
+
+    @staticmethod
+    def _current_windows(now=None):
+        now = time.time() if now is None else now
+        return int(now // SHORT_WINDOW), int(now // DAY_WINDOW)
+
+    def _roll_windows(self):
+        short_window, day = self._current_windows()
+        if short_window != self._windows[0]:
+            self.short_usage = 0
+        if day != self._windows[1]:
+            self.daily_usage = 0
+        self._windows = (short_window, day)
+
+    def update(self, headers):
+        """Take limits and usage from a response (read limits if Strava sends them separately)."""
+        for prefix in ("X-ReadRateLimit", "X-RateLimit"):
+            limit, usage = headers.get(f"{prefix}-Limit"), headers.get(f"{prefix}-Usage")
+            if limit and usage:
+                self.short_limit, self.daily_limit = (int(v) for v in limit.split(","))
+                self.short_usage, self.daily_usage = (int(v) for v in usage.split(","))
+                self._windows = self._current_windows()
+                return
+
+    def to_dict(self):
+        self._roll_windows()
+        return {"short_limit": self.short_limit, "daily_limit": self.daily_limit,
+                "daily_usage": self.daily_usage, "day": self._windows[1]}
+
+    def restore(self, quota):
+        """Limits and usage saved by the last run, the usage only if it is from the same day."""
+        if not quota:
+            return
+        self.short_limit, self.daily_limit = quota["short_limit"], quota["daily_limit"]
+        if quota["day"] == self._current_windows()[1]:
+            self.daily_usage = quota["daily_usage"]
+
+    def short_remaining(self):
+        self._roll_windows()
+        return self.short_limit - self.short_usage
+
+    def daily_remaining(self):
+        self._roll_windows()
+        return self.daily_limit - self.reserve - self.daily_usage
+
+    def wait(self, metrics, source="strava"):
+        """Before a request: wait for the next 15 minute window if this one is used up,
+        otherwise spread the remaining requests of the window evenly over its rest."""
+        if self.short_remaining() <= 0:
+            metrics.sleep(source, "quota_wait", SHORT_WINDOW - time.time() % SHORT_WINDOW + 1)
+        window_left = SHORT_WINDOW - time.time() % SHORT_WINDOW
+        interval = max(MIN_INTERVAL, window_left / max(self.short_remaining(), 1))
+        delay = self._last_call + interval - time.monotonic()
+        if delay > 0:
+            metrics.sleep(source, "throttle", delay)
+        self._last_call = time.monotonic()
+        # counted locally too, in case a response comes without rate limit headers
+        self.short_usage += 1
+        self.daily_usage += 1
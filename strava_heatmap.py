@@ -0,0 +1,152 @@
+import math
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import rasterio  # pip install rasterio
+import shapely
+from rasterio.enums import Resampling
+from rasterio.errors import WindowError
+from rasterio.features import geometry_mask
+from rasterio.transform import from_origin
+from rasterio.windows import Window, from_bounds
+
+from dataset_store import read_layer
+
+# Strava segment density raster: every segment is burned onto a metric grid,
+# weighted by its athlete_count_per_year, so the pressure between peaks is kept.
+#
+# A cell holds sum(athlete_count_per_year * meters of segment inside the cell).
+# The raster is a tiled, deflate-compressed GeoTIFF with average overviews, so
+# the dashboard reads a zoom-appropriate level of just the visible window and
+# zonal statistics only read the windows of the polygons they cover.
+
+HEATMAP_PATH = "Data/strava_heatmap.tif"
+PROTECTED_PATH = "Data/austria_osm_protected_areas.gpkg"
+ZONAL_STATS_PATH = "Data/protected_areas_strava_pressure.csv"
+HEATMAP_CRS = "EPSG:3035"
+CELL_SIZE = 100  # meters
+TILE_SIZE = 256
+OVERVIEW_FACTORS = [2, 4, 8, 16, 32, 64]
+# upper bound of line samples held in memory at once while burning
+MAX_SAMPLES_PER_CHUNK = 5_000_000
+
+
+def _segment_pieces(geometries):
+    """Start/end coordinates and owning line of every straight piece of the lines."""
+    coords, line_ids = shapely.get_coordinates(geometries, return_index=True)
+    same_line = line_ids[:-1] == line_ids[1:]
+    return coords[:-1][same_line], coords[1:][same_line], line_ids[:-1][same_line]
+
+
+def burn_lines(gdf_lines, weight_col="athlete_count_per_year", cell_size=CELL_SIZE):
+    """
+    Rasterize lines weighted by a column onto a metric grid.
+
+    Every straight piece is sampled at half the cell size, each sample carries
+    weight * piece length / samples, and the samples are summed per cell with
+    one bincount per chunk - no per-line Python loop.
+
+    Returns
+    -------
+    tuple
+        (float32 array, affine transform) in HEATMAP_CRS.
+    """
+    gdf_lines = gdf_lines.to_crs(HEATMAP_CRS)
+    gdf_lines = gdf_lines[~gdf_lines.geometry.is_empty & gdf_lines.geometry.notna()]
+    weights = pd.to_numeric(gdf_lines[weight_col], errors="coerce").fillna(0).to_numpy(dtype=float)
+
+    minx, miny, maxx, maxy = gdf_lines.total_bounds
+    minx, miny = math.floor(minx / cell_size) * cell_size, math.floor(miny / cell_size) * cell_size
+    width = int(math.ceil((maxx - minx) / cell_size)) + 1
+    height = int(math.ceil((maxy - miny) / cell_size)) + 1
+    top = miny + height * cell_size
+    grid = np.zeros(width * height, dtype=np.float64)
+
+    start, end, line_ids = _segment_pieces(gdf_lines.geometry.to_numpy())
+    lengths = np.hypot(*(end - start).T)
+    n_samples = np.maximum(np.ceil(lengths / (cell_size / 2)).astype(np.int64), 1)
+
+    # chunks of pieces with a bounded number of samples
+    bounds = np.searchsorted(np.cumsum(n_samples), np.arange(MAX_SAMPLES_PER_CHUNK, n_samples.sum(),
+                                                              MAX_SAMPLES_PER_CHUNK))
+    for pieces in np.split(np.arange(len(n_samples)), bounds):
+        if not len(pieces):
+            continue
+        n = n_samples[pieces]
+        piece = np.repeat(pieces, n)
+        # position of every sample along its piece (cell centers of n equal parts)
+        offsets = np.arange(len(piece)) - np.repeat(np.cumsum(n) - n, n)
+        t = (offsets + 0.5) / np.repeat(n, n)
+        xy = start[piece] + t[:, None] * (end[piece] - start[piece])
+        col = ((xy[:, 0] - minx) // cell_size).astype(np.int64)
+        row = ((top - xy[:, 1]) // cell_size).astype(np.int64)
+        sample_weight = weights[line_ids[piece]] * lengths[piece] / np.repeat(n, n)
+        grid += np.bincount(row * width + col, weights=sample_weight, minlength=grid.size)
+
+    return grid.reshape(height, width).astype(np.float32), from_origin(minx, top, cell_size, cell_size)
+
+
+def write_heatmap(grid, transform, path=HEATMAP_PATH):
+    """Write the grid as a tiled, compressed GeoTIFF with average overviews."""
+    profile = {
+        "driver": "GTiff", "width": grid.shape[1], "height": grid.shape[0], "count": 1,
+        "dtype": "float32", "crs": HEATMAP_CRS, "transform": transform, "nodata": None,
+        "tiled": True, "blockxsize": TILE_SIZE, "blockysize": TILE_SIZE,
+        "compress": "deflate", "predictor": 3, "BIGTIFF": "IF_SAFER",
+    }
+    with rasterio.open(path, "w", **profile) as dst:
+        dst.write(grid, 1)
+        factors = [f for f in OVERVIEW_FACTORS if min(grid.shape) // f >= 1]
+        dst.build_overviews(factors, Resampling.average)
+        dst.update_tags(ns="rio_overview", resampling="average")
+    return path
+
+
+def zonal_stats(polygons, path=HEATMAP_PATH):
+    """
+    Sum, mean and max of the heatmap inside every polygon.
+
+    Only the window around each polygon is read from the raster.
+
+    Returns
+    -------
+    DataFrame
+        One row per polygon (index of ``polygons``): strava_pressure_sum, _mean, _max.
+    """
+    rows = []
+    with rasterio.open(path) as src:
+        polygons = polygons.to_crs(src.crs)
+        full = Window(0, 0, src.width, src.height)
+        for geom in polygons.geometry:
+            stats = {"strava_pressure_sum": 0.0, "strava_pressure_mean": np.nan, "strava_pressure_max": np.nan}
+            if geom is not None and not geom.is_empty:
+                window = from_bounds(*geom.bounds, transform=src.transform).round_offsets().round_lengths()
+                try:
+                    window = window.intersection(full)
+                except WindowError:
+                    window = None
+                if window is not None and window.width > 0 and window.height > 0:
+                    values = src.read(1, window=window)
+                    inside = ~geometry_mask([geom], values.shape, src.window_transform(window))
+                    if inside.any():
+                        values = values[inside]
+                        stats = {"strava_pressure_sum": float(values.sum()),
+                                 "strava_pressure_mean": float(values.mean()),
+                                 "strava_pressure_max": float(values.max())}
+            rows.append(stats)
+    return pd.DataFrame(rows, index=polygons.index)
+
+
+if __name__ == '__main__':
+    gdf_lines = read_layer("strava_segments", columns=["athlete_count_per_year"])
+    grid, transform = burn_lines(gdf_lines)
+    write_heatmap(grid, transform)
+    print(f"🗺️  Burned {len(gdf_lines):,} segments onto a {grid.shape[1]}x{grid.shape[0]} grid, "
+          f"saved to {HEATMAP_PATH}")
+
+    areas = gpd.read_file(PROTECTED_PATH)
+    stats = zonal_stats(areas)
+    keep = [c for c in ["name", "protect_class"] if c in areas.columns]
+    pd.concat([areas[keep], stats], axis=1).to_csv(ZONAL_STATS_PATH, index=False)
+    print(f"📁 Zonal statistics of {len(areas):,} protected areas saved to {ZONAL_STATS_PATH}")
@@ -0,0 +1,315 @@
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl
+
+import numpy as np
+
+import dashboard_data
+from name_index import NameIndex
+from run_pipeline import file_hash
+
+# Read-only JSON API over the scored peaks layer, for tools outside the dashboard.
+#
+#   python stress_api.py --port 8766
+#   curl "http://127.0.0.1:8766/peaks?bbox=10.8,46.8,11.2,47.1&stress=0,1&format=geojson"
+#
+# GET /peaks query parameters:
+#   bbox=minx,miny,maxx,maxy   lon/lat bounding box
+#   ele=min,max                elevation range (m), either side may be empty
+#   stress=min,max             stress score range, either side may be empty
+#   name=...                   fuzzy name search (see name_index.py)
+#   sort=stress                highest stress first (default: dataset order)
+#   format=columns|geojson     compact column arrays (default) or a FeatureCollection
+#   limit, offset              pagination, limit is capped at MAX_LIMIT
+# GET /meta returns the dataset version, row count and value ranges.
+#
+# The peaks are loaded once (memory-mapped dashboard artifact if it is fresh) into
+# plain numpy arrays; bbox queries bisect a longitude-sorted order. Every response
+# carries an ETag derived from the dataset version and the normalized query, so
+# clients can revalidate with If-None-Match and get a 304 without a body.
+# Encoded responses are kept in a small LRU cache.
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 5000
+RESPONSE_CACHE_ENTRIES = 1024
+# how often the peaks file is checked for a new dataset version
+RELOAD_CHECK_SECONDS = 5
+COORD_DECIMALS = 6
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def _range(value, name):
+    """Parse "min,max" (either side may be empty) into a (min, max) float tuple."""
+    parts = value.split(",")
+    if len(parts) != 2:
+        raise BadRequest(f"{name} must be min,max")
+    try:
+        bounds = [float(p) if p.strip() else None for p in parts]
+    except ValueError:
+        raise BadRequest(f"{name} must be numeric")
+    # nan/inf would silently match nothing; an empty side is the open bound
+    if any(b is not None and not np.isfinite(b) for b in bounds):
+        raise BadRequest(f"{name} bounds must be finite")
+    low, high = bounds
+    return -np.inf if low is None else low, np.inf if high is None else high
+
+
+def _json_list(values, decimals=None):
+    """numpy array -> list with NaN as None."""
+    if values.dtype.kind == "f":
+        if decimals is not None:
+            values = values.round(decimals)
+        return [None if v != v else v for v in values.tolist()]
+    return values.tolist()
+
+
+class PeakIndex:
+    """In-memory arrays and indexes over the scored peaks."""
+
+    def __init__(self, peaks_path=dashboard_data.PEAKS_PATH, artifact_dir=dashboard_data.ARTIFACT_DIR):
+        self.peaks_path = peaks_path
+        self.mtime = os.path.getmtime(peaks_path)
+        self.version = file_hash(peaks_path)[:16]
+
+        peaks, self.stress_col = dashboard_data.load_peaks(peaks_path, artifact_dir)
+        n = len(peaks)
+        self.ids = peaks["id"].to_numpy() if "id" in peaks.columns else np.arange(n)
+        self.names = peaks["name"].to_numpy(dtype=object) if "name" in peaks.columns else np.full(n, None)
+        self.lon = peaks["longitude"].to_numpy(dtype=float)
+        self.lat = peaks["latitude"].to_numpy(dtype=float)
+        self.ele = peaks["ele"].to_numpy(dtype=float) if "ele" in peaks.columns else np.full(n, np.nan)
+        self.stress = peaks[self.stress_col].to_numpy(dtype=float) if self.stress_col else np.full(n, np.nan)
+
+        self._lon_order = np.argsort(self.lon, kind="stable")
+        self._lon_sorted = self.lon[self._lon_order]
+        self._names = NameIndex(self.names)
+
+    def __len__(self):
+        return len(self.lon)
+
+    def select(self, bbox=None, ele=None, stress=None, name=None, sort=None):
+        """Positions of the peaks matching all given filters."""
+        mask = np.ones(len(self), dtype=bool)
+        if bbox is not None:
+            minx, miny, maxx, maxy = bbox
+            lo = np.searchsorted(self._lon_sorted, minx, side="left")
+            hi = np.searchsorted(self._lon_sorted, maxx, side="right")
+            in_lon = np.zeros(len(self), dtype=bool)
+            in_lon[self._lon_order[lo:hi]] = True
+            mask &= in_lon & (self.lat >= miny) & (self.lat <= maxy)
+        if ele is not None:
+            mask &= (self.ele >= ele[0]) & (self.ele <= ele[1])
+        if stress is not None:
+            mask &= (self.stress >= stress[0]) & (self.stress <= stress[1])
+        if name:
+            mask &= self._names.mask(name)
+
+        positions = np.flatnonzero(mask)
+        if sort == "stress":
+            # NaN scores last
+            positions = positions[np.argsort(np.nan_to_num(-self.stress[positions], nan=np.inf), kind="stable")]
+        return positions
+
+    def columns(self, positions):
+        return {
+            "id": _json_list(self.ids[positions]),
+            "name": self.names[positions].tolist(),
+            "lon": _json_list(self.lon[positions], COORD_DECIMALS),
+            "lat": _json_list(self.lat[positions], COORD_DECIMALS),
+            "ele": _json_list(self.ele[positions]),
+            "stress_score": _json_list(self.stress[positions], 4),
+        }
+
+    def features(self, positions):
+        cols = self.columns(positions)
+        return [
+            {"type": "Feature", "id": pid,
+             "geometry": {"type": "Point", "coordinates": [lon, lat]},
+             "properties": {"name": name, "ele": ele, "stress_score": stress}}
+            for pid, name, lon, lat, ele, stress
+            in zip(cols["id"], cols["name"], cols["lon"], cols["lat"], cols["ele"], cols["stress_score"])
+        ]
+
+    def meta(self):
+        # rounded like the /peaks values, the peaks are held as float32 (peak_schema.py)
+        def value_range(values, decimals):
+            valid = values[~np.isnan(values)]
+            return [round(float(valid.min()), decimals), round(float(valid.max()), decimals)] if len(valid) else None
+
+        return {
+            "version": self.version,
+            "count": len(self),
+            "stress_column": self.stress_col,
+            "bbox": [round(float(v), COORD_DECIMALS)
+                     for v in (self.lon.min(), self.lat.min(), self.lon.max(), self.lat.max())]
+            if len(self) else None,
+            "ele_range": value_range(self.ele, 1),
+            "stress_range": value_range(self.stress, 4),
+        }
+
+
+def parse_peaks_query(query):
+    """Validated, normalized /peaks parameters (also used as the cache key)."""
+    unknown = set(query) - {"bbox", "ele", "stress", "name", "sort", "format", "limit", "offset"}
+    if unknown:
+        raise BadRequest(f"unknown parameters: {sorted(unknown)}")
+
+    params = {"bbox": None, "ele": None, "stress": None, "name": query.get("name", "").strip() or None}
+    if "bbox" in query:
+        try:
+            bbox = tuple(float(v) for v in query["bbox"].split(","))
+        except ValueError:
+            raise BadRequest("bbox must be numeric")
+        if len(bbox) != 4:
+            raise BadRequest("bbox must be minx,miny,maxx,maxy")
+        if not np.isfinite(bbox).all():
+            raise BadRequest("bbox bounds must be finite")
+        if bbox[0] > bbox[2] or bbox[1] > bbox[3]:
+            raise BadRequest("bbox min must not be above max")
+        params["bbox"] = bbox
+    for key in ("ele", "stress"):
+        if key in query:
+            params[key] = _range(query[key], key)
+
+    params["sort"] = query.get("sort") or None
+    if params["sort"] not in (None, "stress"):
+        raise BadRequest("sort must be stress")
+    params["format"] = query.get("format", "columns")
+    if params["format"] not in ("columns", "geojson"):
+        raise BadRequest("format must be columns or geojson")
+    try:
+        params["limit"] = min(int(query.get("limit", DEFAULT_LIMIT)), MAX_LIMIT)
+        params["offset"] = int(query.get("offset", 0))
+    except ValueError:
+        raise BadRequest("limit and offset must be integers")
+    if params["limit"] < 0 or params["offset"] < 0:
+        raise BadRequest("limit and offset must not be negative")
+    return params
+
+
+def peaks_response(index, params):
+    positions = index.select(params["bbox"], params["ele"], params["stress"], params["name"], params["sort"])
+    total = len(positions)
+    page = positions[params["offset"]:params["offset"] + params["limit"]]
+    next_offset = params["offset"] + len(page) if params["offset"] + len(page) < total else None
+
+    body = {"version": index.version, "total": total, "offset": params["offset"], "limit": params["limit"],
+            "next_offset": next_offset}
+    if params["format"] == "geojson":
+        return {"type": "FeatureCollection", **body, "features": index.features(page)}
+    return {**body, "columns": index.columns(page)}
+
+
+class StressApi:
+    """Holds the current PeakIndex, reloads it when the dataset changes, caches encoded responses."""
+
+    def __init__(self, peaks_path=dashboard_data.PEAKS_PATH, artifact_dir=dashboard_data.ARTIFACT_DIR):
+        self.peaks_path = peaks_path
+        self.artifact_dir = artifact_dir
+        self.index = PeakIndex(peaks_path, artifact_dir)
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_check = time.monotonic()
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._last_check < RELOAD_CHECK_SECONDS:
+            return
+        self._last_check = now
+        if os.path.getmtime(self.peaks_path) != self.index.mtime:
+            index = PeakIndex(self.peaks_path, self.artifact_dir)
+            with self._lock:
+                self.index = index
+                self._cache.clear()
+            print(f"🔄 Reloaded dataset version {index.version}")
+
+    def handle(self, path, query):
+        """Return (status, etag, body bytes) for a GET request."""
+        self._maybe_reload()
+        index = self.index
+        if path == "/meta":
+            key = ("meta",)
+        elif path == "/peaks":
+            params = parse_peaks_query(query)
+            key = tuple(sorted(params.items()))
+        else:
+            return 404, None, b'{"error": "not found"}'
+
+        cache_key = (index.version, key)
+        with self._lock:
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                self._cache.move_to_end(cache_key)
+                return (200,) + cached
+
+        result = index.meta() if key == ("meta",) else peaks_response(index, params)
+        body = json.dumps(result, separators=(",", ":")).encode()
+        etag = '"' + index.version + "-" + hashlib.sha256(repr(key).encode()).hexdigest()[:16] + '"'
+        with self._lock:
+            self._cache[cache_key] = (etag, body)
+            if len(self._cache) > RESPONSE_CACHE_ENTRIES:
+                self._cache.popitem(last=False)
+        return 200, etag, body
+
+
+def make_handler(api, verbose=False):
+    class StressApiHandler(BaseHTTPRequestHandler):
+        # keep-alive, so clients can reuse connections; without TCP_NODELAY the
+        # separate header/body writes stall on delayed ACKs
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, fmt, *args):
+            if verbose:
+                super().log_message(fmt, *args)
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            try:
+                status, etag, body = api.handle(url.path.rstrip("/") or "/", dict(parse_qsl(url.query)))
+            except BadRequest as e:
+                return self._send(400, json.dumps({"error": str(e)}).encode())
+
+            if etag and etag in (t.strip() for t in self.headers.get("If-None-Match", "").split(",")):
+                return self._send(304, b"", etag)
+            self._send(status, body, etag)
+
+        def _send(self, status, body, etag=None):
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            if etag:
+                self.send_header("ETag", etag)
+                self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            self.wfile.write(body)
+
+    return StressApiHandler
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Read-only JSON API over the scored peaks.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--peaks", default=dashboard_data.PEAKS_PATH, help="scored peaks GeoPackage")
+    parser.add_argument("--artifact-dir", default=dashboard_data.ARTIFACT_DIR)
+    parser.add_argument("--verbose", action="store_true")
+    config = parser.parse_args()
+
+    api = StressApi(config.peaks, config.artifact_dir)
+    server = ThreadingHTTPServer((config.host, config.port), make_handler(api, config.verbose))
+    print(f"📡 Stress API on http://{config.host}:{config.port} "
+          f"({len(api.index):,} peaks, version {api.index.version})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
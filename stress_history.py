@@ -0,0 +1,170 @@
+import json
+import os
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+
+# Append-only history of per-peak indicators and stress scores.
+#
+#   Data/history/deltas/<run date>.parquet  rows of the peaks that changed in that run
+#   Data/history/_latest.parquet            current values of every peak (rewritten each run)
+#   Data/history/runs.json                  one entry per run: date, changed and total peaks and
+#                                           the fingerprint of the scoring configuration
+#
+# A delta row holds the complete values of one peak at that run date, so the
+# trend of a peak is just its rows across the deltas (sorted by id, so parquet
+# row-group statistics skip most of every file) - no full snapshot is read.
+# Peaks that disappear get a row with removed=True.
+
+HISTORY_DIR = "Data/history"
+KEY_COL = "id"
+# indicator columns are stored under generic names so buffer and kernel runs share a schema
+INDICATOR_COLUMNS = ["wikipedia_views", "strava_indicator", "webcam_indicator", "protect_class"]
+SCORE_COLUMNS = ["wiki_pop_measure", "strava_pop_measure", "webcam_pop_measure",
+                 "gdf_total_popularity_score", "protect_threshold", "stress_score"]
+
+
+def _paths(history_dir):
+    return (os.path.join(history_dir, "deltas"), os.path.join(history_dir, "_latest.parquet"),
+            os.path.join(history_dir, "runs.json"))
+
+
+def load_latest(history_dir=HISTORY_DIR):
+    """Current values of every peak indexed by id, None if no run was recorded yet."""
+    _, latest_path, _ = _paths(history_dir)
+    if not os.path.exists(latest_path):
+        return None
+    return pd.read_parquet(latest_path).set_index(KEY_COL)
+
+
+def load_runs(history_dir=HISTORY_DIR):
+    _, _, runs_path = _paths(history_dir)
+    if not os.path.exists(runs_path):
+        return []
+    with open(runs_path) as f:
+        return json.load(f)
+
+
+def unchanged_rows(current, previous, columns):
+    """Boolean Series (index of ``current``): True where all columns equal the previous values (NaN == NaN)."""
+    same = pd.Series(current.index.isin(previous.index), index=current.index)
+    previous = previous.reindex(current.index)
+    for col in columns:
+        a, b = current[col], previous[col]
+        same &= (a == b) | (a.isna() & b.isna())
+    return same
+
+
+def last_run(history_dir=HISTORY_DIR):
+    """Entry of the last recorded run in runs.json, None if there is none."""
+    runs = load_runs(history_dir)
+    return runs[-1] if runs else None
+
+
+def check_run_date(run_date=None, history_dir=HISTORY_DIR):
+    """
+    The ISO run date (today if None); raises ValueError if it is before the last recorded run.
+    Callers check it before writing any output of the run.
+    """
+    run_date = run_date or date.today().isoformat()
+    last = last_run(history_dir)
+    if last and run_date < last["run_date"]:
+        # the delta is taken against the newest state, a trend would carry it forward wrongly
+        raise ValueError(f"Run date {run_date} is before the last recorded run {last['run_date']}")
+    return run_date
+
+
+def record_run(values, run_date=None, history_dir=HISTORY_DIR, scoring=None):
+    """
+    Append the peaks whose values changed since the last run as a delta.
+
+    Parameters
+    ----------
+    values : DataFrame
+        One row per peak with KEY_COL, INDICATOR_COLUMNS and SCORE_COLUMNS.
+    run_date : str or None
+        ISO date of the run, today if None. Must not be before the last recorded run.
+    scoring : str or None
+        Fingerprint of the scoring configuration the scores were computed with.
+
+    Returns
+    -------
+    int
+        Number of peaks written to the delta (changed, new or removed).
+    """
+    run_date = check_run_date(run_date, history_dir)
+    deltas_dir, latest_path, runs_path = _paths(history_dir)
+    runs = load_runs(history_dir)
+    columns = INDICATOR_COLUMNS + SCORE_COLUMNS
+    # all values as float, so every delta file has the same schema
+    current = values[[KEY_COL] + columns].set_index(KEY_COL).astype(float)
+
+    previous = load_latest(history_dir)
+    if previous is None:
+        delta = current.copy()
+        delta["removed"] = False
+    else:
+        delta = current[~unchanged_rows(current, previous, columns)].copy()
+        delta["removed"] = False
+        gone = previous.index.difference(current.index)
+        if len(gone):
+            removed = pd.DataFrame(np.nan, index=gone, columns=columns)
+            removed["removed"] = True
+            delta = pd.concat([delta, removed])
+
+    os.makedirs(deltas_dir, exist_ok=True)
+    if len(delta):
+        delta = delta.sort_index().reset_index()
+        delta.insert(1, "run_date", run_date)
+        name, n = run_date, 1
+        # several runs on one day get their own file
+        while os.path.exists(os.path.join(deltas_dir, f"{name}.parquet")):
+            n += 1
+            name = f"{run_date}_{n:03d}"
+        delta.to_parquet(os.path.join(deltas_dir, f"{name}.parquet"), index=False)
+
+    current.reset_index().to_parquet(latest_path, index=False)
+    runs.append({"run_date": run_date, "changed": len(delta), "total": len(current), "scoring": scoring})
+    with open(runs_path, "w") as f:
+        json.dump(runs, f, indent=2)
+    return len(delta)
+
+
+def load_history(peak_ids=None, columns=None, history_dir=HISTORY_DIR):
+    """
+    Delta rows of the given peaks (all peaks if None), sorted by id and run date.
+
+    Only the requested columns are read and the id filter is pushed down to the
+    parquet files.
+    """
+    deltas_dir, _, _ = _paths(history_dir)
+    read_columns = [KEY_COL, "run_date", "removed"] + (columns or INDICATOR_COLUMNS + SCORE_COLUMNS)
+    if not os.path.isdir(deltas_dir) or not os.listdir(deltas_dir):
+        return pd.DataFrame(columns=read_columns)
+    dataset = ds.dataset(deltas_dir, format="parquet")
+    row_filter = ds.field(KEY_COL).isin(list(peak_ids)) if peak_ids is not None else None
+    history = dataset.to_table(columns=read_columns, filter=row_filter).to_pandas()
+    return history.sort_values([KEY_COL, "run_date"], kind="stable").reset_index(drop=True)
+
+
+def peak_trend(peak_id, column="stress_score", history_dir=HISTORY_DIR):
+    """
+    Value of one column per run for a single peak.
+
+    Returns
+    -------
+    Series
+        Indexed by run date, from the first run the peak appeared in to the last
+        recorded run (values carried forward between changes, NaN after removal).
+    """
+    history = load_history([peak_id], [column], history_dir)
+    if history.empty:
+        return pd.Series(dtype=float, name=column)
+    changes = history.drop_duplicates("run_date", keep="last").set_index("run_date")
+    run_dates = sorted({r["run_date"] for r in load_runs(history_dir)} | set(changes.index))
+    run_dates = [d for d in run_dates if d >= changes.index[0]]
+    # every run takes the whole row of the last change before it
+    trend = changes.reindex(run_dates, method="ffill")
+    return trend[column].where(~trend["removed"].astype(bool))
@@ -0,0 +1,150 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+
+# Tiled, multi-process execution of the per-peak spatial joins
+# (calculate_avg_number_of_athletes_strava.py, adding_webcam_data_to_gpkg.py,
+# add_protected_status_to_peaks.py) for region sizes where one sjoin over
+# everything is too slow or too large.
+#
+# The peaks are split into square tiles of TILE_SIZE meters (metric CRS); every
+# peak belongs to exactly one tile. A tile gets all features whose bounding box
+# reaches into the tile extended by a halo of the search radius, so each of its
+# peaks sees every feature it can match. Tiles are joined in a process pool and
+# each returns partial aggregates per peak - sum, count and max of the matched
+# values - which combine across tiles (sum + sum, count + count, max of max), so
+# mean, sum and max come out exactly as in the single-process join.
+
+TILE_SIZE = 50_000  # meters
+WORKERS = os.cpu_count() or 1
+AGGREGATES = ("sum", "mean", "max")
+METERS_PER_DEGREE = 111_320
+
+
+def tile_ids(xy, origin, tile_size):
+    """Column/row of the tile every coordinate falls in."""
+    return np.floor((xy - origin) / tile_size).astype(np.int64)
+
+
+def features_per_tile(feature_bounds, origin, tile_size, halo, tiles):
+    """
+    Feature positions per tile whose bounding box reaches into the tile extended by ``halo``.
+
+    Parameters
+    ----------
+    feature_bounds : ndarray
+        (n, 4) minx, miny, maxx, maxy of every feature.
+    tiles : set
+        (col, row) of the tiles that own peaks; other tiles are skipped.
+    """
+    low = tile_ids(feature_bounds[:, :2] - halo, origin, tile_size)
+    high = tile_ids(feature_bounds[:, 2:] + halo, origin, tile_size)
+    # expand every feature to the tiles its extended bbox covers
+    n_cols = high[:, 0] - low[:, 0] + 1
+    n_rows = high[:, 1] - low[:, 1] + 1
+    counts = n_cols * n_rows
+    feature = np.repeat(np.arange(len(feature_bounds)), counts)
+    offset = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    col = low[feature, 0] + offset % n_cols[feature]
+    row = low[feature, 1] + offset // n_cols[feature]
+
+    per_tile = {}
+    order = np.lexsort((feature, row, col))
+    col, row, feature = col[order], row[order], feature[order]
+    starts = np.flatnonzero(np.r_[True, (col[1:] != col[:-1]) | (row[1:] != row[:-1])])
+    for start, end in zip(starts, np.r_[starts[1:], len(feature)]):
+        tile = (int(col[start]), int(row[start]))
+        if tile in tiles:
+            per_tile[tile] = feature[start:end]  # ascending, original feature order
+    return per_tile
+
+
+def partial_aggregates(peaks, features, value_col, radius, predicate):
+    """
+    Join features to the peaks (buffered by ``radius`` if > 0) and return sum, count and max
+    of ``value_col`` per matched peak, indexed by the peaks' index.
+    """
+    peak_geoms = peaks.geometry.buffer(radius) if radius > 0 else peaks.geometry
+    targets = gpd.GeoDataFrame(geometry=peak_geoms, crs=peaks.crs)
+    joined = gpd.sjoin(features[[value_col, features.geometry.name]], targets, how="inner", predicate=predicate)
+    grouped = joined.groupby("index_right")[value_col]
+    return pd.DataFrame({"sum": grouped.sum(), "count": grouped.count(), "max": grouped.max()})
+
+
+def merge_partials(partials):
+    """Combine partial aggregates of several tiles (a peak may appear in more than one)."""
+    partials = [p for p in partials if len(p)]
+    if not partials:
+        return pd.DataFrame({"sum": [], "count": [], "max": []})
+    combined = pd.concat(partials)
+    if combined.index.is_unique:
+        return combined
+    return combined.groupby(level=0).agg({"sum": "sum", "count": "sum", "max": "max"})
+
+
+def finalize(merged, how):
+    """Turn merged partials into the aggregate ``how`` ("sum", "mean" or "max")."""
+    if how == "mean":
+        return merged["sum"] / merged["count"]
+    if how in ("sum", "max"):
+        return merged[how]
+    raise ValueError(f"Unknown aggregate: {how}")
+
+
+def _tile_task(args):
+    return partial_aggregates(*args)
+
+
+def tiled_aggregate(peaks, features, value_col, how, radius=0, predicate="intersects",
+                    tile_size=TILE_SIZE, workers=WORKERS):
+    """
+    Aggregate ``value_col`` of the features matching each peak, tile by tile in a process pool.
+
+    Parameters
+    ----------
+    peaks, features : GeoDataFrame
+        Both in the same CRS, a metric one if ``radius`` is used.
+    how : str
+        "sum", "mean" or "max" of the matched values.
+    radius : float
+        Search radius in meters (peaks are buffered by it); 0 joins the peak points themselves.
+    predicate : str
+        sjoin predicate from the features' side, e.g. "intersects" for lines in a buffer,
+        "within" for points in a buffer, "contains" for polygons containing the peak.
+
+    Returns
+    -------
+    Series
+        Aggregate per matched peak, indexed by the peaks' index like the groupby result of
+        the single-process join.
+    """
+    if how not in AGGREGATES:
+        raise ValueError(f"Unknown aggregate: {how}")
+    if peaks.crs is not None and peaks.crs.is_geographic:
+        if radius:
+            raise ValueError("A search radius needs a metric CRS")
+        # only the partitioning uses the tile size, the join itself stays in the original CRS
+        tile_size = tile_size / METERS_PER_DEGREE
+    peak_xy = np.column_stack([peaks.geometry.x.to_numpy(), peaks.geometry.y.to_numpy()])
+    origin = peak_xy.min(axis=0) if len(peak_xy) else np.zeros(2)
+    peak_tiles = tile_ids(peak_xy, origin, tile_size)
+    tiles = {tuple(t) for t in peak_tiles.tolist()}
+    feature_tiles = features_per_tile(features.geometry.bounds.to_numpy(), origin, tile_size, radius, tiles)
+
+    tasks = []
+    for tile, feature_pos in feature_tiles.items():
+        in_tile = (peak_tiles[:, 0] == tile[0]) & (peak_tiles[:, 1] == tile[1])
+        tasks.append((peaks[in_tile], features.iloc[feature_pos], value_col, radius, predicate))
+    # largest tiles first, so one big tile does not run alone at the end
+    tasks.sort(key=lambda task: -len(task[0]) * len(task[1]))
+
+    if workers and workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            partials = list(pool.map(_tile_task, tasks))
+    else:
+        partials = [_tile_task(task) for task in tasks]
+
+    return finalize(merge_partials(partials), how)
@@ -0,0 +1,221 @@
+import argparse
+import bz2
+import gzip
+import json
+import os
+import sqlite3
+import time
+
+# Offline alternative to the per-entity Wikidata requests of check_if_wiki_is_mountain.py.
+#
+# Streams a Wikidata JSON dump (latest-all.json.gz / .bz2: one entity per line)
+# once, in bounded memory, and writes a SQLite lookup:
+#
+#   peaks(qid, title, label, lon, lat, elevation)  entities with coordinates (P625)
+#                                                  that are instances of MOUNTAIN_QIDS,
+#                                                  indexed by QID and Wikipedia title
+#   edges(child, parent)                           every P131 "located in the administrative
+#                                                  territorial entity" statement of the dump
+#   regions(qid, region)                           transitive P131 closure of every peak,
+#                                                  so a peak in a district of a district of
+#                                                  Tyrol resolves to Tyrol
+#
+# The P131 edges are written to SQLite while streaming instead of being kept in
+# memory; the closure is a recursive query over them, restricted to the peaks.
+# QIDs are stored as integers (Q42880 -> 42880).
+#
+#   python wikidata_dump.py latest-all.json.gz --lang de
+#   python check_if_wiki_is_mountain.py --lookup Data/wikidata_peaks.sqlite
+
+LOOKUP_PATH = "Data/wikidata_peaks.sqlite"
+# same classes as check_if_wiki_is_mountain.py: mountain, natural feature, volcano
+MOUNTAIN_QIDS = ["Q8502", "Q271669", "Q8072"]
+BATCH_SIZE = 50_000  # rows per executemany
+PROGRESS_EVERY = 1_000_000  # lines
+
+SCHEMA = """
+CREATE TABLE peaks (qid INTEGER PRIMARY KEY, title TEXT, label TEXT, lon REAL, lat REAL, elevation REAL);
+CREATE TABLE edges (child INTEGER, parent INTEGER);
+CREATE TABLE regions (qid INTEGER, region INTEGER, PRIMARY KEY (qid, region)) WITHOUT ROWID;
+"""
+
+
+def qid_int(qid):
+    return int(qid[1:])
+
+
+def open_dump(path):
+    """Text stream of a plain, gzip or bz2 compressed dump."""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rt", encoding="utf-8")
+    return open(path, encoding="utf-8")
+
+
+def iter_entities(lines):
+    """
+    Entities of the dump that may matter: the dump is one JSON array with one entity
+    per line, lines without a P131 or P625 claim are skipped before parsing.
+    """
+    for line in lines:
+        if '"P131"' not in line and '"P625"' not in line:
+            continue
+        line = line.rstrip().rstrip(",")
+        if not line.startswith("{"):
+            continue
+        yield json.loads(line)
+
+
+def _claim_values(claims, prop):
+    for claim in claims.get(prop, []):
+        snak = claim.get("mainsnak", {})
+        if snak.get("snaktype") == "value" and claim.get("rank") != "deprecated":
+            yield snak["datavalue"]["value"]
+
+
+def parse_entity(entity, mountain_qids, lang="de"):
+    """
+    Returns (peak row or None, list of P131 parent QIDs as int) for one dump entity.
+    A peak row is (qid, title, label, lon, lat, elevation).
+    """
+    claims = entity.get("claims", {})
+    parents = [qid_int(v["id"]) for v in _claim_values(claims, "P131") if "id" in v]
+
+    instance_of = {v.get("id") for v in _claim_values(claims, "P31")}
+    if not instance_of & mountain_qids:
+        return None, parents
+    coordinates = next(_claim_values(claims, "P625"), None)
+    if coordinates is None:
+        return None, parents
+    elevation = next(_claim_values(claims, "P2044"), None)
+    title = entity.get("sitelinks", {}).get(f"{lang}wiki", {}).get("title")
+    label = entity.get("labels", {}).get(lang, {}).get("value")
+    peak = (qid_int(entity["id"]), title, label, coordinates["longitude"], coordinates["latitude"],
+            float(elevation["amount"]) if elevation else None)
+    return peak, parents
+
+
+def build_lookup(dump_path, out_path=LOOKUP_PATH, lang="de", mountain_qids=MOUNTAIN_QIDS, bbox=None):
+    """
+    Stream the dump once and write the lookup database (replaced if it exists).
+
+    Parameters
+    ----------
+    bbox : tuple or None
+        (minx, miny, maxx, maxy) in lon/lat; only peaks inside are kept.
+
+    Returns
+    -------
+    dict
+        Counts of lines, peaks, edges and region rows.
+    """
+    mountain_qids = set(mountain_qids)
+    tmp_path = out_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    # a rebuildable cache, no need for crash safety while writing
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.executescript(SCHEMA)
+
+    stats = {"lines": 0, "peaks": 0, "edges": 0}
+    peaks, edges = [], []
+    start = time.perf_counter()
+
+    def flush():
+        conn.executemany("INSERT OR REPLACE INTO peaks VALUES (?, ?, ?, ?, ?, ?)", peaks)
+        conn.executemany("INSERT INTO edges VALUES (?, ?)", edges)
+        peaks.clear()
+        edges.clear()
+
+    with open_dump(dump_path) as f:
+        def counted(lines):
+            for line in lines:
+                stats["lines"] += 1
+                if stats["lines"] % PROGRESS_EVERY == 0:
+                    print(f"{stats['lines']:,} lines, {stats['peaks']:,} peaks, {stats['edges']:,} P131 edges "
+                          f"({time.perf_counter() - start:.0f}s)", flush=True)
+                yield line
+
+        for entity in iter_entities(counted(f)):
+            peak, parents = parse_entity(entity, mountain_qids, lang)
+            if parents:
+                child = qid_int(entity["id"])
+                edges.extend((child, parent) for parent in parents)
+                stats["edges"] += len(parents)
+            if peak and (bbox is None or (bbox[0] <= peak[3] <= bbox[2] and bbox[1] <= peak[4] <= bbox[3])):
+                peaks.append(peak)
+                stats["peaks"] += 1
+            if len(peaks) + len(edges) >= BATCH_SIZE:
+                flush()
+    flush()
+
+    conn.execute("CREATE INDEX edges_child ON edges (child)")
+    stats["regions"] = build_region_closure(conn)
+    conn.execute("CREATE INDEX peaks_title ON peaks (title)")
+    conn.execute("CREATE INDEX regions_region ON regions (region)")
+    conn.commit()
+    conn.close()
+    os.replace(tmp_path, out_path)
+    return stats
+
+
+def build_region_closure(conn):
+    """Fill regions with every (peak, administrative ancestor) pair; cycles end through UNION."""
+    conn.execute("""
+        INSERT OR IGNORE INTO regions (qid, region)
+        WITH RECURSIVE ancestors(qid, region) AS (
+            SELECT e.child, e.parent FROM edges e JOIN peaks p ON p.qid = e.child
+            UNION
+            SELECT a.qid, e.parent FROM ancestors a JOIN edges e ON e.child = a.region
+        )
+        SELECT qid, region FROM ancestors
+    """)
+    return conn.execute("SELECT COUNT(*) FROM regions").fetchone()[0]
+
+
+class WikidataLookup:
+    """Read-only queries against a lookup database written by build_lookup()."""
+
+    def __init__(self, path=LOOKUP_PATH):
+        self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+
+    def qid_for_title(self, title):
+        """QID ("Q...") of the peak with this Wikipedia title, None if it is not a mountain in the dump."""
+        if not title:
+            return None
+        row = self.conn.execute("SELECT qid FROM peaks WHERE title = ?", (title.replace("_", " "),)).fetchone()
+        return f"Q{row[0]}" if row else None
+
+    def is_mountain(self, qid):
+        return bool(qid) and self.conn.execute(
+            "SELECT 1 FROM peaks WHERE qid = ?", (qid_int(qid),)).fetchone() is not None
+
+    def in_region(self, qid, region_qid):
+        """Whether the peak lies (transitively through P131) in the region."""
+        return bool(qid) and self.conn.execute(
+            "SELECT 1 FROM regions WHERE qid = ? AND region = ?", (qid_int(qid), qid_int(region_qid))).fetchone() is not None
+
+    def peak(self, qid):
+        row = self.conn.execute("SELECT qid, title, label, lon, lat, elevation FROM peaks WHERE qid = ?",
+                                (qid_int(qid),)).fetchone()
+        return dict(zip(["qid", "title", "label", "lon", "lat", "elevation"], (f"Q{row[0]}",) + row[1:])) if row else None
+
+    def close(self):
+        self.conn.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build the offline Wikidata peak lookup from a JSON dump.")
+    parser.add_argument("dump", help="Wikidata JSON dump (.json, .json.gz or .json.bz2)")
+    parser.add_argument("--out", default=LOOKUP_PATH)
+    parser.add_argument("--lang", default="de", help="Wikipedia language of the titles")
+    parser.add_argument("--bbox", help="minx,miny,maxx,maxy: keep only peaks in this lon/lat box")
+    config = parser.parse_args()
+
+    bbox = tuple(float(v) for v in config.bbox.split(",")) if config.bbox else None
+    stats = build_lookup(config.dump, config.out, config.lang, bbox=bbox)
+    print(f"✅ {stats['peaks']:,} peaks, {stats['edges']:,} P131 edges, {stats['regions']:,} region memberships "
+          f"from {stats['lines']:,} lines -> {config.out}")
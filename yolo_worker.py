@@ -0,0 +1,242 @@
+import argparse
+import ipaddress
+import os
+import secrets
+import socket
+import sys
+import threading
+import time
+from functools import lru_cache
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+import numpy as np
+
+# YOLO object detection for the webcam images, in-process or through a resident worker.
+#
+# The model is only loaded on first use (get_model), so importing this module or
+# image_classification.py costs nothing. Scripts that classify many batches (webcam
+# ingestion, ad-hoc re-analysis) can share one warm model by starting the worker
+#
+#   python yolo_worker.py --port 8767
+#   YOLO_WORKER=127.0.0.1:8767 python image_classification.py
+#
+# and classify() then sends the batches over a local multiprocessing connection
+# (pickled: image paths, URLs or numpy arrays). If YOLO_WORKER is not set or the
+# worker cannot be reached, the model is loaded in the calling process instead.
+#
+# The connection unpickles what it receives, so the authkey is what keeps others from
+# running code in the worker. Without YOLO_WORKER_AUTHKEY the worker generates a random
+# key and writes it to AUTHKEY_FILE (mode 0600), where clients on the same machine read
+# it. Listening on a non-loopback address requires YOLO_WORKER_AUTHKEY to be set.
+
+YOLO_WEIGHTS = os.environ.get("YOLO_WEIGHTS", "yolo11l.pt")
+CONFIDENCE = 0.35
+WORKER_PORT = 8767
+WORKER_ADDRESS = os.environ.get("YOLO_WORKER")  # "host:port", unset = classify in-process
+AUTHKEY_FILE = "Data/.yolo_worker_key"
+# COCO class ids counted per image
+CLASSES = {"persons": 0, "bicycle": 1, "cars": 2}
+
+
+@lru_cache(maxsize=None)
+def get_model(weights=YOLO_WEIGHTS):
+    """The YOLO model, loaded on first use."""
+    from ultralytics import YOLO
+    return YOLO(weights)
+
+
+def count_objects(results):
+    """Number of persons, bicycles and cars per image."""
+    counts = {name: [] for name in CLASSES}
+    for result in results:
+        detected = result.boxes.cls.tolist()
+        for name, class_id in CLASSES.items():
+            counts[name].append(detected.count(class_id))
+    return counts
+
+
+def classify_local(images, conf=CONFIDENCE, weights=YOLO_WEIGHTS):
+    return count_objects(get_model(weights).predict(source=images, conf=conf, verbose=False))
+
+
+def _parse_address(address):
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def client_authkey(key_file=AUTHKEY_FILE):
+    """YOLO_WORKER_AUTHKEY, else the key a local worker generated; None if there is neither."""
+    if os.environ.get("YOLO_WORKER_AUTHKEY"):
+        return os.environ["YOLO_WORKER_AUTHKEY"].encode()
+    try:
+        with open(key_file, "rb") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def generate_authkey(key_file=AUTHKEY_FILE):
+    """A random key, written to ``key_file`` readable only by the current user."""
+    key = secrets.token_hex(32).encode()
+    os.makedirs(os.path.dirname(key_file) or ".", exist_ok=True)
+    if os.path.exists(key_file):
+        os.remove(key_file)
+    fd = os.open(key_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    return key
+
+
+def is_loopback(host):
+    try:
+        return all(ipaddress.ip_address(info[4][0]).is_loopback
+                   for info in socket.getaddrinfo(host, None))
+    except (socket.gaierror, ValueError):
+        return False
+
+
+class WorkerClient:
+    """Connection to a running yolo_worker.py, reconnected once if the worker restarted."""
+
+    def __init__(self, address, authkey=None):
+        self.address = _parse_address(address) if isinstance(address, str) else address
+        self.authkey = authkey or client_authkey()
+        if self.authkey is None:
+            raise AuthenticationError(f"no authkey: set YOLO_WORKER_AUTHKEY or create {AUTHKEY_FILE}")
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _call(self, *message):
+        with self._lock:
+            for attempt in (0, 1):
+                try:
+                    if self._conn is None:
+                        self._conn = Client(self.address, authkey=self.authkey)
+                    self._conn.send(message)
+                    status, payload = self._conn.recv()
+                    break
+                except (EOFError, ConnectionResetError, BrokenPipeError):
+                    self.close()
+                    if attempt:
+                        raise
+        if status == "error":
+            raise RuntimeError(f"YOLO worker: {payload}")
+        return payload
+
+    def classify(self, images, conf=CONFIDENCE):
+        return self._call("classify", list(images), conf)
+
+    def info(self):
+        return self._call("info")
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+_client = None
+
+
+def classify(images, conf=CONFIDENCE):
+    """Counts per image, from the worker at YOLO_WORKER if it is running, otherwise in-process."""
+    global _client, WORKER_ADDRESS
+    if WORKER_ADDRESS:
+        try:
+            _client = _client or WorkerClient(WORKER_ADDRESS)
+            return _client.classify(images, conf)
+        except (OSError, AuthenticationError) as e:
+            print(f"⚠️ YOLO worker at {WORKER_ADDRESS} not usable ({e}), loading the model locally",
+                  file=sys.stderr)
+            WORKER_ADDRESS = _client = None
+    return classify_local(images, conf)
+
+
+class Worker:
+    """Keeps one model warm and serves classify requests; inference is serialized on the model."""
+
+    def __init__(self, weights=YOLO_WEIGHTS, verbose=False):
+        self.weights = weights
+        self.verbose = verbose
+        self.started = time.time()
+        self.batches = 0
+        self.images = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def warm_up(self):
+        start = time.perf_counter()
+        get_model(self.weights).predict(source=np.zeros((640, 640, 3), dtype=np.uint8), verbose=False)
+        return time.perf_counter() - start
+
+    def classify(self, images, conf):
+        with self._lock:
+            start = time.perf_counter()
+            counts = classify_local(images, conf, self.weights) if images else {name: [] for name in CLASSES}
+            elapsed = time.perf_counter() - start
+            self.batches += 1
+            self.images += len(images)
+            self.seconds += elapsed
+        if self.verbose:
+            print(f"{len(images)} images in {elapsed:.2f}s", flush=True)
+        return counts
+
+    def info(self):
+        return {"weights": self.weights, "uptime": round(time.time() - self.started, 1),
+                "batches": self.batches, "images": self.images, "inference_seconds": round(self.seconds, 3)}
+
+    def handle(self, conn):
+        with conn:
+            while True:
+                try:
+                    message = conn.recv()
+                except (EOFError, ConnectionResetError):
+                    return
+                try:
+                    if message[0] == "classify":
+                        reply = ("ok", self.classify(*message[1:]))
+                    elif message[0] == "info":
+                        reply = ("ok", self.info())
+                    else:
+                        reply = ("error", f"unknown request {message[0]!r}")
+                except Exception as e:
+                    # a broken image must not take down the worker, the client gets the error
+                    reply = ("error", f"{type(e).__name__}: {e}")
+                conn.send(reply)
+
+    def serve(self, host, port, authkey):
+        with Listener((host, port), authkey=authkey) as listener:
+            while True:
+                try:
+                    conn = listener.accept()
+                except (OSError, EOFError, AuthenticationError) as e:
+                    # failed handshake (e.g. wrong authkey)
+                    print(f"⚠️ rejected connection: {e}", file=sys.stderr)
+                    continue
+                threading.Thread(target=self.handle, args=(conn,), daemon=True).start()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Resident YOLO worker that keeps the model warm.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=WORKER_PORT)
+    parser.add_argument("--weights", default=YOLO_WEIGHTS)
+    parser.add_argument("--verbose", action="store_true")
+    config = parser.parse_args()
+
+    authkey = os.environ.get("YOLO_WORKER_AUTHKEY", "").encode()
+    if not authkey:
+        if not is_loopback(config.host):
+            parser.error(f"--host {config.host} is reachable from other machines, set YOLO_WORKER_AUTHKEY")
+        authkey = generate_authkey()
+        print(f"🔑 Generated authkey in {AUTHKEY_FILE}")
+
+    worker = Worker(config.weights, config.verbose)
+    print(f"Loading {config.weights} ...")
+    print(f"Model warm after {worker.warm_up():.1f}s")
+    print(f"🧠 YOLO worker on {config.host}:{config.port}")
+    try:
+        worker.serve(config.host, config.port, authkey)
+    except KeyboardInterrupt:
+        pass